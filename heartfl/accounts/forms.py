@@ -118,7 +118,7 @@ class DoctorRegistrationForm(UserCreationForm):
         widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Dr. Full Name'})
     )
     hospital = forms.ModelChoiceField(
-        queryset=Hospital.objects.filter(is_verified=True),
+        queryset=Hospital.objects.exclude_simulated().filter(is_verified=True),
         widget=forms.Select(attrs={'class': 'form-control'}),
         empty_label="-- Select Hospital --"
     )
@@ -142,8 +142,8 @@ class DoctorRegistrationForm(UserCreationForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['hospital'].queryset = Hospital.objects.filter(is_verified=True)
-        if not Hospital.objects.filter(is_verified=True).exists():
+        self.fields['hospital'].queryset = Hospital.objects.exclude_simulated().filter(is_verified=True)
+        if not Hospital.objects.exclude_simulated().filter(is_verified=True).exists():
             self.fields['hospital'].help_text = "No verified hospitals registered yet. Please register and verify a hospital first."
     
     def save(self, commit=True):
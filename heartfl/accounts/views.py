@@ -464,7 +464,7 @@ def doctor_register(request):
     Doctor registration - must select a registered hospital.
     """
     # Check if any hospitals exist
-    hospitals_count = Hospital.objects.count()
+    hospitals_count = Hospital.objects.exclude_simulated().count()
     
     if hospitals_count == 0:
         messages.warning(request, 'No hospitals registered yet. Please register a hospital first.')
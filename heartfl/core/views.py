@@ -22,7 +22,7 @@ def is_staff_or_superuser(user):
 
 def home(request):
     """Homepage with dashboard statistics."""
-    hospitals_count = Hospital.objects.count()
+    hospitals_count = Hospital.objects.exclude_simulated().count()
     doctors_count = Doctor.objects.count()
     predictions_count = PredictionResult.objects.count()
     
@@ -107,7 +107,7 @@ def contact_page(request):
 @require_http_methods(['GET'])
 def overview_api(request):
     """Return high-level live stats for React dashboard."""
-    total_hospitals = Hospital.objects.count()
+    total_hospitals = Hospital.objects.exclude_simulated().count()
     total_doctors = Doctor.objects.count()
     total_predictions = PredictionResult.objects.count()
     high_risk = PredictionResult.objects.filter(prediction='high').count()
@@ -9,7 +9,7 @@ from heartfl.admin import heartfl_admin_site
 
 class FederatedRoundAdmin(admin.ModelAdmin):
     list_display = ['round_number', 'participating_hospitals', 'accuracy_display', 'completion_status', 'started_at']
-    list_filter = ['is_completed', 'started_at']
+    list_filter = ['is_completed', 'is_simulation', 'started_at']
     search_fields = ['round_number', 'description']
     readonly_fields = ['started_at']
     date_hierarchy = 'started_at'
@@ -43,7 +43,7 @@ class FederatedRoundAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Round Information', {
-            'fields': ('round_number', 'description')
+            'fields': ('round_number', 'description', 'aggregation_method', 'update_codec', 'model_version')
         }),
         ('Metrics', {
             'fields': ('global_accuracy', 'global_loss', 'participating_hospitals')
@@ -0,0 +1,182 @@
+"""
+Federated Aggregation Benchmarks
+Time of each aggregation method for 10 to 1,000 simulated hospitals
+
+Client updates are random weight vectors of two sizes: the 12 weights of
+the logistic model rounds.py trains, and 10,000 weights standing in for a
+small neural network. Each method is timed on the stacked float32 matrix
+(aggregation.py) and, where it finishes in reasonable time, against a
+Python loop over parameters and clients, the straightforward
+implementation. Stacking the client vectors is timed separately.
+
+The compression benchmark compares the update codecs (compression.py):
+the encoded size of one update at both model sizes, and FedAvg rounds over
+the same partitioned synthetic hospitals with each codec, reporting per
+round the upload size, compression ratio and accuracy against float64.
+
+Results are plain dicts so the benchmark_aggregation and
+benchmark_compression commands can write them as JSON and runs can be
+diffed across commits.
+"""
+import statistics
+import time
+
+import numpy as np
+
+from prediction.batch_scoring import encode_chunk
+
+from . import aggregation, compression
+from .rounds import DEFAULT_CONFIG, LABEL_COLUMN, WEIGHT_COUNT, evaluate, local_update
+from .simulation import partition, synthetic_patients
+
+AGGREGATION_CLIENTS = (10, 100, 1000)
+AGGREGATION_PARAMS = (12, 10_000)
+
+COMPRESSION_HOSPITALS = 20
+COMPRESSION_ROUNDS = 10
+COMPRESSION_ROWS = 20_000
+
+# The Python loop takes seconds beyond this many client values.
+LOOP_MAX_VALUES = 200_000
+
+
+def simulated_updates(clients, params, seed=0):
+    """(weight vectors, sample counts) of clients simulated hospitals."""
+    rng = np.random.default_rng(seed)
+    center = rng.normal(0, 1, params)
+    vectors = [center + rng.normal(0, 0.1, params) for _ in range(clients)]
+    samples = rng.integers(50, 5000, clients)
+    return vectors, samples
+
+
+def loop_aggregate(method, vectors, samples, previous, trim_ratio=aggregation.DEFAULT_TRIM_RATIO,
+                   mu=aggregation.DEFAULT_PROXIMAL_MU):
+    """Reference aggregation looping over parameters and clients in Python."""
+    clients = len(vectors)
+    total = sum(samples)
+    trim = int(clients * trim_ratio)
+    result = []
+    for j in range(len(vectors[0])):
+        column = [vector[j] for vector in vectors]
+        if method in (aggregation.FEDAVG, aggregation.FEDPROX):
+            value = sum(weight * count for weight, count in zip(column, samples)) / total
+            if method == aggregation.FEDPROX:
+                value = (value + mu * previous[j]) / (1 + mu)
+        elif method == aggregation.TRIMMED_MEAN:
+            value = statistics.fmean(sorted(column)[trim:clients - trim])
+        else:
+            value = statistics.median(column)
+        result.append(value)
+    return result
+
+
+def _time(func, min_seconds):
+    """Mean seconds per call, repeating until min_seconds have passed."""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def aggregation_benchmark(clients=AGGREGATION_CLIENTS, params=AGGREGATION_PARAMS,
+                          methods=aggregation.AGGREGATION_METHODS, min_seconds=0.1):
+    """'<clients>x<params>' -> stacking time and per-method vectorized and loop times in ms."""
+    results = {}
+    for param_count in params:
+        for client_count in clients:
+            vectors, samples = simulated_updates(client_count, param_count)
+            previous = vectors[0]
+            stacked = aggregation.stack_updates(vectors)
+            case = {
+                'clients': client_count,
+                'params': param_count,
+                'stack_ms': round(_time(lambda: aggregation.stack_updates(vectors), min_seconds) * 1000, 4),
+                'methods': {},
+            }
+            run_loop = client_count * param_count <= LOOP_MAX_VALUES
+            python_samples = samples.tolist()
+            python_vectors = [vector.tolist() for vector in vectors] if run_loop else None
+            for method in methods:
+                vectorized = _time(
+                    lambda: aggregation.aggregate(method, stacked, samples, previous), min_seconds
+                )
+                timing = {'vectorized_ms': round(vectorized * 1000, 4), 'loop_ms': None, 'speedup': None}
+                if run_loop:
+                    loop = _time(
+                        lambda: loop_aggregate(method, python_vectors, python_samples, previous), min_seconds
+                    )
+                    timing['loop_ms'] = round(loop * 1000, 4)
+                    timing['speedup'] = round(loop / vectorized, 1)
+                case['methods'][method] = timing
+            results[f'{client_count}x{param_count}'] = case
+    return results
+
+
+def update_sizes(params=AGGREGATION_PARAMS, codecs=compression.UPDATE_CODECS,
+                 topk_ratio=compression.DEFAULT_TOPK_RATIO):
+    """params -> codec -> (encoded bytes, compression ratio) of one update."""
+    sizes = {}
+    for param_count in params:
+        delta = np.random.default_rng(param_count).normal(0, 0.1, param_count)
+        sizes[param_count] = {}
+        for codec in codecs:
+            encoded = compression.encode(delta, codec, topk_ratio)
+            sizes[param_count][codec] = (len(encoded), round(compression.compression_ratio(encoded), 2))
+    return sizes
+
+
+def compression_benchmark(hospitals=COMPRESSION_HOSPITALS, rounds=COMPRESSION_ROUNDS, rows=COMPRESSION_ROWS,
+                          codecs=compression.UPDATE_CODECS, topk_ratio=compression.DEFAULT_TOPK_RATIO,
+                          label_skew=0.5, seed=0):
+    """
+    FedAvg rounds with each codec on identical non-IID synthetic hospitals.
+
+    Training runs in this process from all-zero weights, with error
+    feedback, and accuracy is measured on all patients after each round.
+
+    Returns:
+        {'update_sizes': update_sizes(), 'rounds': codec -> list of per-round
+        dicts}; accuracy_change is the difference to float64 in that round
+    """
+    shards = partition(synthetic_patients(rows, seed), hospitals, label_skew=label_skew, seed=seed)
+    features = [encode_chunk(shard) for shard in shards]
+    labels = [shard[LABEL_COLUMN].to_numpy(dtype=np.float64) for shard in shards]
+    pooled = np.vstack(features)
+    mean, scale = pooled.mean(axis=0), pooled.std(axis=0)
+    scale[scale == 0] = 1.0
+    features = [(X - mean) / scale for X in features]
+    pooled, pooled_labels = (pooled - mean) / scale, np.concatenate(labels)
+
+    results = {}
+    for codec in codecs:
+        weights = np.zeros(WEIGHT_COUNT)
+        residuals = [None] * hospitals
+        results[codec] = []
+        for index in range(rounds):
+            config = DEFAULT_CONFIG._replace(seed=seed + index)
+            updates = [
+                local_update(hospital, X, y, weights, config, codec, topk_ratio, residuals[hospital])
+                for hospital, (X, y) in enumerate(zip(features, labels))
+            ]
+            residuals = [update.residual for update in updates]
+            encoded = [update.update for update in updates]
+            weights = compression.aggregate_encoded(
+                aggregation.FEDAVG, encoded, [update.samples for update in updates], previous=weights
+            )
+            accuracy, loss = evaluate(weights, pooled, pooled_labels)
+            results[codec].append({
+                'round': index + 1,
+                'bytes_up': sum(len(blob) for blob in encoded),
+                'compression_ratio': round(compression.compression_ratio(encoded), 2),
+                'accuracy': round(accuracy, 4),
+                'loss': round(loss, 4),
+            })
+    if compression.FLOAT64 in results:
+        for codec_rounds in results.values():
+            for result, reference in zip(codec_rounds, results[compression.FLOAT64]):
+                result['accuracy_change'] = round(result['accuracy'] - reference['accuracy'], 4)
+    return {'update_sizes': update_sizes(codecs=codecs, topk_ratio=topk_ratio), 'rounds': results}
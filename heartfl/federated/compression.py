@@ -0,0 +1,210 @@
+"""
+Update Compression
+Encodes hospital updates as compact binary deltas and aggregates them without unpacking
+
+A hospital sends the difference between its trained weights and the round's
+global weights, encoded with one of four codecs:
+
+- float64: the delta unchanged (lossless reference)
+- float16: half precision, 4x smaller
+- int8:    linear quantization to 255 levels between the delta's minimum
+           and maximum, x ~ center + scale * q, 8x smaller for large models
+- topk:    only the topk_ratio largest-magnitude coordinates, as uint32
+           indices and float32 values
+
+Every encoded update starts with a 5-byte header (codec id, parameter
+count), so it is self-describing and can be stored as is. Updates with the
+same codec and length are read together as one NumPy structured array, so
+FedAvg and FedProx aggregate int8 and top-k updates directly: a
+matrix-vector product over the quantized values with the per-update scales,
+and a bincount over the sparse indices. The order-statistic methods need
+dense rows and decode into one float32 matrix first. float64 updates are
+aggregated in float64 throughout (and the dense matrix is float64 when any
+update uses it), so the lossless codec stays lossless.
+
+Error feedback: what a lossy codec drops (the delta minus its decoded
+value) is kept by the hospital as a residual and added to its next delta,
+so the dropped coordinates are sent eventually instead of being lost.
+"""
+import math
+
+import numpy as np
+
+from . import aggregation
+
+FLOAT64 = 'float64'
+FLOAT16 = 'float16'
+INT8 = 'int8'
+TOPK = 'topk'
+
+UPDATE_CODECS = (FLOAT64, FLOAT16, INT8, TOPK)
+CODEC_IDS = {codec: codec_id for codec_id, codec in enumerate(UPDATE_CODECS)}
+
+DEFAULT_TOPK_RATIO = 0.1
+
+_HEADER = [('codec', 'u1'), ('params', '<u4')]
+HEADER_BYTES = np.dtype(_HEADER).itemsize
+# int8 levels are -127..127, so zero is exact and the range is symmetric.
+_INT8_LEVELS = 127
+
+
+def _record_dtype(codec_id, params, k=0):
+    """Packed dtype of one encoded update."""
+    fields = list(_HEADER)
+    if codec_id == CODEC_IDS[FLOAT64]:
+        fields.append(('values', '<f8', (params,)))
+    elif codec_id == CODEC_IDS[FLOAT16]:
+        fields.append(('values', '<f2', (params,)))
+    elif codec_id == CODEC_IDS[INT8]:
+        fields += [('center', '<f4'), ('scale', '<f4'), ('values', 'i1', (params,))]
+    elif codec_id == CODEC_IDS[TOPK]:
+        fields += [('indices', '<u4', (k,)), ('values', '<f4', (k,))]
+    else:
+        raise ValueError(f'Unknown update codec id {codec_id}')
+    return np.dtype(fields)
+
+
+def topk_count(params, topk_ratio=DEFAULT_TOPK_RATIO):
+    """Coordinates a top-k update keeps: at least one."""
+    return min(params, max(1, math.ceil(params * topk_ratio)))
+
+
+def encode(delta, codec=FLOAT64, topk_ratio=DEFAULT_TOPK_RATIO):
+    """Encode a weight delta as bytes with the given codec."""
+    if codec not in CODEC_IDS:
+        raise ValueError(f'Unknown update codec {codec!r}; expected one of {", ".join(UPDATE_CODECS)}')
+    delta = np.asarray(delta, dtype=np.float64).ravel()
+    params = len(delta)
+    k = topk_count(params, topk_ratio) if codec == TOPK else 0
+    record = np.zeros(1, dtype=_record_dtype(CODEC_IDS[codec], params, k))
+    record['codec'] = CODEC_IDS[codec]
+    record['params'] = params
+
+    if codec == TOPK:
+        indices = np.sort(np.argpartition(np.abs(delta), params - k)[params - k:])
+        record['indices'] = indices
+        record['values'] = delta[indices]
+    elif codec == INT8:
+        low, high = (delta.min(), delta.max()) if params else (0.0, 0.0)
+        center = np.float32((low + high) / 2)
+        scale = np.float32((high - low) / (2 * _INT8_LEVELS)) or np.float32(1.0)
+        record['center'] = center
+        record['scale'] = scale
+        record['values'] = np.clip(np.rint((delta - center) / scale), -_INT8_LEVELS, _INT8_LEVELS)
+    else:
+        record['values'] = delta
+    return record.tobytes()
+
+
+def _groups(encoded):
+    """
+    Read encoded updates as structured arrays, one per (codec, length).
+
+    Returns:
+        params, and a list of (row positions, codec id, records)
+    """
+    by_layout = {}
+    params = None
+    for row, blob in enumerate(encoded):
+        if len(blob) < HEADER_BYTES:
+            raise ValueError(f'Encoded update {row} is {len(blob)} bytes, shorter than its header')
+        header = np.frombuffer(blob, dtype=_HEADER, count=1)[0]
+        if params is None:
+            params = int(header['params'])
+        elif int(header['params']) != params:
+            raise ValueError(f'Encoded update {row} has {header["params"]} weights, expected {params}')
+        by_layout.setdefault((int(header['codec']), len(blob)), []).append(row)
+    if params is None:
+        raise ValueError('No client updates to aggregate')
+
+    groups = []
+    for (codec_id, length), rows in by_layout.items():
+        k = (length - HEADER_BYTES) // 8 if codec_id == CODEC_IDS[TOPK] else 0
+        dtype = _record_dtype(codec_id, params, k)
+        if dtype.itemsize != length:
+            raise ValueError(f'Encoded {UPDATE_CODECS[codec_id]} update of {length} bytes is truncated')
+        records = np.frombuffer(b''.join(bytes(encoded[row]) for row in rows), dtype=dtype)
+        groups.append((np.array(rows), codec_id, records))
+    return params, groups
+
+
+def decode_stacked(encoded, dtype=np.float32):
+    """Decode updates into one C-contiguous (clients x params) matrix."""
+    encoded = list(encoded)
+    params, groups = _groups(encoded)
+    stacked = np.zeros((len(encoded), params), dtype=dtype)
+    for rows, codec_id, records in groups:
+        if codec_id == CODEC_IDS[TOPK]:
+            dense = np.zeros((len(rows), params), dtype=dtype)
+            np.put_along_axis(dense, records['indices'].astype(np.intp), records['values'], axis=1)
+            stacked[rows] = dense
+        elif codec_id == CODEC_IDS[INT8]:
+            stacked[rows] = records['center'][:, None] + records['scale'][:, None] * records['values']
+        else:
+            stacked[rows] = records['values']
+    return stacked
+
+
+def decode(blob):
+    """The float64 delta of one encoded update."""
+    return decode_stacked([blob], dtype=np.float64)[0]
+
+
+def weighted_sum(encoded, weights):
+    """Sum of the decoded updates times per-update weights, computed on the encoded values."""
+    encoded = list(encoded)
+    params, groups = _groups(encoded)
+    weights = np.asarray(weights, dtype=np.float64)
+    total = np.zeros(params, dtype=np.float64)
+    for rows, codec_id, records in groups:
+        row_weights = weights[rows]
+        if codec_id == CODEC_IDS[TOPK]:
+            contributions = records['values'] * row_weights[:, None]
+            total += np.bincount(records['indices'].ravel(), weights=contributions.ravel(), minlength=params)
+        elif codec_id == CODEC_IDS[INT8]:
+            total += (row_weights * records['scale']).astype(np.float32) @ records['values'].astype(np.float32)
+            total += row_weights @ records['center']
+        elif codec_id == CODEC_IDS[FLOAT64]:
+            total += row_weights @ records['values']
+        else:
+            total += row_weights.astype(np.float32) @ records['values'].astype(np.float32)
+    return total
+
+
+def aggregate_encoded(method, encoded, samples=None, previous=None,
+                      trim_ratio=aggregation.DEFAULT_TRIM_RATIO, mu=aggregation.DEFAULT_PROXIMAL_MU):
+    """
+    New global weights from encoded deltas against the previous global weights.
+
+    Same results as aggregation.aggregate() on the decoded client weights.
+
+    Returns:
+        float64 params vector
+    """
+    if method not in aggregation.AGGREGATION_METHODS:
+        raise ValueError(
+            f'Unknown aggregation method {method!r}; expected one of {", ".join(aggregation.AGGREGATION_METHODS)}'
+        )
+    encoded = list(encoded)
+    if method in (aggregation.FEDAVG, aggregation.FEDPROX):
+        samples = np.asarray(samples, dtype=np.float64)
+        delta = weighted_sum(encoded, samples / samples.sum())
+        # Blending towards previous shrinks the delta: (mean + mu * previous) / (1 + mu) - previous.
+        if method == aggregation.FEDPROX and previous is not None:
+            delta /= 1.0 + mu
+    else:
+        lossless = any(bytes(blob[:1]) == bytes([CODEC_IDS[FLOAT64]]) for blob in encoded)
+        stacked = decode_stacked(encoded, dtype=np.float64 if lossless else np.float32)
+        delta = aggregation.aggregate(method, stacked, trim_ratio=trim_ratio).astype(np.float64)
+    if previous is None:
+        return delta
+    return np.asarray(previous, dtype=np.float64) + delta
+
+
+def compression_ratio(encoded):
+    """Raw float64 weight bytes over encoded bytes, for one update or a list of them."""
+    if isinstance(encoded, (bytes, bytearray, memoryview)):
+        encoded = [encoded]
+    encoded = [bytes(blob) for blob in encoded]
+    raw = sum(int(np.frombuffer(blob, dtype=_HEADER, count=1)[0]['params']) * 8 for blob in encoded)
+    return raw / sum(len(blob) for blob in encoded)
@@ -0,0 +1,62 @@
+"""
+Django management command to benchmark federated weight aggregation.
+
+Times FedAvg, FedProx, TrimmedMean and Median on 10 to 1,000 simulated
+hospitals, vectorized and as a Python loop, and writes the results as JSON
+so they can be compared across commits.
+
+Usage:
+    python manage.py benchmark_aggregation
+    python manage.py benchmark_aggregation --clients 10 100 1000 5000 --params 12 100000
+    python manage.py benchmark_aggregation --output -
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from federated.benchmarks import AGGREGATION_CLIENTS, AGGREGATION_PARAMS, aggregation_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark FedAvg, FedProx, trimmed-mean and median aggregation"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='aggregation_benchmark.json',
+            help='JSON results path (default: aggregation_benchmark.json, "-" for stdout)',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            nargs='+',
+            default=list(AGGREGATION_CLIENTS),
+            help='Simulated hospital counts (default: 10 100 1000)',
+        )
+        parser.add_argument(
+            '--params',
+            type=int,
+            nargs='+',
+            default=list(AGGREGATION_PARAMS),
+            help='Weights per update (default: 12 10000)',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['clients'] + options['params']) <= 0:
+            raise CommandError('--clients and --params must be positive')
+        results = aggregation_benchmark(clients=options['clients'], params=options['params'])
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+        for case in results.values():
+            self.stdout.write(f"  {case['clients']:>5} clients x {case['params']:>6} params  "
+                              f"stack {case['stack_ms']:.3f} ms")
+            for method, timing in case['methods'].items():
+                loop = f"  (loop {timing['loop_ms']:.2f} ms, {timing['speedup']:.0f}x)" if timing['loop_ms'] else ''
+                self.stdout.write(f"    {method:<12} {timing['vectorized_ms']:>9.3f} ms{loop}")
+        self.stdout.write(self.style.SUCCESS(f"✓ Benchmark results written to {options['output']}"))
@@ -0,0 +1,80 @@
+"""
+Django management command to benchmark federated update compression.
+
+Encodes updates with the float64, float16, int8 and top-k codecs, then
+runs FedAvg rounds over the same simulated non-IID hospitals with each
+codec, and prints the upload size, compression ratio and accuracy change
+against float64 per round. Results are also written as JSON.
+
+Usage:
+    python manage.py benchmark_compression
+    python manage.py benchmark_compression --hospitals 100 --rounds 20 --topk-ratio 0.25
+    python manage.py benchmark_compression --output -
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from federated.benchmarks import COMPRESSION_HOSPITALS, COMPRESSION_ROUNDS, COMPRESSION_ROWS, compression_benchmark
+from federated.compression import DEFAULT_TOPK_RATIO, UPDATE_CODECS
+
+
+class Command(BaseCommand):
+    help = "Benchmark update codecs: compression ratio and accuracy impact per round"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='compression_benchmark.json',
+            help='JSON results path (default: compression_benchmark.json, "-" for stdout)',
+        )
+        parser.add_argument('--hospitals', type=int, default=COMPRESSION_HOSPITALS, help='Simulated hospitals')
+        parser.add_argument('--rounds', type=int, default=COMPRESSION_ROUNDS, help='FedAvg rounds per codec')
+        parser.add_argument('--rows', type=int, default=COMPRESSION_ROWS, help='Synthetic patients to partition')
+        parser.add_argument(
+            '--codecs',
+            nargs='+',
+            choices=UPDATE_CODECS,
+            default=list(UPDATE_CODECS),
+            help='Codecs to compare (default: all)',
+        )
+        parser.add_argument(
+            '--topk-ratio',
+            type=float,
+            default=DEFAULT_TOPK_RATIO,
+            help=f'Share of coordinates a top-k update keeps (default: {DEFAULT_TOPK_RATIO})',
+        )
+
+    def handle(self, *args, **options):
+        if min(options['hospitals'], options['rounds'], options['rows']) <= 0:
+            raise CommandError('--hospitals, --rounds and --rows must be positive')
+        if not 0 < options['topk_ratio'] <= 1:
+            raise CommandError('--topk-ratio must be in (0, 1]')
+        try:
+            results = compression_benchmark(
+                hospitals=options['hospitals'], rounds=options['rounds'], rows=options['rows'],
+                codecs=options['codecs'], topk_ratio=options['topk_ratio'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+        for params, sizes in results['update_sizes'].items():
+            line = '  '.join(f'{codec} {size:,} B ({ratio:.1f}x)' for codec, (size, ratio) in sizes.items())
+            self.stdout.write(f'  {params:>6} params  {line}')
+        for codec, rounds in results['rounds'].items():
+            self.stdout.write(f'  {codec}')
+            for result in rounds:
+                change = result.get('accuracy_change')
+                change = f'  {change:+.4f} vs float64' if change is not None else ''
+                self.stdout.write(
+                    f"    round {result['round']:>3}  up {result['bytes_up']:>7,} B "
+                    f"({result['compression_ratio']:.1f}x)  accuracy {result['accuracy']:.4f}{change}"
+                )
+        self.stdout.write(self.style.SUCCESS(f"✓ Benchmark results written to {options['output']}"))
@@ -0,0 +1,30 @@
+"""
+Django management command to garbage-collect the global model store.
+
+Removes checkpoint refs of model versions no FederatedRound uses anymore
+and the blobs no remaining ref reaches (see federated/model_store.py).
+
+Usage:
+    python manage.py gc_model_store
+    python manage.py gc_model_store --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from federated.model_store import collect_model_garbage, get_model_store
+
+
+class Command(BaseCommand):
+    help = "Delete model store checkpoints and blobs no federated round references"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        store = get_model_store()
+        self.stdout.write(f'{len(store.versions())} checkpoints in {len(store.blobs())} blobs')
+        refs, blobs, freed = collect_model_garbage(dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {verb} {refs} checkpoints and {blobs} blobs ({freed / 1024:.1f} KiB)')
+        )
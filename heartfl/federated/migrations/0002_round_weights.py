@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federated', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='federatedround',
+            name='aggregation_method',
+            field=models.CharField(default='FedAvg', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='federatedround',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='federatedround',
+            name='weights',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='localmodel',
+            name='weights',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
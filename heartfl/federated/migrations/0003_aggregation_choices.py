@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federated', '0002_round_weights'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='federatedround',
+            name='aggregation_method',
+            field=models.CharField(choices=[('FedAvg', 'Federated Averaging'), ('FedProx', 'Federated Proximal'), ('TrimmedMean', 'Trimmed Mean'), ('Median', 'Coordinate-wise Median')], default='FedAvg', max_length=20),
+        ),
+    ]
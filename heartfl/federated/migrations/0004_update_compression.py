@@ -0,0 +1,32 @@
+# Generated by Django 5.2.11 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federated', '0003_aggregation_choices'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='localmodel',
+            name='weights',
+        ),
+        migrations.AddField(
+            model_name='federatedround',
+            name='update_codec',
+            field=models.CharField(choices=[('float64', 'Float64 (uncompressed)'), ('float16', 'Float16'), ('int8', '8-bit Quantization'), ('topk', 'Top-k Sparse')], default='float64', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='localmodel',
+            name='residual',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='localmodel',
+            name='update',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
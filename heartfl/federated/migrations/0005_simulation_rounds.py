@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+def flag_simulation_rounds(apps, schema_editor):
+    FederatedRound = apps.get_model('federated', 'FederatedRound')
+    FederatedRound.objects.filter(description__startswith='Simulation').update(is_simulation=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('federated', '0004_update_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='federatedround',
+            name='is_simulation',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(flag_simulation_rounds, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='federatedround',
+            name='round_number',
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='federatedround',
+            constraint=models.UniqueConstraint(fields=('round_number', 'is_simulation'), name='unique_round_number'),
+        ),
+    ]
@@ -2,16 +2,44 @@
 Federated Learning Models
 Tracks training rounds and model aggregation
 """
+import numpy as np
 from django.db import models
 from hospitals.models import Hospital
 
+from . import compression
 
-class FederatedRound(models.Model):
+
+class WeightsMixin:
+    """Weight vectors are stored as raw little-endian float64 bytes."""
+
+    def get_weights(self):
+        if self.weights is None:
+            return None
+        return np.frombuffer(bytes(self.weights), dtype='<f8')
+
+    def set_weights(self, weights):
+        self.weights = np.ascontiguousarray(weights, dtype='<f8').tobytes()
+
+
+class FederatedRound(WeightsMixin, models.Model):
     """
     Represents a complete federated learning training round
     Tracks global model updates across all participating hospitals
     """
-    round_number = models.IntegerField(unique=True)
+    AGGREGATION_CHOICES = [
+        ('FedAvg', 'Federated Averaging'),
+        ('FedProx', 'Federated Proximal'),
+        ('TrimmedMean', 'Trimmed Mean'),
+        ('Median', 'Coordinate-wise Median'),
+    ]
+    UPDATE_CODEC_CHOICES = [
+        ('float64', 'Float64 (uncompressed)'),
+        ('float16', 'Float16'),
+        ('int8', '8-bit Quantization'),
+        ('topk', 'Top-k Sparse'),
+    ]
+    
+    round_number = models.IntegerField()
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_completed = models.BooleanField(default=False)
@@ -23,8 +51,20 @@ class FederatedRound(models.Model):
     
     description = models.TextField(blank=True, null=True)
     
+    # Global model produced by the round (see federated/rounds.py)
+    aggregation_method = models.CharField(max_length=20, choices=AGGREGATION_CHOICES, default='FedAvg')
+    model_version = models.CharField(max_length=50, blank=True, default='')
+    update_codec = models.CharField(max_length=10, choices=UPDATE_CODEC_CHOICES, default='float64')
+    weights = models.BinaryField(null=True, blank=True)
+    
+    # Rounds of simulate_fl are numbered separately and never continued from
+    is_simulation = models.BooleanField(default=False)
+    
     class Meta:
         ordering = ['-round_number']
+        constraints = [
+            models.UniqueConstraint(fields=['round_number', 'is_simulation'], name='unique_round_number'),
+        ]
         verbose_name = 'Federated Learning Round'
         verbose_name_plural = 'Federated Learning Rounds'
     
@@ -51,6 +91,11 @@ class LocalModel(models.Model):
     training_completed = models.DateTimeField(null=True, blank=True)
     is_uploaded = models.BooleanField(default=False)
     
+    # Encoded delta sent for aggregation (see federated/compression.py) and
+    # the error-feedback residual the hospital carries into its next round
+    update = models.BinaryField(null=True, blank=True)
+    residual = models.BinaryField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-training_started']
         verbose_name = 'Local Model'
@@ -58,3 +103,21 @@ class LocalModel(models.Model):
     
     def __str__(self):
         return f"{self.hospital.name} - Round {self.federated_round.round_number}"
+
+    def get_update(self):
+        """Decoded weight delta against the round's starting global weights."""
+        if self.update is None:
+            return None
+        return compression.decode(bytes(self.update))
+
+    def get_residual(self):
+        if self.residual is None:
+            return None
+        return np.frombuffer(bytes(self.residual), dtype='<f8')
+
+    def set_residual(self, residual):
+        # Lossless codecs leave nothing to carry over.
+        if residual is None or not np.any(residual):
+            self.residual = None
+        else:
+            self.residual = np.ascontiguousarray(residual, dtype='<f8').tobytes()
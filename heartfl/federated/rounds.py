@@ -0,0 +1,336 @@
+"""
+Federated Round Executor
+Trains each hospital's local model in a worker process and aggregates the weights
+
+A round starts from the previous round's global weights. Every
+participating hospital trains a logistic regression on its own
+HospitalDataset CSVs for a few epochs of mini-batch gradient descent, in its
+own worker process, and sends back only its encoded weight delta and
+sample count (float64 unless FL_UPDATE_CODEC selects a compressed codec,
+see compression.py). The coordinator combines the encoded deltas with the
+round's aggregation method (FedAvg by default, see aggregation.py) without
+unpacking them, evaluates the new global model on
+every hospital's data (again in the workers, so raw rows never leave them)
+and stores the global weights, per-hospital updates and metrics in the
+FederatedRound and LocalModel records. The global weights are also
+checkpointed in the model store under the round's model_version (see
+model_store.py). The part of a delta a lossy codec
+drops is kept as the hospital's residual and sent in its next round.
+
+Features are standardized with the mean and scale of ml_models/scaler.pkl,
+the scaler the serving model uses, so every hospital works in the same
+feature space. A weight vector is the 11 feature coefficients followed by
+the intercept.
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from hospitals.models import Hospital
+from prediction.batch_scoring import CSV_FEATURE_COLUMNS, encode_chunk
+
+from . import aggregation, compression
+from .model_store import get_model_store
+from .models import FederatedRound, LocalModel
+
+logger = logging.getLogger(__name__)
+
+LABEL_COLUMN = 'HeartDisease'
+WEIGHT_COUNT = len(CSV_FEATURE_COLUMNS) + 1
+
+TrainingConfig = namedtuple('TrainingConfig', ['epochs', 'learning_rate', 'batch_size', 'seed'])
+DEFAULT_CONFIG = TrainingConfig(epochs=2, learning_rate=0.1, batch_size=64, seed=0)
+
+# update is the encoded delta from the round's global weights and residual the
+# error feedback left for the next round; accuracy and loss are measured on
+# the hospital's own data after training.
+LocalUpdate = namedtuple(
+    'LocalUpdate', ['hospital_id', 'update', 'samples', 'accuracy', 'loss', 'seconds', 'residual'],
+    defaults=[None],
+)
+
+# Evaluation of the global weights on one hospital's data.
+Evaluation = namedtuple('Evaluation', ['hospital_id', 'samples', 'accuracy', 'loss'])
+
+
+def training_csvs(hospital):
+    """Paths of a hospital's dataset CSVs that carry the features and the label."""
+    paths = []
+    for dataset in hospital.datasets.all():
+        try:
+            path = dataset.dataset_file.path
+            with open(path, encoding='utf-8-sig') as f:
+                header = [column.strip() for column in f.readline().split(',')]
+        except (OSError, UnicodeDecodeError, ValueError):
+            continue
+        if all(column in header for column in CSV_FEATURE_COLUMNS + [LABEL_COLUMN]):
+            paths.append(path)
+    return paths
+
+
+def load_training_data(paths):
+    """(X, y) of one or more CSVs: float64 feature matrix and 0/1 labels, without rows that have missing values."""
+    frames = [pd.read_csv(path, usecols=CSV_FEATURE_COLUMNS + [LABEL_COLUMN]) for path in paths]
+    data = pd.concat(frames, ignore_index=True)
+    X = encode_chunk(data)
+    y = pd.to_numeric(data[LABEL_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+    keep = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+    return X[keep], y[keep]
+
+
+def feature_standardization():
+    """(mean, scale) of the serving scaler, or zeros and ones if it is not deployed."""
+    try:
+        with open(os.path.join(settings.BASE_DIR, 'ml_models', 'scaler.pkl'), 'rb') as f:
+            scaler = pickle.load(f)
+        return np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)
+    except Exception as exc:
+        logger.warning('Training on unscaled features (%s)', exc)
+        return np.zeros(len(CSV_FEATURE_COLUMNS)), np.ones(len(CSV_FEATURE_COLUMNS))
+
+
+def _sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def evaluate(weights, X, y):
+    """(accuracy, mean log loss) of a weight vector on standardized features."""
+    if not len(y):
+        return 0.0, 0.0
+    p = np.clip(_sigmoid(X @ weights[:-1] + weights[-1]), 1e-12, 1 - 1e-12)
+    loss = -np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))
+    accuracy = np.mean((p >= 0.5) == (y == 1))
+    return float(accuracy), float(loss)
+
+
+def sgd(weights, X, y, config):
+    """Mini-batch gradient descent on the logistic loss, starting from weights."""
+    weights = np.array(weights, dtype=np.float64)
+    rng = np.random.default_rng(config.seed)
+    for _ in range(config.epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(y), config.batch_size):
+            batch = order[start:start + config.batch_size]
+            error = _sigmoid(X[batch] @ weights[:-1] + weights[-1]) - y[batch]
+            weights[:-1] -= config.learning_rate * (X[batch].T @ error) / len(batch)
+            weights[-1] -= config.learning_rate * error.mean()
+    return weights
+
+
+def local_update(hospital_id, X, y, global_weights, config=DEFAULT_CONFIG, codec=compression.FLOAT64,
+                 topk_ratio=compression.DEFAULT_TOPK_RATIO, residual=None):
+    """Train from global_weights on standardized features and encode the delta with error feedback."""
+    started = time.perf_counter()
+    weights = sgd(global_weights, X, y, config)
+    accuracy, loss = evaluate(weights, X, y)
+    delta = weights - global_weights
+    if residual is not None:
+        delta += residual
+    update = compression.encode(delta, codec, topk_ratio)
+    residual = delta - compression.decode(update)
+    return LocalUpdate(hospital_id, update, len(y), accuracy, loss, time.perf_counter() - started, residual)
+
+
+def train_local(hospital_id, paths, global_weights, mean, scale, config=DEFAULT_CONFIG, codec=compression.FLOAT64,
+                topk_ratio=compression.DEFAULT_TOPK_RATIO, residual=None):
+    """Worker task: train on one hospital's CSVs and return its encoded LocalUpdate."""
+    started = time.perf_counter()
+    X, y = load_training_data(paths)
+    update = local_update(hospital_id, (X - mean) / scale, y, global_weights, config, codec, topk_ratio, residual)
+    return update._replace(seconds=time.perf_counter() - started)
+
+
+def evaluate_local(hospital_id, paths, weights, mean, scale):
+    """Worker task: evaluate global weights on one hospital's CSVs."""
+    X, y = load_training_data(paths)
+    accuracy, loss = evaluate(weights, (X - mean) / scale, y)
+    return Evaluation(hospital_id, len(y), accuracy, loss)
+
+
+def previous_round(simulation=False):
+    """The most recent completed round with global weights, or None before the first one."""
+    return (
+        FederatedRound.objects.filter(is_completed=True, weights__isnull=False, is_simulation=simulation)
+        .order_by('-round_number').first()
+    )
+
+
+def latest_global_weights():
+    """Weights of the most recent completed round, or zeros before the first one."""
+    fl_round = previous_round()
+    return fl_round.get_weights() if fl_round is not None else np.zeros(WEIGHT_COUNT)
+
+
+def new_pool(workers=None):
+    """Training pool of FL_TRAINING_WORKERS processes (every core if 0)."""
+    workers = workers or getattr(settings, 'FL_TRAINING_WORKERS', 0) or os.cpu_count() or 1
+    # spawn: forking a multi-threaded gunicorn worker is not safe. Workers
+    # load this module, which needs the app registry, so they set up Django
+    # from the inherited DJANGO_SETTINGS_MODULE first.
+    return ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def aggregate_updates(updates, method=aggregation.FEDAVG, previous=None):
+    """Global float64 weights from LocalUpdates whose deltas are against previous (zeros if None)."""
+    previous = np.zeros(WEIGHT_COUNT) if previous is None else previous
+    return compression.aggregate_encoded(
+        method,
+        [update.update for update in updates],
+        samples=[update.samples for update in updates],
+        previous=previous,
+        trim_ratio=getattr(settings, 'FL_TRIM_RATIO', aggregation.DEFAULT_TRIM_RATIO),
+        mu=getattr(settings, 'FL_PROXIMAL_MU', aggregation.DEFAULT_PROXIMAL_MU),
+    )
+
+
+def carried_residuals(fl_round, hospital_ids):
+    """hospital id -> error-feedback residual its LocalModel of fl_round left."""
+    if fl_round is None:
+        return {}
+    local_models = LocalModel.objects.filter(
+        federated_round=fl_round, hospital_id__in=hospital_ids, residual__isnull=False
+    )
+    residuals = {}
+    for local_model in local_models:
+        residual = local_model.get_residual()
+        if len(residual) == WEIGHT_COUNT:
+            residuals[local_model.hospital_id] = residual
+    return residuals
+
+
+def run_round(hospitals=None, config=DEFAULT_CONFIG, method=None, workers=None, executor=None, description='',
+              initial_weights=None, codec=None, simulation=False):
+    """
+    Run one federated round over every hospital with training data.
+
+    Args:
+        hospitals: Hospitals to invite (default: all)
+        config: TrainingConfig for local training
+        method: aggregation method (default: FL_AGGREGATION_METHOD)
+        workers: size of the pool started for the round
+        executor: existing process pool to use instead, e.g. across rounds
+        initial_weights: global weights to start from (default: the latest
+            completed round's)
+        codec: update codec hospitals send (default: FL_UPDATE_CODEC)
+        simulation: record a simulate_fl round, numbered and continued
+            separately from real rounds and checkpointed as fl-sim-round-<n>
+
+    Returns:
+        the completed FederatedRound; if training, aggregation or evaluation
+        fails, the round and its local models are deleted and the error is
+        raised
+    """
+    method = method or getattr(settings, 'FL_AGGREGATION_METHOD', aggregation.FEDAVG)
+    if method not in aggregation.AGGREGATION_METHODS:
+        raise ValueError(f'Unknown aggregation method {method!r}')
+    codec = codec or getattr(settings, 'FL_UPDATE_CODEC', compression.FLOAT64)
+    if codec not in compression.UPDATE_CODECS:
+        raise ValueError(f'Unknown update codec {codec!r}')
+    topk_ratio = getattr(settings, 'FL_TOPK_RATIO', compression.DEFAULT_TOPK_RATIO)
+    hospitals = list(hospitals if hospitals is not None else Hospital.objects.exclude_simulated().prefetch_related('datasets'))
+    participants = [(hospital, paths) for hospital in hospitals if (paths := training_csvs(hospital))]
+    if not participants:
+        raise ValueError('No hospital has a dataset with the feature and HeartDisease columns')
+
+    mean, scale = feature_standardization()
+    parent = previous_round(simulation)
+    if initial_weights is not None:
+        global_weights = np.asarray(initial_weights, np.float64)
+    else:
+        global_weights = parent.get_weights() if parent is not None else np.zeros(WEIGHT_COUNT)
+    with transaction.atomic():
+        rounds = FederatedRound.objects.filter(is_simulation=simulation)
+        last = rounds.aggregate(last=Max('round_number'))['last'] or 0
+        fl_round = FederatedRound.objects.create(
+            round_number=last + 1,
+            participating_hospitals=len(participants),
+            aggregation_method=method,
+            update_codec=codec,
+            model_version=f'fl-sim-round-{last + 1}' if simulation else f'fl-round-{last + 1}',
+            description=description,
+            is_simulation=simulation,
+        )
+    try:
+        local_models = {
+            hospital.pk: LocalModel.objects.create(
+                hospital=hospital, federated_round=fl_round, epochs_trained=config.epochs
+            )
+            for hospital, _ in participants
+        }
+        residuals = carried_residuals(parent, list(local_models))
+
+        own_executor = executor is None
+        executor = executor or new_pool(workers)
+        started = time.perf_counter()
+        try:
+            futures = [
+                executor.submit(
+                    train_local, hospital.pk, paths, global_weights, mean, scale, config, codec, topk_ratio,
+                    residuals.get(hospital.pk),
+                )
+                for hospital, paths in participants
+            ]
+            updates = []
+            for future in as_completed(futures):
+                update = future.result()
+                updates.append(update)
+                local_model = local_models[update.hospital_id]
+                local_model.accuracy = update.accuracy
+                local_model.loss = update.loss
+                local_model.training_samples = update.samples
+                local_model.training_completed = timezone.now()
+                local_model.is_uploaded = True
+                local_model.update = update.update
+                local_model.set_residual(update.residual)
+                local_model.save()
+
+            trained = [update for update in updates if update.samples]
+            if not trained:
+                raise ValueError('The participating datasets have no complete rows')
+            global_weights = aggregate_updates(trained, method, previous=global_weights)
+            futures = [
+                executor.submit(evaluate_local, hospital.pk, paths, global_weights, mean, scale)
+                for hospital, paths in participants
+            ]
+            evaluations = [future.result() for future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        samples = np.array([evaluation.samples for evaluation in evaluations], dtype=np.float64)
+        fl_round.global_accuracy = float(samples @ [evaluation.accuracy for evaluation in evaluations] / samples.sum())
+        fl_round.global_loss = float(samples @ [evaluation.loss for evaluation in evaluations] / samples.sum())
+        fl_round.set_weights(global_weights)
+        get_model_store().put(
+            fl_round.model_version, global_weights, parent=parent.model_version if parent is not None else None
+        )
+        fl_round.is_completed = True
+        fl_round.completed_at = timezone.now()
+        fl_round.save()
+    except BaseException:
+        # Leave no half-finished round behind to be taken as a previous round.
+        fl_round.delete()
+        raise
+
+    logger.info(
+        'FL round %d: %d hospitals, %d samples, accuracy %.4f in %.2fs',
+        fl_round.round_number, len(participants), int(samples.sum()), fl_round.global_accuracy,
+        time.perf_counter() - started,
+    )
+    return fl_round
@@ -0,0 +1,205 @@
+"""
+Federated Simulation
+Splits patient data into N non-IID synthetic hospitals and runs rounds end to end
+
+The three sample hospitals cannot show how rounds, aggregation and the
+dashboards behave with a hundred participants. A simulation pools the
+bundled hospital CSVs (or generated patients), partitions the rows into
+hospitals whose dataset sizes and disease prevalence differ, and registers
+each shard as a real Hospital with a HospitalDataset, so rounds.run_round()
+trains and records them exactly like real hospitals.
+
+Skew:
+- size skew:  shard sizes follow a lognormal distribution with sigma
+              size_skew (0 gives equal shards)
+- label skew: each hospital's share of HeartDisease=1 rows is drawn from
+              Beta(label_skew, label_skew); small values give hospitals that
+              see almost only one class, large values approach IID shards
+
+Simulated hospitals belong to users named fl-sim-<run>-<n>
+(hospitals.models.SIMULATION_USER_PREFIX), which real rounds and the
+hospital listings exclude. Their rounds are flagged is_simulation, numbered separately and checkpointed as
+fl-sim-round-<n>, so real rounds never continue from a simulated model, and
+clear_simulation() can remove them again along with their checkpoints.
+"""
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+
+from hospitals.models import SIMULATION_USER_PREFIX, Hospital, HospitalDataset
+from prediction.batch_scoring import CSV_FEATURE_COLUMNS, bundled_hospital_csvs
+
+from .model_store import collect_model_garbage
+from .models import FederatedRound
+from .compression import compression_ratio
+from .rounds import LABEL_COLUMN, WEIGHT_COUNT, run_round
+
+SIMULATION_DESCRIPTION = 'Simulation'
+# Shards smaller than this cannot both train and be evaluated meaningfully.
+MIN_SHARD_ROWS = 20
+
+# Per-round record of a simulation; seconds is wall-clock time of the round and
+# compression_ratio the raw float64 size of the uploaded updates over bytes_up.
+RoundReport = namedtuple('RoundReport', [
+    'round_number', 'hospitals', 'seconds', 'bytes_up', 'bytes_down', 'compression_ratio',
+    'global_accuracy', 'global_loss', 'local_accuracy_min', 'local_accuracy_max',
+])
+
+
+def synthetic_patients(rows, seed=0):
+    """Patients in the hospital CSV format whose label follows age, cholesterol and angina."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'Age': rng.integers(28, 78, rows),
+        'Sex': rng.choice(['M', 'F'], rows),
+        'ChestPainType': rng.choice(['ASY', 'ATA', 'NAP', 'TA'], rows),
+        'RestingBP': rng.integers(90, 190, rows),
+        'Cholesterol': rng.integers(120, 400, rows),
+        'FastingBS': rng.integers(0, 2, rows),
+        'RestingECG': rng.choice(['LVH', 'Normal', 'ST'], rows),
+        'MaxHR': rng.integers(70, 200, rows),
+        'ExerciseAngina': rng.choice(['N', 'Y'], rows),
+        'Oldpeak': rng.uniform(0, 6, rows).round(1),
+        'ST_Slope': rng.choice(['Down', 'Flat', 'Up'], rows),
+    })
+    risk = (data['Age'] - 53) / 14 + (data['Cholesterol'] - 260) / 80 + (data['ExerciseAngina'] == 'Y') * 1.5 - 0.75
+    data[LABEL_COLUMN] = (risk + rng.normal(0, 0.5, rows) > 0).astype(int)
+    return data
+
+
+def bundled_patients():
+    """Every labelled row of the bundled hospital CSVs."""
+    frames = []
+    for path in bundled_hospital_csvs():
+        header = pd.read_csv(path, nrows=0).columns
+        if LABEL_COLUMN in header:
+            frames.append(pd.read_csv(path, usecols=CSV_FEATURE_COLUMNS + [LABEL_COLUMN]))
+    if not frames:
+        raise ValueError('No bundled hospital CSV has a HeartDisease column')
+    return pd.concat(frames, ignore_index=True).dropna()
+
+
+def partition(data, hospitals, size_skew=1.0, label_skew=0.5, seed=0):
+    """
+    Split rows into disjoint non-IID shards.
+
+    Returns:
+        list of hospitals DataFrames, each with at least MIN_SHARD_ROWS rows
+    """
+    if hospitals * MIN_SHARD_ROWS > len(data):
+        raise ValueError(f'{len(data)} rows cannot fill {hospitals} hospitals of {MIN_SHARD_ROWS}+ rows')
+    rng = np.random.default_rng(seed)
+    shares = rng.lognormal(0.0, size_skew, hospitals) if size_skew > 0 else np.ones(hospitals)
+    spare = len(data) - hospitals * MIN_SHARD_ROWS
+    sizes = MIN_SHARD_ROWS + np.floor(shares / shares.sum() * spare).astype(int)
+    positive_share = rng.beta(label_skew, label_skew, hospitals)
+
+    labels = data[LABEL_COLUMN].to_numpy()
+    pools = [list(rng.permutation(np.flatnonzero(labels == label))) for label in (0, 1)]
+    shards = []
+    for size, share in zip(sizes, positive_share):
+        wanted_positive = min(int(round(size * share)), len(pools[1]))
+        wanted_negative = min(size - wanted_positive, len(pools[0]))
+        # One class ran out: fill the shard from the other.
+        wanted_positive = min(size - wanted_negative, len(pools[1]))
+        rows = pools[1][:wanted_positive] + pools[0][:wanted_negative]
+        del pools[1][:wanted_positive], pools[0][:wanted_negative]
+        shards.append(data.iloc[rows])
+    return shards
+
+
+def create_hospitals(shards, run_id):
+    """Register each shard as a Hospital with one HospitalDataset; returns the hospitals."""
+    hospitals = []
+    for index, shard in enumerate(shards, start=1):
+        name = f'{SIMULATION_USER_PREFIX}{run_id}-{index:04d}'
+        hospital = Hospital.objects.create(
+            user=User.objects.create_user(name),
+            name=f'Simulated Hospital {run_id}-{index:04d}',
+            address='Simulation', city='Simulation', state='Simulation', pincode='000000',
+            contact_number='0000000000', email=f'{name}@simulation.local',
+            registration_number=f'SIM-{run_id}-{index:04d}', is_verified=True,
+        )
+        dataset = HospitalDataset(hospital=hospital, num_records=len(shard), is_processed=True)
+        dataset.dataset_file.save(f'shard_{index:04d}.csv', ContentFile(shard.to_csv(index=False)), save=True)
+        hospitals.append(hospital)
+    return hospitals
+
+
+def round_traffic(fl_round):
+    """(bytes of encoded updates uploaded by hospitals, bytes of global weights sent to them) in a round."""
+    local_models = fl_round.local_models.all()
+    uploaded = sum(len(local.update or b'') for local in local_models)
+    downloaded = len(fl_round.weights or b'') * len(local_models)
+    return uploaded, downloaded
+
+
+def run_simulation(hospitals, rounds, data, size_skew=1.0, label_skew=0.5, method=None, config=None,
+                   executor=None, seed=0, progress=None, codec=None):
+    """
+    Partition data into simulated hospitals and run rounds over them,
+    starting from an all-zero global model.
+
+    Args:
+        progress: optional callable(RoundReport) called after each round
+
+    Returns:
+        list of RoundReport, one per round
+    """
+    shards = partition(data, hospitals, size_skew, label_skew, seed)
+    run_id = f'{int(time.time()) % 100000:05d}{os.getpid() % 100:02d}'
+    participants = create_hospitals(shards, run_id)
+
+    reports = []
+    global_weights = np.zeros(WEIGHT_COUNT)
+    for index in range(rounds):
+        kwargs = {'config': config._replace(seed=config.seed + index)} if config is not None else {}
+        started = time.perf_counter()
+        fl_round = run_round(
+            hospitals=participants, method=method, executor=executor, initial_weights=global_weights, codec=codec,
+            simulation=True,
+            description=f'{SIMULATION_DESCRIPTION} {run_id}: {hospitals} hospitals, '
+                        f'size skew {size_skew}, label skew {label_skew}',
+            **kwargs,
+        )
+        seconds = time.perf_counter() - started
+        global_weights = fl_round.get_weights()
+        bytes_up, bytes_down = round_traffic(fl_round)
+        local_models = list(fl_round.local_models.all())
+        local_accuracy = [local.accuracy for local in local_models]
+        report = RoundReport(
+            fl_round.round_number, len(participants), seconds, bytes_up, bytes_down,
+            compression_ratio([local.update for local in local_models]),
+            fl_round.global_accuracy, fl_round.global_loss, min(local_accuracy), max(local_accuracy),
+        )
+        reports.append(report)
+        if progress is not None:
+            progress(report)
+    return reports
+
+
+def clear_simulation():
+    """Delete simulated hospitals with their datasets, local models, rounds and checkpoints; returns the hospital count."""
+    datasets = HospitalDataset.objects.filter(hospital__user__username__startswith=SIMULATION_USER_PREFIX)
+    for dataset in datasets:
+        try:
+            directory = os.path.dirname(dataset.dataset_file.path)
+        except NotImplementedError:
+            directory = None
+        dataset.dataset_file.delete(save=False)
+        if directory:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+    FederatedRound.objects.filter(is_simulation=True).delete()
+    users = User.objects.filter(username__startswith=SIMULATION_USER_PREFIX)
+    count = users.count()
+    users.delete()
+    collect_model_garbage()
+    return count
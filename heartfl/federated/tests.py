@@ -1,8 +1,395 @@
 # Federated App Tests
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+
+from hospitals.models import Hospital, HospitalDataset
+from . import aggregation, compression, rounds
+from .benchmarks import aggregation_benchmark, compression_benchmark, loop_aggregate, simulated_updates
+from .model_store import ModelStore, collect_model_garbage, get_model_store, parse_header
+from .models import FederatedRound, LocalModel
+from .rounds import LABEL_COLUMN, LocalUpdate, WEIGHT_COUNT, aggregate_updates, new_pool, previous_round, run_round
+from .simulation import MIN_SHARD_ROWS, clear_simulation, partition, run_simulation, synthetic_patients
 
 
 class FederatedTest(TestCase):
     def test_federated_placeholder(self):
         """Placeholder test"""
         self.assertTrue(True)
+
+
+class FederatedRoundTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        for index, rows in enumerate((600, 200)):
+            hospital = Hospital.objects.create(
+                user=User.objects.create_user(f'hospital{index}'), name=f'Hospital {index}', address='1 Main St',
+                city='City', state='State', pincode='000000', contact_number='0000000000',
+                email=f'hospital{index}@hospital.local', registration_number=f'REG-FL-{index}',
+            )
+            dataset = HospitalDataset(hospital=hospital, num_records=rows)
+            dataset.dataset_file.save('patients.csv', ContentFile(synthetic_patients(rows, seed=index).to_csv(index=False)))
+        # A hospital whose only upload is not patient data is left out.
+        other = Hospital.objects.create(
+            user=User.objects.create_user('hospital-notes'), name='Notes Hospital', address='1 Main St',
+            city='City', state='State', pincode='000000', contact_number='0000000000',
+            email='notes@hospital.local', registration_number='REG-FL-notes',
+        )
+        HospitalDataset(hospital=other).dataset_file.save('notes.csv', ContentFile('Study,Year\nFedAvg,2024\n'))
+
+        self.executor = new_pool(1)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_fedavg_weights_by_samples(self):
+        """Test FedAvg weights each hospital's vector by its sample count"""
+        updates = [
+            LocalUpdate(1, compression.encode(np.zeros(WEIGHT_COUNT)), 300, 0, 0, 0),
+            LocalUpdate(2, compression.encode(np.ones(WEIGHT_COUNT)), 100, 0, 0, 0),
+        ]
+        np.testing.assert_allclose(aggregate_updates(updates), np.full(WEIGHT_COUNT, 0.25))
+
+    def test_round_trains_and_aggregates(self):
+        """Test a round stores every hospital's update and the averaged global model"""
+        fl_round = run_round(executor=self.executor)
+        self.assertTrue(fl_round.is_completed)
+        self.assertEqual((fl_round.round_number, fl_round.participating_hospitals), (1, 2))
+        self.assertEqual(fl_round.model_version, 'fl-round-1')
+        self.assertGreater(fl_round.global_accuracy, 0.7)
+
+        local_models = list(LocalModel.objects.filter(federated_round=fl_round).order_by('-training_samples'))
+        self.assertEqual([local.training_samples for local in local_models], [600, 200])
+        self.assertTrue(all(local.is_uploaded for local in local_models))
+        expected = aggregate_updates([
+            LocalUpdate(local.hospital_id, bytes(local.update), local.training_samples, 0, 0, 0)
+            for local in local_models
+        ])
+        stored = FederatedRound.objects.get(pk=fl_round.pk).get_weights()
+        np.testing.assert_allclose(stored, expected)
+        self.assertEqual(fl_round.aggregation_method, 'FedAvg')
+
+    def test_next_round_starts_from_global_model(self):
+        """Test later rounds continue from the previous global weights and lower the loss"""
+        first = run_round(executor=self.executor)
+        second = run_round(executor=self.executor)
+        self.assertEqual(second.round_number, 2)
+        self.assertLessEqual(second.global_loss, first.global_loss)
+
+    def test_failed_round_is_removed(self):
+        """Test a round that fails while aggregating leaves no round or local models behind"""
+        with mock.patch('federated.rounds.aggregate_updates', side_effect=RuntimeError('aggregation failed')):
+            with self.assertRaises(RuntimeError):
+                run_round(executor=self.executor)
+        self.assertFalse(FederatedRound.objects.exists())
+        self.assertFalse(LocalModel.objects.exists())
+        self.assertEqual(run_round(executor=self.executor).round_number, 1)
+
+    def test_incomplete_rounds_are_not_previous_rounds(self):
+        """Test the next round starts from the last completed round, not a later unfinished one"""
+        first = run_round(codec=compression.TOPK, executor=self.executor)
+        FederatedRound.objects.create(round_number=2, model_version='fl-round-2')
+        self.assertEqual(previous_round(), first)
+
+        with mock.patch('federated.rounds.carried_residuals', wraps=rounds.carried_residuals) as carried:
+            third = run_round(codec=compression.TOPK, executor=self.executor)
+        self.assertEqual(third.round_number, 3)
+        self.assertEqual(carried.call_args.args[0], first)
+        self.assertEqual(first.local_models.filter(residual__isnull=False).count(), 2)
+        np.testing.assert_array_equal(get_model_store().get('fl-round-3'), third.get_weights())
+
+    def test_round_uses_requested_method(self):
+        """Test the round aggregates and records the requested method"""
+        fl_round = run_round(method=aggregation.MEDIAN, executor=self.executor)
+        self.assertEqual(FederatedRound.objects.get(pk=fl_round.pk).aggregation_method, 'Median')
+        with self.assertRaises(ValueError):
+            run_round(method='Mean', executor=self.executor)
+
+    def test_compressed_round_carries_residual(self):
+        """Test a top-k round sends smaller updates and hands its residual to the next round"""
+        first = run_round(codec=compression.TOPK, executor=self.executor)
+        self.assertEqual(FederatedRound.objects.get(pk=first.pk).update_codec, 'topk')
+        local_models = list(first.local_models.all())
+        for local in local_models:
+            self.assertLess(len(local.update), WEIGHT_COUNT * 8)
+            self.assertEqual(np.count_nonzero(local.get_update()), compression.topk_count(WEIGHT_COUNT))
+            # Sent coordinates leave only float32 rounding behind.
+            dropped = np.abs(local.get_residual()) > 1e-6
+            self.assertEqual(np.count_nonzero(dropped), WEIGHT_COUNT - compression.topk_count(WEIGHT_COUNT))
+        self.assertGreater(first.global_accuracy, 0.6)
+
+        second = run_round(codec=compression.FLOAT64, executor=self.executor)
+        # The lossless round sends the carried residual along with the new delta.
+        for local in second.local_models.all():
+            self.assertIsNone(local.residual)
+            self.assertEqual(np.count_nonzero(local.get_update()), WEIGHT_COUNT)
+        with self.assertRaises(ValueError):
+            run_round(codec='zip', executor=self.executor)
+
+    def test_rounds_are_checkpointed(self):
+        """Test each round's global weights can be loaded from the model store by version"""
+        first = run_round(executor=self.executor)
+        second = run_round(executor=self.executor)
+        store = get_model_store()
+        for fl_round in (first, second):
+            np.testing.assert_array_equal(store.get(fl_round.model_version), fl_round.get_weights())
+
+        first.delete()
+        self.assertEqual(collect_model_garbage(dry_run=True)[:2], (1, 1))
+        self.assertEqual(collect_model_garbage()[:2], (1, 1))
+        self.assertEqual(store.versions(), ['fl-round-2'])
+        np.testing.assert_array_equal(store.get('fl-round-2'), second.get_weights())
+
+
+class AggregationTest(TestCase):
+    def test_methods_match_python_loop(self):
+        """Test every vectorized method matches the per-parameter loop it replaces"""
+        for clients in (1, 10, 11):
+            vectors, samples = simulated_updates(clients, 50, seed=clients)
+            stacked = aggregation.stack_updates(vectors)
+            self.assertTrue(stacked.flags['C_CONTIGUOUS'])
+            self.assertEqual((stacked.shape, stacked.dtype), ((clients, 50), np.float32))
+            for method in aggregation.AGGREGATION_METHODS:
+                expected = loop_aggregate(method, vectors, samples.tolist(), vectors[0])
+                actual = aggregation.aggregate(method, stacked, samples, previous=vectors[0])
+                np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5, err_msg=f'{method} {clients}')
+
+    def test_robust_methods_ignore_outlier(self):
+        """Test median and trimmed mean are not moved by one corrupted hospital"""
+        stacked = aggregation.stack_updates([np.ones(4)] * 9 + [np.full(4, 1e6)])
+        samples = [10] * 10
+        self.assertGreater(aggregation.aggregate('FedAvg', stacked, samples)[0], 1e4)
+        np.testing.assert_allclose(aggregation.aggregate('Median', stacked, samples), np.ones(4))
+        np.testing.assert_allclose(aggregation.aggregate('TrimmedMean', stacked, samples), np.ones(4))
+
+    def test_fedprox_blends_previous_model(self):
+        """Test FedProx pulls the average towards the previous global weights"""
+        stacked = aggregation.stack_updates([np.ones(3), np.ones(3)])
+        blended = aggregation.aggregate('FedProx', stacked, [1, 1], previous=np.zeros(3), mu=1.0)
+        np.testing.assert_allclose(blended, np.full(3, 0.5))
+
+    def test_model_choices_match_methods(self):
+        """Test FederatedRound offers exactly the implemented methods"""
+        self.assertEqual(
+            [choice for choice, _ in FederatedRound.AGGREGATION_CHOICES], list(aggregation.AGGREGATION_METHODS)
+        )
+
+    def test_benchmark_reports_each_method(self):
+        """Test the aggregation benchmark times every method with and without the loop"""
+        results = aggregation_benchmark(clients=(10,), params=(12,), min_seconds=0.001)
+        for timing in results['10x12']['methods'].values():
+            self.assertGreater(timing['vectorized_ms'], 0)
+            self.assertIsNotNone(timing['loop_ms'])
+
+
+class SimulationTest(TestCase):
+    def test_partition_is_disjoint_and_skewed(self):
+        """Test shards split the rows without overlap, with skewed sizes and disease shares"""
+        data = synthetic_patients(5000)
+        shards = partition(data, 40, size_skew=1.0, label_skew=0.2)
+        indexes = np.concatenate([shard.index.to_numpy() for shard in shards])
+        self.assertEqual(len(indexes), len(set(indexes)))
+        sizes = [len(shard) for shard in shards]
+        self.assertGreaterEqual(min(sizes), MIN_SHARD_ROWS)
+        self.assertGreater(max(sizes), 3 * np.median(sizes))
+
+        skewed = np.std([shard[LABEL_COLUMN].mean() for shard in shards])
+        near_iid = np.std([shard[LABEL_COLUMN].mean() for shard in partition(data, 40, 0.0, 100.0)])
+        self.assertGreater(skewed, 3 * near_iid)
+        with self.assertRaises(ValueError):
+            partition(data, 1000)
+
+    def test_simulation_records_rounds_and_clears(self):
+        """Test a simulation records every round with traffic and can be removed again"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        executor = new_pool(1)
+        self.addCleanup(executor.shutdown)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            reports = run_simulation(6, 2, synthetic_patients(1200), executor=executor)
+            self.assertEqual([report.round_number for report in reports], [1, 2])
+            self.assertEqual(reports[0].bytes_up, 6 * len(compression.encode(np.zeros(WEIGHT_COUNT))))
+            self.assertEqual(reports[0].bytes_down, 6 * WEIGHT_COUNT * 8)
+            self.assertEqual(LocalModel.objects.count(), 12)
+            self.assertLess(reports[1].global_loss, reports[0].global_loss)
+
+            # Real rounds are numbered and continued separately from the simulation.
+            self.assertEqual(FederatedRound.objects.get(round_number=2).model_version, 'fl-sim-round-2')
+            self.assertIsNone(previous_round())
+            simulated = list(Hospital.objects.all())
+            with mock.patch('federated.rounds.carried_residuals', wraps=rounds.carried_residuals) as carried:
+                real = run_round(hospitals=simulated, executor=executor)
+            self.assertEqual((real.round_number, real.model_version, real.is_simulation), (1, 'fl-round-1', False))
+            self.assertIsNone(carried.call_args.args[0])
+            self.assertEqual(previous_round(), real)
+            self.assertEqual(previous_round(simulation=True).round_number, 2)
+
+            self.assertEqual(clear_simulation(), 6)
+            self.assertEqual(list(FederatedRound.objects.all()), [real])
+            self.assertEqual(get_model_store().versions(), ['fl-round-1'])
+        self.assertFalse(Hospital.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(media_root, 'hospital_datasets')), [])
+
+    def test_real_rounds_leave_out_simulated_hospitals(self):
+        """Test a round after a simulation trains only the real hospitals"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        executor = new_pool(1)
+        self.addCleanup(executor.shutdown)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            hospital = Hospital.objects.create(
+                user=User.objects.create_user('hospital-real'), name='Real Hospital', address='1 Main St',
+                city='City', state='State', pincode='000000', contact_number='0000000000',
+                email='real@hospital.local', registration_number='REG-FL-real',
+            )
+            dataset = HospitalDataset(hospital=hospital, num_records=300)
+            dataset.dataset_file.save('patients.csv', ContentFile(synthetic_patients(300, seed=7).to_csv(index=False)))
+            run_simulation(4, 1, synthetic_patients(800), executor=executor)
+
+            real = run_round(executor=executor)
+        self.assertEqual(real.participating_hospitals, 1)
+        self.assertEqual(list(real.local_models.values_list('hospital', flat=True)), [hospital.pk])
+        self.assertEqual(list(Hospital.objects.exclude_simulated()), [hospital])
+        self.assertEqual(Hospital.objects.count(), 5)
+
+
+class CompressionTest(TestCase):
+    def test_codecs_round_trip(self):
+        """Test each codec decodes close to the delta and stays within its size"""
+        delta = np.random.default_rng(0).normal(0, 0.1, 1000)
+        tolerances = {'float64': 0, 'float16': 1e-3, 'int8': (delta.max() - delta.min()) / 254}
+        for codec, tolerance in tolerances.items():
+            encoded = compression.encode(delta, codec)
+            self.assertLessEqual(np.abs(compression.decode(encoded) - delta).max(), tolerance * 1.01, codec)
+        self.assertAlmostEqual(compression.compression_ratio(compression.encode(delta, 'int8')), 8000 / 1013)
+
+        decoded = compression.decode(compression.encode(delta, 'topk', topk_ratio=0.05))
+        kept = np.flatnonzero(decoded)
+        self.assertEqual(len(kept), 50)
+        self.assertGreaterEqual(np.abs(delta[kept]).min(), np.abs(np.delete(delta, kept)).max())
+        np.testing.assert_allclose(decoded[kept], delta[kept], rtol=1e-6)
+
+    def test_encoded_aggregation_matches_decoded(self):
+        """Test aggregating encoded updates equals aggregating the decoded weights"""
+        vectors, samples = simulated_updates(11, 40, seed=3)
+        previous = vectors[0]
+        codecs = [compression.UPDATE_CODECS[index % 4] for index in range(11)]
+        encoded = [compression.encode(vector - previous, codec) for vector, codec in zip(vectors, codecs)]
+        stacked = aggregation.stack_updates([previous + compression.decode(blob) for blob in encoded])
+        for method in aggregation.AGGREGATION_METHODS:
+            expected = aggregation.aggregate(method, stacked, samples, previous=previous)
+            actual = compression.aggregate_encoded(method, encoded, samples, previous=previous)
+            np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5, err_msg=method)
+
+    def test_float64_updates_aggregate_exactly(self):
+        """Test the lossless codec keeps every float64 digit through each aggregation method"""
+        delta = np.random.default_rng(1).normal(0, 1, 100) * np.pi
+        encoded = [compression.encode(delta)] * 3
+        for method in aggregation.AGGREGATION_METHODS:
+            np.testing.assert_array_equal(
+                compression.aggregate_encoded(method, encoded[:1], [7]), delta, err_msg=method
+            )
+        np.testing.assert_array_equal(compression.weighted_sum(encoded[:2], [0.5, 0.5]), delta)
+        np.testing.assert_array_equal(compression.aggregate_encoded('Median', encoded, [1, 2, 3]), delta)
+
+    def test_invalid_updates_rejected(self):
+        """Test truncated, mismatched and unknown updates raise ValueError"""
+        encoded = compression.encode(np.ones(10), 'int8')
+        for updates in ([encoded[:-1]], [encoded, compression.encode(np.ones(9))], [b'\x09' + encoded[1:]], []):
+            with self.assertRaises(ValueError):
+                compression.decode_stacked(updates)
+        with self.assertRaises(ValueError):
+            compression.encode(np.ones(3), 'zip')
+
+    def test_model_choices_match_codecs(self):
+        """Test FederatedRound offers exactly the implemented codecs"""
+        self.assertEqual(
+            [choice for choice, _ in FederatedRound.UPDATE_CODEC_CHOICES], list(compression.UPDATE_CODECS)
+        )
+
+    def test_benchmark_reports_accuracy_change(self):
+        """Test the compression benchmark compares every codec against float64 per round"""
+        results = compression_benchmark(hospitals=5, rounds=3, rows=1000)
+        self.assertEqual(results['update_sizes'][10000]['int8'][0], 10000 + 13)
+        for codec, round_results in results['rounds'].items():
+            self.assertEqual(len(round_results), 3)
+            self.assertTrue(all(0 < result['accuracy'] <= 1 for result in round_results))
+        self.assertEqual(results['rounds']['float64'][-1]['accuracy_change'], 0)
+        self.assertGreater(results['rounds']['topk'][0]['compression_ratio'], 4)
+
+
+class ModelStoreTest(TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.store = ModelStore(FileSystemStorage(location), snapshot_interval=3)
+        rng = np.random.default_rng(0)
+        self.weights = [rng.normal(0, 1, 1000)]
+        for _ in range(5):
+            self.weights.append(self.weights[-1] + rng.normal(0, 1e-4, 1000))
+
+    def put_rounds(self):
+        for index, weights in enumerate(self.weights, start=1):
+            self.store.put(f'round-{index}', weights, parent=f'round-{index - 1}' if index > 1 else None)
+
+    def test_rounds_rebuild_exactly_from_snapshots_and_deltas(self):
+        """Test later checkpoints are smaller deltas and every version loads bit-for-bit"""
+        self.put_rounds()
+        sizes = [len(self.store.get_blob(self.store.resolve(f'round-{index}'))) for index in range(1, 7)]
+        # Snapshots at rounds 1 and 4, deltas against them in between.
+        self.assertLess(max(sizes[1], sizes[2], sizes[4], sizes[5]), min(sizes[0], sizes[3]))
+        for index, weights in enumerate(self.weights, start=1):
+            np.testing.assert_array_equal(self.store.get(f'round-{index}'), weights)
+        self.assertIsNone(self.store.get('round-7'))
+
+    def test_small_models_are_stored_as_snapshots(self):
+        """Test models below DELTA_MIN_WEIGHTS never pay for a delta's base digest"""
+        small = [weights[:WEIGHT_COUNT] for weights in self.weights]
+        for index, weights in enumerate(small, start=1):
+            self.store.put(f'small-{index}', weights, parent=f'small-{index - 1}' if index > 1 else None)
+        for index, weights in enumerate(small, start=1):
+            _, _, depth, base_digest = parse_header(self.store.get_blob(self.store.resolve(f'small-{index}')))
+            self.assertEqual((depth, base_digest), (0, None))
+            np.testing.assert_array_equal(self.store.get(f'small-{index}'), weights)
+
+    def test_identical_weights_share_a_blob(self):
+        """Test content addressing stores the same weights once"""
+        first = self.store.put('a', self.weights[0])
+        self.assertEqual(self.store.put('b', self.weights[0]), first)
+        self.assertEqual(self.store.blobs(), [first])
+        self.assertEqual(self.store.versions(), ['a', 'b'])
+
+    def test_corrupt_blobs_and_bad_versions_rejected(self):
+        """Test a blob that no longer matches its digest is refused"""
+        # Only snapshots that deltas were built on are cached, so this one is read.
+        digest = self.store.put('a', self.weights[-1])
+        name = self.store._blob_name(digest)
+        self.store.storage.delete(name)
+        self.store.storage.save(name, ContentFile(b'HFMS' + bytes(100)))
+        with self.assertRaises(ValueError):
+            self.store.load_digest(digest)
+        with self.assertRaises(ValueError):
+            self.store.put('../a', self.weights[0])
+
+    def test_garbage_collection_keeps_bases(self):
+        """Test collection drops unreferenced versions but keeps the snapshots kept deltas need"""
+        self.put_rounds()
+        self.assertEqual(len(self.store.blobs()), 6)
+        refs, blobs, freed = self.store.collect_garbage(['round-3', 'round-6'])
+        self.assertEqual((refs, blobs), (4, 2))
+        self.assertGreater(freed, 0)
+        self.assertEqual(len(self.store.blobs()), 4)
+        for index in (3, 6):
+            np.testing.assert_array_equal(self.store.get(f'round-{index}'), self.weights[index - 1])
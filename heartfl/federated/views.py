@@ -16,12 +16,12 @@ def fl_dashboard(request):
     Visualizes the FL process: data upload, local training, aggregation, global model
     """
     # Get FL statistics
-    total_hospitals = Hospital.objects.count()
-    total_datasets = HospitalDataset.objects.count()
+    total_hospitals = Hospital.objects.exclude_simulated().count()
+    total_datasets = HospitalDataset.objects.exclude_simulated().count()
     total_predictions = PredictionResult.objects.count()
     
     # Get hospitals with datasets
-    hospitals = Hospital.objects.all()
+    hospitals = Hospital.objects.exclude_simulated()
     hospitals_data = []
     for hospital in hospitals:
         hospitals_data.append({
@@ -32,7 +32,7 @@ def fl_dashboard(request):
         })
     
     # Get federated rounds
-    fl_rounds = FederatedRound.objects.all()[:5]  # Latest 5 rounds
+    fl_rounds = FederatedRound.objects.filter(is_simulation=False)[:5]  # Latest 5 rounds
     
     # FL process steps
     fl_steps = [
@@ -89,8 +89,8 @@ def fl_dashboard(request):
 @login_required
 def fl_visualization(request):
     """Detailed FL visualization with charts"""
-    hospitals = Hospital.objects.all()
-    fl_rounds = FederatedRound.objects.all()
+    hospitals = Hospital.objects.exclude_simulated()
+    fl_rounds = FederatedRound.objects.filter(is_simulation=False)
     
     context = {
         'page_title': 'FL Visualization - HeartFL',
@@ -51,8 +51,29 @@ def pre_exec(server):
 
 def when_ready(server):
     """Handle when server is ready"""
+    if os.environ.get('HEARTFL_PRELOAD_MODEL', '1') == '1':
+        _preload_prediction_model(server)
     print("🚀 Gunicorn server is ready. Spawning workers")
 
+def _preload_prediction_model(server):
+    """
+    Load the prediction model in the master so forked workers share its
+    pages copy-on-write instead of each unpickling it on first request.
+    """
+    import gc
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'heartfl.settings')
+    try:
+        import django
+        django.setup()
+        from prediction.model_registry import registry
+        registry.preload()
+        # Keep the preloaded objects out of the collector's reach so workers
+        # do not dirty the shared pages while scanning them.
+        gc.freeze()
+        server.log.info("Prediction model preloaded: %s", registry.stats())
+    except Exception as exc:
+        server.log.warning("Prediction model preload failed: %s", exc)
+
 def worker_int(worker):
     """Handle SIGTERM"""
     pass
@@ -31,11 +31,11 @@ class HeartFLAdminSite(admin.AdminSite):
             
             extra_context.update({
                 'total_users': User.objects.count(),
-                'total_hospitals': Hospital.objects.count(),
-                'verified_hospitals': Hospital.objects.filter(is_verified=True).count(),
+                'total_hospitals': Hospital.objects.exclude_simulated().count(),
+                'verified_hospitals': Hospital.objects.exclude_simulated().filter(is_verified=True).count(),
                 'total_doctors': Doctor.objects.count(),
                 'active_doctors': Doctor.objects.filter(is_active=True).count(),
-                'total_datasets': HospitalDataset.objects.count(),
+                'total_datasets': HospitalDataset.objects.exclude_simulated().count(),
                 'unread_messages': ContactMessage.objects.filter(is_read=False).count(),
                 'total_profiles': UserProfile.objects.count(),
             })
@@ -117,6 +117,74 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Model hot reload (see prediction/model_watcher.py)
+# Seconds between checks of ml_models/ for a retrained model; 0 disables
+PREDICTION_MODEL_WATCH_INTERVAL = float(os.getenv('PREDICTION_MODEL_WATCH_INTERVAL', '5'))
+
+# Prediction micro-batching (see prediction/micro_batcher.py)
+# Only useful with threaded workers, e.g. gunicorn --worker-class gthread
+PREDICTION_MICROBATCH_ENABLED = os.getenv('PREDICTION_MICROBATCH_ENABLED', 'False') == 'True'
+PREDICTION_MICROBATCH_MAX_SIZE = int(os.getenv('PREDICTION_MICROBATCH_MAX_SIZE', '64'))
+PREDICTION_MICROBATCH_MAX_WAIT_MS = float(os.getenv('PREDICTION_MICROBATCH_MAX_WAIT_MS', '2'))
+# Seconds a request waits for its batch to be scored before failing
+PREDICTION_MICROBATCH_TIMEOUT = float(os.getenv('PREDICTION_MICROBATCH_TIMEOUT', '10'))
+
+# Prediction result cache (see prediction/result_cache.py)
+# Backend: 'local' (in-process LRU), 'django' (CACHES[PREDICTION_CACHE_ALIAS]) or 'none'
+PREDICTION_CACHE_BACKEND = os.getenv('PREDICTION_CACHE_BACKEND', 'local')
+PREDICTION_CACHE_ALIAS = os.getenv('PREDICTION_CACHE_ALIAS', 'default')
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', '10000'))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '3600'))
+
+# PDF OCR (see prediction/ocr.py)
+# Pool size is capped so OCR cannot starve prediction traffic of CPU
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+OCR_DOCUMENT_TIMEOUT = float(os.getenv('OCR_DOCUMENT_TIMEOUT', '25'))
+# Adaptive resolution: read scanned pages at OCR_FAST_DPI first and render
+# again at OCR_DPI only when digit confidence is below OCR_MIN_CONFIDENCE
+OCR_ADAPTIVE = os.getenv('OCR_ADAPTIVE', 'True') == 'True'
+OCR_DPI = int(os.getenv('OCR_DPI', '300'))
+OCR_FAST_DPI = int(os.getenv('OCR_FAST_DPI', '150'))
+OCR_MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', '70'))
+# Report uploads are streamed to disk; larger files or longer documents are rejected
+OCR_MAX_UPLOAD_BYTES = int(os.getenv('OCR_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '50'))
+
+# Background OCR jobs (see prediction/ocr_jobs.py); run outside the request,
+# so they get a longer budget than OCR_DOCUMENT_TIMEOUT
+OCR_JOB_WORKERS = int(os.getenv('OCR_JOB_WORKERS', '2'))
+OCR_JOB_TIMEOUT = float(os.getenv('OCR_JOB_TIMEOUT', '300'))
+
+# OCR result cache (see prediction/ocr_cache.py); an empty OCR_CACHE_DIR disables it.
+# Entries hold report text, so they expire after OCR_CACHE_TTL seconds
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR', str(BASE_DIR / 'cache' / 'ocr'))
+OCR_CACHE_MAX_BYTES = int(os.getenv('OCR_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+OCR_CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', '86400'))
+
+# Rendered report cache (see prediction/report_cache.py); PDFs are kept in the
+# default file storage under REPORT_CACHE_PREFIX and served with an ETag
+REPORT_CACHE_ENABLED = os.getenv('REPORT_CACHE_ENABLED', 'True') == 'True'
+REPORT_CACHE_PREFIX = os.getenv('REPORT_CACHE_PREFIX', 'report_cache')
+# Bulk report export (see prediction/report_export.py) renders on its own pool
+REPORT_EXPORT_WORKERS = int(os.getenv('REPORT_EXPORT_WORKERS', str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+
+# Federated rounds (see federated/rounds.py); local models train one hospital
+# per process, 0 uses every core
+FL_TRAINING_WORKERS = int(os.getenv('FL_TRAINING_WORKERS', '0'))
+# Aggregation (see federated/aggregation.py): FedAvg, FedProx, TrimmedMean or Median
+FL_AGGREGATION_METHOD = os.getenv('FL_AGGREGATION_METHOD', 'FedAvg')
+FL_TRIM_RATIO = float(os.getenv('FL_TRIM_RATIO', '0.1'))
+FL_PROXIMAL_MU = float(os.getenv('FL_PROXIMAL_MU', '0.1'))
+# Update codec hospitals send (see federated/compression.py): float64, float16,
+# int8 or topk; FL_TOPK_RATIO is the share of coordinates a topk update keeps
+FL_UPDATE_CODEC = os.getenv('FL_UPDATE_CODEC', 'float64')
+FL_TOPK_RATIO = float(os.getenv('FL_TOPK_RATIO', '0.1'))
+# Global model checkpoints (see federated/model_store.py) in the default file
+# storage; a full snapshot every FL_MODEL_SNAPSHOT_INTERVAL checkpoints, deltas between
+FL_MODEL_STORE_PREFIX = os.getenv('FL_MODEL_STORE_PREFIX', 'model_store')
+FL_MODEL_SNAPSHOT_INTERVAL = int(os.getenv('FL_MODEL_SNAPSHOT_INTERVAL', '10'))
+
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -6,12 +6,28 @@ from django.db import models
 from django.contrib.auth.models import User
 import os
 
+# Usernames of the hospitals federated.simulation registers; they take part
+# in simulated rounds only and are left out of real rounds and listings.
+SIMULATION_USER_PREFIX = 'fl-sim-'
+
 
 def hospital_dataset_path(instance, filename):
     """Generate upload path for hospital datasets"""
     return f'hospital_datasets/{instance.hospital.name}/{filename}'
 
 
+class HospitalQuerySet(models.QuerySet):
+    def exclude_simulated(self):
+        """Hospitals other than the ones a federated simulation registered."""
+        return self.exclude(user__username__startswith=SIMULATION_USER_PREFIX)
+
+
+class HospitalDatasetQuerySet(models.QuerySet):
+    def exclude_simulated(self):
+        """Datasets other than the shards of simulated hospitals."""
+        return self.exclude(hospital__user__username__startswith=SIMULATION_USER_PREFIX)
+
+
 class Hospital(models.Model):
     """
     Hospital model representing a federated learning node
@@ -29,6 +45,8 @@ class Hospital(models.Model):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = HospitalQuerySet.as_manager()
     
     class Meta:
         ordering = ['name']
@@ -56,6 +74,8 @@ class HospitalDataset(models.Model):
     num_records = models.IntegerField(default=0, help_text="Number of patient records")
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_processed = models.BooleanField(default=False)
+
+    objects = HospitalDatasetQuerySet.as_manager()
     
     class Meta:
         ordering = ['-uploaded_at']
@@ -3,7 +3,7 @@ Prediction App Admin
 """
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PatientData, PredictionResult
+from .models import OCRJob, PatientData, PredictionResult
 from heartfl.admin import heartfl_admin_site
 
 
@@ -72,6 +72,15 @@ class PredictionResultAdmin(admin.ModelAdmin):
     )
 
 
+class OCRJobAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'user', 'status', 'pages_done', 'pages_total', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['file_name', 'user__username']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'finished_at']
+    date_hierarchy = 'created_at'
+
+
 # Register with custom admin site
 heartfl_admin_site.register(PatientData, PatientDataAdmin)
 heartfl_admin_site.register(PredictionResult, PredictionResultAdmin)
+heartfl_admin_site.register(OCRJob, OCRJobAdmin)
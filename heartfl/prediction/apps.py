@@ -5,3 +5,7 @@ class PredictionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prediction'
     verbose_name = 'Heart Disease Prediction'
+
+    def ready(self):
+        # Connects the signals that drop cached report PDFs
+        from . import report_cache  # noqa: F401
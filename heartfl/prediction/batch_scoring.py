@@ -0,0 +1,148 @@
+"""
+Bulk CSV Scoring
+Streams hospital datasets through the predictor chunk by chunk
+
+Hospital CSVs use the raw training-set columns (Sex=M/F, ChestPainType=ASY/NAP/...,
+ST_Slope=Flat/...). Each chunk is mapped to the model's integer encoding and
+scored with a single predict_many call, then written back out as CSV, so the
+whole file never has to be held in memory.
+"""
+import glob
+import io
+import logging
+import os
+import pickle
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Raw CSV columns in model feature order.
+CSV_FEATURE_COLUMNS = [
+    'Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS',
+    'RestingECG', 'MaxHR', 'ExerciseAngina', 'Oldpeak', 'ST_Slope',
+]
+
+# LabelEncoder classes used in training (alphabetical order), used when
+# ml_models/label_encoders.pkl is not deployed alongside the model.
+DEFAULT_CATEGORY_ENCODINGS = {
+    'Sex': {'F': 0, 'M': 1},
+    'ChestPainType': {'ASY': 0, 'ATA': 1, 'NAP': 2, 'TA': 3},
+    'RestingECG': {'LVH': 0, 'Normal': 1, 'ST': 2},
+    'ExerciseAngina': {'N': 0, 'Y': 1},
+    'ST_Slope': {'Down': 0, 'Flat': 1, 'Up': 2},
+}
+
+
+@lru_cache(maxsize=1)
+def category_encodings():
+    """Categorical value -> integer code for each column, as seen by the model."""
+    encoders_path = os.path.join(settings.BASE_DIR, 'ml_models', 'label_encoders.pkl')
+    try:
+        with open(encoders_path, 'rb') as f:
+            encoders = pickle.load(f)
+        return {
+            column: {str(value): index for index, value in enumerate(encoder.classes_)}
+            for column, encoder in encoders.items()
+        }
+    except Exception as exc:
+        logger.info('Using default category encodings (%s)', exc)
+        return DEFAULT_CATEGORY_ENCODINGS
+
+
+def bundled_hospital_csvs():
+    """
+    Patient-level CSVs under MEDIA_ROOT (hospital_datasets/ and datasets/)
+    that carry the model's feature columns. Used to validate and benchmark
+    the scoring path on real hospital data.
+    """
+    patterns = [
+        os.path.join(settings.MEDIA_ROOT, 'hospital_datasets', '*', '*.csv'),
+        os.path.join(settings.MEDIA_ROOT, 'datasets', '*.csv'),
+    ]
+    paths = []
+    for path in sorted(p for pattern in patterns for p in glob.glob(pattern)):
+        try:
+            with open(path, encoding='utf-8-sig') as f:
+                header = [column.strip() for column in f.readline().split(',')]
+        except (OSError, UnicodeDecodeError):
+            continue
+        if all(column in header for column in CSV_FEATURE_COLUMNS):
+            paths.append(path)
+    return paths
+
+
+def encode_chunk(chunk):
+    """Convert a raw CSV chunk into a float64 (N, 11) feature matrix."""
+    missing = [column for column in CSV_FEATURE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    encodings = category_encodings()
+    matrix = np.empty((len(chunk), len(CSV_FEATURE_COLUMNS)), dtype=np.float64)
+    for index, column in enumerate(CSV_FEATURE_COLUMNS):
+        values = chunk[column]
+        if column in encodings and not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.strip().map(encodings[column])
+        matrix[:, index] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    return matrix
+
+
+class ScoringStats:
+    """Row count and timing for one scoring run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'seconds': round(self.seconds, 4),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def score_csv(source, predictor, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """
+    Score a CSV file and yield the scored CSV as text chunks.
+
+    Args:
+        source: path or binary/text file object of a hospital CSV
+        predictor: HeartDiseasePredictor used for scoring
+        chunk_size: rows read, scored and written per iteration
+        stats: optional ScoringStats updated as chunks complete
+
+    Yields:
+        CSV text: the input columns plus Prediction and Probability
+    """
+    stats = stats if stats is not None else ScoringStats()
+    started = time.perf_counter()
+
+    reader = pd.read_csv(source, chunksize=chunk_size)
+    for chunk_number, chunk in enumerate(reader):
+        batch = predictor.predict_many(encode_chunk(chunk))
+        chunk['Prediction'] = np.where(batch.labels == 1, 'High Risk', 'Low Risk')
+        chunk['Probability'] = np.round(batch.probabilities, 2)
+
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, header=chunk_number == 0, index=False)
+
+        stats.rows += len(chunk)
+        stats.chunks += 1
+        stats.seconds = time.perf_counter() - started
+        yield buffer.getvalue()
+
+    logger.info('Scored %d CSV rows at %.0f rows/s', stats.rows, stats.rows_per_second)
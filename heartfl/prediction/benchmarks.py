@@ -0,0 +1,495 @@
+"""
+Prediction Benchmarks
+Latency, throughput, load time and memory of the prediction hot path
+
+Uses the bundled media/hospital_datasets CSVs as the workload and compares
+every scoring backend the predictor can run on:
+
+- compiled:  the shipped model through the compiled NumPy scorer (default path)
+- sklearn:   the same model through scikit-learn's predict_proba
+- artifact:  the memory-mapped artifact, instead of compiled when one has
+             been exported (see export_model_artifact)
+- rules:     the rule-based fallback used when no model is deployed
+
+It also times the clinical-text parser used on OCR output against the
+original regex-per-field implementation, on long synthetic OCR dumps, and
+(benchmark_ocr) the OCR page pipeline against the original 300-dpi PNG path.
+Report rendering is timed with styles rebuilt per report, as the download
+views used to do, and with the per-process style cache.
+
+Results are plain dicts so the benchmark_prediction command can write them
+as JSON and runs can be diffed across commits.
+"""
+import copy
+import json
+import shutil
+import tempfile
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .batch_scoring import bundled_hospital_csvs, encode_chunk
+from .clinical_parser import parse_clinical_data, reference_parse_clinical_data
+from .ml_model import PATIENT_FEATURE_FIELDS, HeartDiseasePredictor, synthetic_batch
+from . import reports
+from .ocr import OCR_DPI, OCR_FAST_DPI, OCR_MIN_CONFIDENCE, ocr_page, render_page
+
+BATCH_SIZES = (1, 64, 1000, 100000)
+LATENCY_PERCENTILES = (50, 95, 99)
+OCR_DUMP_PAGES = (1, 10, 50)
+OCR_MODES = ('png', 'grayscale', 'adaptive')
+
+# Report boilerplate and the lines the parser looks for, as OCR produces them.
+_OCR_FILLER = (
+    'Patient ID HFL-{n:05d} Ward 3B Referring physician Dr. Rao',
+    'Haemoglobin 13.{d} g/dL Platelets 2{d}0 x10^3/uL WBC 7.{d} x10^3/uL',
+    'Echocardiography shows preserved ejection fraction of 5{d}% with no regional wall motion defect.',
+    'Medications: aspirin 75 mg, atorvastatin 20 mg, metoprolol 25 mg twice daily.',
+    'Page {n} of report - confidential - printed by the laboratory information system',
+)
+_OCR_FINDINGS = (
+    'Age: 5{d} years Sex: Male',
+    'Chest pain type: atypical angina',
+    'Resting BP: 13{d} mmHg Cholesterol: 2{d}4 mg/dl',
+    'Fasting blood sugar > 120: yes',
+    'Resting ECG: ST-T wave abnormality',
+    'Max heart rate: 1{d}2 bpm',
+    'Exercise induced angina: no Oldpeak: 1.{d}',
+    'ST slope: flat',
+)
+
+# Run in a fresh interpreter so imports, unpickling and page faults are all cold.
+_COLD_START_SCRIPT = '''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'heartfl.settings')
+import django
+django.setup()
+from prediction.benchmarks import rss_bytes
+setup_seconds = time.perf_counter() - started
+rss_before = rss_bytes()
+
+started = time.perf_counter()
+from prediction.ml_model import HeartDiseasePredictor
+predictor = HeartDiseasePredictor()
+load_seconds = time.perf_counter() - started
+predictor.predict_from_features(json.loads(sys.argv[1]))
+first_prediction_seconds = time.perf_counter() - started
+
+print(json.dumps({
+    'django_setup_seconds': setup_seconds,
+    'load_seconds': load_seconds,
+    'first_prediction_seconds': first_prediction_seconds,
+    'model_source': predictor.model_source,
+    'compiled': predictor.scorer is not None,
+    'rss_before_load_bytes': rss_before,
+    'rss_after_load_bytes': rss_bytes(),
+}))
+'''
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS, in KB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def load_workload(max_rows=None):
+    """Encoded feature rows from every bundled hospital CSV, or a synthetic batch if none exist."""
+    frames = [encode_chunk(pd.read_csv(path)) for path in bundled_hospital_csvs()]
+    workload = np.vstack(frames) if frames else synthetic_batch(rows=20000)
+    return workload[:max_rows] if max_rows else workload
+
+
+def backends(model_path=None, scaler_path=None):
+    """name -> HeartDiseasePredictor for every scoring backend available here."""
+    predictor = HeartDiseasePredictor(model_path=model_path, scaler_path=scaler_path)
+    variants = {}
+    if predictor.model is not None:
+        variants['artifact' if predictor.model_source == 'artifact' else 'compiled'] = predictor
+        if predictor.model_source == 'pickle':
+            sklearn_backend = copy.copy(predictor)
+            sklearn_backend.scorer = None
+            variants['sklearn'] = sklearn_backend
+
+    rules = copy.copy(predictor)
+    rules.model = rules.scaler = rules.scorer = None
+    variants['rules'] = rules
+    return variants
+
+
+def _percentiles(samples_ns):
+    samples_us = np.asarray(samples_ns, dtype=np.float64) / 1000.0
+    summary = {f'p{p}_us': round(float(np.percentile(samples_us, p)), 2) for p in LATENCY_PERCENTILES}
+    summary['mean_us'] = round(float(samples_us.mean()), 2)
+    return summary
+
+
+def _patient(row):
+    """PatientData-like object for predict(), built from one feature row."""
+    values = dict(zip(PATIENT_FEATURE_FIELDS, row.tolist()))
+    values['gender'] = 'M' if values['gender'] == 1 else 'F'
+    values['fasting_bs'] = bool(values['fasting_bs'])
+    values['exercise_angina'] = bool(values['exercise_angina'])
+    return SimpleNamespace(**values)
+
+
+def single_row_latency(predictor, workload, iterations=1000):
+    """Per-call latency percentiles of predict() and predict_from_features()."""
+    rows = workload[np.arange(iterations) % len(workload)]
+    feature_lists = [row.tolist() for row in rows]
+    patients = [_patient(row) for row in rows]
+
+    results = {}
+    for name, call, inputs in (
+        ('predict', predictor.predict, patients),
+        ('predict_from_features', predictor.predict_from_features, feature_lists),
+    ):
+        call(inputs[0])  # warm-up
+        samples = []
+        for item in inputs:
+            started = time.perf_counter_ns()
+            call(item)
+            samples.append(time.perf_counter_ns() - started)
+        results[name] = _percentiles(samples)
+    return results
+
+
+def batch_throughput(predictor, workload, sizes=BATCH_SIZES, min_seconds=0.2):
+    """Rows per second of predict_many at each batch size."""
+    results = {}
+    for size in sizes:
+        batch = np.resize(workload, (size, workload.shape[1]))
+        predictor.predict_many(batch)  # warm-up
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            predictor.predict_many(batch)
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_seconds and calls >= 3:
+                break
+        results[str(size)] = {
+            'calls': calls,
+            'seconds_per_call': elapsed / calls,
+            'rows_per_second': round(size * calls / elapsed, 1),
+        }
+    return results
+
+
+def warm_load(model_path=None, scaler_path=None, repeats=5):
+    """Load time of a predictor once the interpreter has already imported everything."""
+    HeartDiseasePredictor(model_path=model_path, scaler_path=scaler_path)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        HeartDiseasePredictor(model_path=model_path, scaler_path=scaler_path)
+        samples.append(time.perf_counter() - started)
+    return {'load_seconds_min': min(samples), 'load_seconds_median': float(np.median(samples))}
+
+
+def cold_start(feature_row, timeout=120):
+    """Load time and memory of a predictor in a freshly started worker-like process."""
+    completed = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', _COLD_START_SCRIPT, json.dumps(feature_row)],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=timeout,
+    )
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1:] or 'cold start failed'}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result['rss_before_load_bytes'] is not None and result['rss_after_load_bytes'] is not None:
+        result['model_rss_bytes'] = result['rss_after_load_bytes'] - result['rss_before_load_bytes']
+    return result
+
+
+def synthetic_ocr_dump(pages, seed=0):
+    """Whitespace-normalized text of a multi-page report, findings scattered near the end."""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for page in range(pages):
+        for n in range(40):
+            lines.append(_OCR_FILLER[rng.integers(len(_OCR_FILLER))].format(n=page * 40 + n, d=rng.integers(10)))
+    # Summaries are usually on the last page, so the parser cannot stop early.
+    for line in _OCR_FINDINGS:
+        position = len(lines) - int(rng.integers(1, 40))
+        lines.insert(position, line.format(d=rng.integers(10)))
+    return ' '.join(lines)
+
+
+def parser_benchmark(pages=OCR_DUMP_PAGES, min_seconds=0.2):
+    """Seconds per parse of synthetic OCR dumps, single-pass parser vs. the original."""
+    results = {}
+    for page_count in pages:
+        text = synthetic_ocr_dump(page_count)
+        timings = {}
+        for name, parse in (('single_pass', parse_clinical_data), ('reference', reference_parse_clinical_data)):
+            parse(text)  # warm-up
+            calls = 0
+            started = time.perf_counter()
+            while True:
+                parse(text)
+                calls += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= min_seconds and calls >= 3:
+                    break
+            timings[name] = elapsed / calls
+        results[str(page_count)] = {
+            'characters': len(text),
+            'single_pass_seconds': timings['single_pass'],
+            'reference_seconds': timings['reference'],
+            'speedup': round(timings['reference'] / timings['single_pass'], 2),
+        }
+    return results
+
+
+def sample_reports():
+    """layout -> (ReportData, render, build_styles) for a representative high-risk prediction."""
+    created_at = datetime(2025, 1, 15, 10, 30)
+    hospital = SimpleNamespace(
+        name='Apollo Heart Institute', registration_number='HOSP-0001', address='12 Ring Road',
+        city='Chennai', state='Tamil Nadu', contact_number='+91 44 0000 0000',
+    )
+    doctor = SimpleNamespace(
+        hospital=hospital, full_name='Priya Raman', name='Priya Raman',
+        specialization='Cardiology', license_number='TN-12345',
+    )
+    patient = SimpleNamespace(
+        patient_name='Test Patient', age=54, gender='M', sex=1, created_at=created_at, chest_pain_type=1,
+        resting_bp=140, cholesterol=239, fasting_bs=1, resting_ecg=1, max_heart_rate=160,
+        exercise_angina=0, oldpeak=1.2, st_slope=1,
+    )
+    classic = SimpleNamespace(
+        pk=42, doctor=doctor, patient_data=patient, prediction='high', probability=78.5,
+        notes='Refer for stress echocardiography; review lipid panel in six weeks.',
+    )
+    modern = SimpleNamespace(
+        id='65a4f0c2e13b8a0012345678', hospital=hospital, doctor=doctor, patient=patient, prediction=1,
+        prediction_label='High Risk', probability=0.785, confidence_score=78.5, model_version='1.0',
+        created_at=created_at,
+    )
+    return {
+        'classic': (reports.classic_report_data(classic, created_at), reports.render_classic_report,
+                    reports.build_classic_styles),
+        'modern': (reports.modern_report_data(modern, created_at), reports.render_modern_report,
+                   reports.build_modern_styles),
+    }
+
+
+def report_benchmark(iterations=50):
+    """Milliseconds per rendered report with styles rebuilt per report (before) and cached (after)."""
+    results = {}
+    for layout, (report, render, build_styles) in sample_reports().items():
+        render(report)  # warm-up, also fills the style cache
+        timings = {}
+        for name, call in (
+            ('rebuilt_styles', lambda: render(report, build_styles())),
+            ('cached_styles', lambda: render(report)),
+        ):
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter_ns()
+                call()
+                samples.append(time.perf_counter_ns() - started)
+            timings[name] = float(np.median(samples)) / 1e6
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            build_styles()
+        results[layout] = {
+            'rebuilt_styles_ms': round(timings['rebuilt_styles'], 3),
+            'cached_styles_ms': round(timings['cached_styles'], 3),
+            'style_build_ms': round((time.perf_counter_ns() - started) / iterations / 1e6, 3),
+            'speedup': round(timings['rebuilt_styles'] / timings['cached_styles'], 2),
+        }
+    return results
+
+
+def environment():
+    """Versions and commit the results were measured on."""
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+# One OCR mode per fresh interpreter, so peak RSS is not shared between modes.
+_OCR_RUN_SCRIPT = '''
+import json, os, sys
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'heartfl.settings')
+import django
+django.setup()
+from prediction.benchmarks import ocr_mode_run
+print(json.dumps(ocr_mode_run(*json.loads(sys.argv[1]))))
+'''
+
+
+def synthetic_scanned_pdf(pages, dpi=200):
+    """PDF whose pages are images of report text, so every page needs OCR."""
+    import fitz
+
+    text = synthetic_ocr_dump(pages)
+    words = text.split(' ')
+    source = fitz.open()
+    per_page = -(-len(words) // pages)
+    for page in range(pages):
+        chunk = ' '.join(words[page * per_page:(page + 1) * per_page])
+        source.new_page().insert_textbox(fitz.Rect(50, 50, 545, 792), chunk, fontsize=10)
+
+    scanned = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        scanned.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pix)
+    data = scanned.tobytes(deflate=True)
+    source.close()
+    scanned.close()
+    return data
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _png_page(pdf_path, page_index, run_ocr):
+    """The original page pipeline: 300-dpi RGB pixmap -> PNG -> PIL -> pytesseract."""
+    from io import BytesIO
+
+    import fitz
+    from PIL import Image
+
+    with fitz.open(pdf_path) as document:
+        pix = document[page_index].get_pixmap(dpi=OCR_DPI)
+    image = Image.open(BytesIO(pix.tobytes('png')))
+    if run_ocr:
+        import pytesseract
+
+        return pytesseract.image_to_string(image)
+    # What pytesseract does with the image before starting Tesseract.
+    with tempfile.NamedTemporaryFile(suffix='.png') as handle:
+        image.save(handle, format='PNG')
+    return ''
+
+
+def ocr_mode_run(mode, pdf_path, run_ocr):
+    """
+    Time one OCR mode over every page of pdf_path in this process.
+
+    Without Tesseract (run_ocr False) only rendering and image hand-off are
+    timed, and adaptive can only be measured at its fast resolution, i.e.
+    the best case where no page needs a second render.
+    """
+    import fitz
+
+    with fitz.open(pdf_path) as document:
+        page_count = document.page_count
+    rss_before = _peak_rss_bytes()
+    started = time.perf_counter()
+    for index in range(page_count):
+        if mode == 'png':
+            _png_page(pdf_path, index, run_ocr)
+        elif run_ocr:
+            fast_dpi = OCR_FAST_DPI if mode == 'adaptive' else None
+            ocr_page(pdf_path, index, OCR_DPI, fast_dpi, OCR_MIN_CONFIDENCE)
+        else:
+            with fitz.open(pdf_path) as document, tempfile.NamedTemporaryFile(suffix='.pgm') as handle:
+                render_page(document[index], OCR_FAST_DPI if mode == 'adaptive' else OCR_DPI, handle.name)
+    seconds = time.perf_counter() - started
+    rss_after = _peak_rss_bytes()
+    return {
+        'seconds': seconds,
+        'seconds_per_page': seconds / page_count,
+        'peak_rss_bytes': rss_after,
+        'peak_rss_growth_bytes': rss_after - rss_before if rss_after is not None else None,
+    }
+
+
+def ocr_benchmark(pdf_path=None, pages=4, modes=OCR_MODES, timeout=600):
+    """Seconds per page and peak memory of each OCR mode, each in its own process."""
+    import fitz
+
+    run_ocr = shutil.which('tesseract') is not None
+    with tempfile.TemporaryDirectory() as directory:
+        source = pdf_path or 'synthetic'
+        if pdf_path is None:
+            pdf_path = os.path.join(directory, 'scanned.pdf')
+            with open(pdf_path, 'wb') as f:
+                f.write(synthetic_scanned_pdf(pages))
+        with fitz.open(pdf_path) as document:
+            page_count = document.page_count
+        results = {
+            'environment': environment(),
+            'document': {'source': source, 'pages': page_count, 'bytes': os.path.getsize(pdf_path)},
+            'tesseract': run_ocr,
+            'modes': {},
+        }
+        for mode in modes:
+            completed = subprocess.run(
+                [sys.executable, '-W', 'ignore', '-c', _OCR_RUN_SCRIPT, json.dumps([mode, pdf_path, run_ocr])],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=timeout,
+            )
+            if completed.returncode != 0:
+                results['modes'][mode] = {'error': completed.stderr.strip().splitlines()[-1:] or 'run failed'}
+            else:
+                results['modes'][mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return results
+
+
+def run_benchmarks(iterations=1000, sizes=BATCH_SIZES, include_cold_start=True, max_rows=None,
+                   parser_pages=OCR_DUMP_PAGES, report_iterations=50):
+    """Run the full suite and return a JSON-serializable result dict."""
+    workload = load_workload(max_rows)
+    results = {
+        'environment': environment(),
+        'workload': {'rows': int(len(workload)), 'files': bundled_hospital_csvs()},
+        'backends': {},
+        'warm_load': warm_load(),
+    }
+    for name, predictor in backends().items():
+        results['backends'][name] = {
+            'model_version': predictor.model_version if predictor.model is not None else None,
+            'latency': single_row_latency(predictor, workload, iterations),
+            'throughput': batch_throughput(predictor, workload, sizes),
+        }
+    if parser_pages:
+        results['clinical_parser'] = parser_benchmark(parser_pages)
+    if report_iterations:
+        results['report_rendering'] = report_benchmark(report_iterations)
+    if include_cold_start:
+        results['cold_start'] = cold_start(workload[0].tolist())
+    return results
@@ -0,0 +1,297 @@
+"""
+Clinical Report Parser
+Turns text extracted from a PDF medical report into the prediction form fields
+
+parse_clinical_data makes a single pass over the lowercased text with one
+precompiled pattern. Every field pattern sits inside a zero-width
+lookahead, so overlapping phrases are still seen ("typical angina" inside
+"atypical angina"). The first occurrence of each phrase is recorded and the
+same precedence rules as the original parser (reference_parse_clinical_data)
+decide each field.
+"""
+import re
+
+# Bump whenever a change can alter what parse_clinical_data returns, so text
+# in the OCR cache (see ocr_cache.py) is parsed again rather than trusted.
+PARSER_VERSION = 1
+
+# Fields returned by parse_clinical_data, one per model feature.
+CLINICAL_FIELDS = (
+    'age', 'sex', 'chest_pain_type', 'resting_bp', 'cholesterol', 'fasting_bs',
+    'resting_ecg', 'max_heart_rate', 'exercise_angina', 'oldpeak', 'st_slope',
+)
+
+
+def _extract_first_int(patterns, text, default=None):
+    """Extract the first integer matching one of the provided regex patterns."""
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                return int(match.group(1))
+            except (TypeError, ValueError):
+                continue
+    return default
+
+
+def _extract_first_float(patterns, text, default=None):
+    """Extract the first float matching one of the provided regex patterns."""
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            try:
+                return float(match.group(1))
+            except (TypeError, ValueError):
+                continue
+    return default
+
+
+def reference_parse_clinical_data(text):
+    """
+    Original multi-regex parser: one re.search per pattern over the full text.
+    Kept as the oracle for the equivalence test and the parser benchmark.
+    """
+    normalized = text.lower()
+
+    age = _extract_first_int([r'age\s*[:\-]?\s*(\d{1,3})'], text)
+    resting_bp = _extract_first_int([
+        r'(?:resting\s*(?:blood\s*pressure|bp)|blood\s*pressure|bp)\s*[:\-]?\s*(\d{2,3})'
+    ], text)
+    cholesterol = _extract_first_int([
+        r'(?:cholesterol|chol)\s*[:\-]?\s*(\d{2,4})'
+    ], text)
+    max_heart_rate = _extract_first_int([
+        r'(?:max(?:imum)?\s*heart\s*rate|heart\s*rate|hr)\s*[:\-]?\s*(\d{2,3})'
+    ], text)
+    oldpeak = _extract_first_float([
+        r'(?:oldpeak|st\s*depression)\s*[:\-]?\s*([0-9]+(?:\.[0-9]+)?)'
+    ], text)
+
+    sex = None
+    if re.search(r'\bsex\s*[:\-]?\s*male\b|\bgender\s*[:\-]?\s*male\b|\bmale\b', normalized):
+        sex = 'Male'
+    elif re.search(r'\bsex\s*[:\-]?\s*female\b|\bgender\s*[:\-]?\s*female\b|\bfemale\b', normalized):
+        sex = 'Female'
+
+    chest_pain_type = None
+    if re.search(r'typical\s*angina', normalized):
+        chest_pain_type = 0
+    elif re.search(r'atypical\s*angina', normalized):
+        chest_pain_type = 1
+    elif re.search(r'non[-\s]?anginal', normalized):
+        chest_pain_type = 2
+    elif re.search(r'asymptomatic', normalized):
+        chest_pain_type = 3
+    else:
+        chest_pain_type = _extract_first_int([
+            r'(?:chest\s*pain\s*type|cp)\s*[:\-]?\s*([0-3])'
+        ], text)
+
+    fasting_bs = None
+    if re.search(r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:yes|positive|true|>\s*120)', normalized):
+        fasting_bs = 'Yes'
+    elif re.search(r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:no|negative|false|<=\s*120)', normalized):
+        fasting_bs = 'No'
+
+    resting_ecg = None
+    if re.search(r'left\s*ventricular\s*hypertrophy', normalized):
+        resting_ecg = 2
+    elif re.search(r'st[-\s]*t\s*wave\s*abnormal', normalized):
+        resting_ecg = 1
+    elif re.search(r'\bnormal\s*ecg\b|resting\s*ecg\s*[:\-]?\s*normal', normalized):
+        resting_ecg = 0
+    else:
+        resting_ecg = _extract_first_int([
+            r'(?:rest(?:ing)?\s*ecg|ecg)\s*[:\-]?\s*([0-2])'
+        ], text)
+
+    exercise_angina = None
+    if re.search(r'exercise\s*induced\s*angina[^\.]{0,20}(?:yes|positive|true)', normalized):
+        exercise_angina = 'Yes'
+    elif re.search(r'exercise\s*induced\s*angina[^\.]{0,20}(?:no|negative|false)', normalized):
+        exercise_angina = 'No'
+
+    st_slope = None
+    if re.search(r'\bupsloping\b', normalized):
+        st_slope = 0
+    elif re.search(r'\bflat\b', normalized):
+        st_slope = 1
+    elif re.search(r'\bdownsloping\b', normalized):
+        st_slope = 2
+    else:
+        st_slope = _extract_first_int([
+            r'(?:st\s*slope|slope)\s*[:\-]?\s*([0-2])'
+        ], text)
+
+    return {
+        'age': age,
+        'sex': sex,
+        'chest_pain_type': chest_pain_type,
+        'resting_bp': resting_bp,
+        'cholesterol': cholesterol,
+        'fasting_bs': fasting_bs,
+        'resting_ecg': resting_ecg,
+        'max_heart_rate': max_heart_rate,
+        'exercise_angina': exercise_angina,
+        'oldpeak': oldpeak,
+        'st_slope': st_slope,
+    }
+
+
+# (name, leading letters, pattern) for every phrase the parser looks for,
+# matched against lowercased text. The leading letters are the characters a
+# match can start with; patterns that carry a value capture it in the group
+# <name>_value. At any text position at most one phrase can match (both
+# fasting_bs and both exercise angina patterns can, and the first listed
+# wins, as it did before), so alternation order does not hide a match.
+_FIELD_PATTERNS = (
+    ('age', 'a', r'age\s*[:\-]?\s*(?P<age_value>\d{1,3})'),
+    ('resting_bp', 'rb', (
+        r'(?:resting\s*(?:blood\s*pressure|bp)|blood\s*pressure|bp)\s*[:\-]?\s*(?P<resting_bp_value>\d{2,3})'
+    )),
+    ('cholesterol', 'c', r'(?:cholesterol|chol)\s*[:\-]?\s*(?P<cholesterol_value>\d{2,4})'),
+    ('max_heart_rate', 'mh', (
+        r'(?:max(?:imum)?\s*heart\s*rate|heart\s*rate|hr)\s*[:\-]?\s*(?P<max_heart_rate_value>\d{2,3})'
+    )),
+    ('oldpeak', 'os', r'(?:oldpeak|st\s*depression)\s*[:\-]?\s*(?P<oldpeak_value>[0-9]+(?:\.[0-9]+)?)'),
+    ('male', 'sgm', r'\bsex\s*[:\-]?\s*male\b|\bgender\s*[:\-]?\s*male\b|\bmale\b'),
+    ('female', 'sgf', r'\bsex\s*[:\-]?\s*female\b|\bgender\s*[:\-]?\s*female\b|\bfemale\b'),
+    ('typical_angina', 't', r'typical\s*angina'),
+    ('atypical_angina', 'a', r'atypical\s*angina'),
+    ('non_anginal', 'n', r'non[-\s]?anginal'),
+    ('asymptomatic', 'a', r'asymptomatic'),
+    ('chest_pain_code', 'c', r'(?:chest\s*pain\s*type|cp)\s*[:\-]?\s*(?P<chest_pain_code_value>[0-3])'),
+    ('fasting_bs_yes', 'f', r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:yes|positive|true|>\s*120)'),
+    ('fasting_bs_no', 'f', r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:no|negative|false|<=\s*120)'),
+    ('lvh', 'l', r'left\s*ventricular\s*hypertrophy'),
+    ('st_t_abnormal', 's', r'st[-\s]*t\s*wave\s*abnormal'),
+    ('normal_ecg', 'nr', r'\bnormal\s*ecg\b|resting\s*ecg\s*[:\-]?\s*normal'),
+    ('ecg_code', 're', r'(?:rest(?:ing)?\s*ecg|ecg)\s*[:\-]?\s*(?P<ecg_code_value>[0-2])'),
+    ('angina_yes', 'e', r'exercise\s*induced\s*angina[^\.]{0,20}(?:yes|positive|true)'),
+    ('angina_no', 'e', r'exercise\s*induced\s*angina[^\.]{0,20}(?:no|negative|false)'),
+    ('upsloping', 'u', r'\bupsloping\b'),
+    ('flat', 'f', r'\bflat\b'),
+    ('downsloping', 'd', r'\bdownsloping\b'),
+    ('slope_code', 's', r'(?:st\s*slope|slope)\s*[:\-]?\s*(?P<slope_code_value>[0-2])'),
+)
+
+
+def _build_scanner():
+    """
+    One alternative per leading letter: 'a(?<=(?=(?P<age__a>...)|...).)|b...'.
+
+    Python's re tries every alternative of a plain alternation at every
+    position, which is slower than the 25 separate searches it replaces.
+    Starting each branch with a literal lets the engine skip positions that
+    cannot start a phrase and try only the few phrases for that letter; the
+    one-character lookbehind then re-anchors the lookahead at the letter so
+    overlapping phrases are still found.
+    """
+    by_letter = {}
+    for name, letters, pattern in _FIELD_PATTERNS:
+        for letter in letters:
+            by_letter.setdefault(letter, []).append((name, pattern))
+
+    branches = []
+    groups = {}
+    for letter, phrases in sorted(by_letter.items()):
+        alternatives = []
+        for name, pattern in phrases:
+            group = f'{name}__{letter}'
+            value_group = f'{name}_value__{letter}'
+            alternatives.append(f'(?P<{group}>{pattern.replace(f"<{name}_value>", f"<{value_group}>")})')
+            groups[group] = (name, value_group if f'<{name}_value>' in pattern else None)
+        branches.append(f'{letter}(?<=(?={"|".join(alternatives)}).)')
+    return re.compile('|'.join(branches), re.DOTALL), groups
+
+
+_SCANNER, _GROUPS = _build_scanner()
+_ALL_PHRASES = len(_FIELD_PATTERNS)
+
+# Characters for which re.IGNORECASE on the text and a plain match on
+# text.lower() disagree ('İ' lowercases to two characters, the others fold to
+# ASCII letters). Texts containing them go through the original parser.
+_CASE_FOLD_TRAPS = re.compile('[İıſK]')
+
+
+def _first(found, name, convert=int):
+    value = found.get(name)
+    return convert(value) if value is not None else None
+
+
+def parse_clinical_data(text):
+    """Parse OCR text into structured prediction features expected by the UI/model."""
+    if _CASE_FOLD_TRAPS.search(text):
+        return reference_parse_clinical_data(text)
+
+    # First occurrence of each phrase: its captured value, or True for flags.
+    found = {}
+    for match in _SCANNER.finditer(text.lower()):
+        name, value_group = _GROUPS[match.lastgroup]
+        if name not in found:
+            found[name] = match.group(value_group) if value_group else True
+            if len(found) == _ALL_PHRASES:
+                break
+
+    sex = 'Male' if 'male' in found else 'Female' if 'female' in found else None
+
+    # "typical angina" also matches inside "atypical angina" and wins, as before.
+    if 'typical_angina' in found:
+        chest_pain_type = 0
+    elif 'atypical_angina' in found:
+        chest_pain_type = 1
+    elif 'non_anginal' in found:
+        chest_pain_type = 2
+    elif 'asymptomatic' in found:
+        chest_pain_type = 3
+    else:
+        chest_pain_type = _first(found, 'chest_pain_code')
+
+    fasting_bs = 'Yes' if 'fasting_bs_yes' in found else 'No' if 'fasting_bs_no' in found else None
+
+    if 'lvh' in found:
+        resting_ecg = 2
+    elif 'st_t_abnormal' in found:
+        resting_ecg = 1
+    elif 'normal_ecg' in found:
+        resting_ecg = 0
+    else:
+        resting_ecg = _first(found, 'ecg_code')
+
+    exercise_angina = 'Yes' if 'angina_yes' in found else 'No' if 'angina_no' in found else None
+
+    if 'upsloping' in found:
+        st_slope = 0
+    elif 'flat' in found:
+        st_slope = 1
+    elif 'downsloping' in found:
+        st_slope = 2
+    else:
+        st_slope = _first(found, 'slope_code')
+
+    return {
+        'age': _first(found, 'age'),
+        'sex': sex,
+        'chest_pain_type': chest_pain_type,
+        'resting_bp': _first(found, 'resting_bp'),
+        'cholesterol': _first(found, 'cholesterol'),
+        'fasting_bs': fasting_bs,
+        'resting_ecg': resting_ecg,
+        'max_heart_rate': _first(found, 'max_heart_rate'),
+        'exercise_angina': exercise_angina,
+        'oldpeak': _first(found, 'oldpeak', float),
+        'st_slope': st_slope,
+    }
+
+
+def merge_clinical_data(merged, partial):
+    """Fill fields still missing from merged with values found in partial (first page wins)."""
+    for field in CLINICAL_FIELDS:
+        if merged.get(field) is None and partial.get(field) is not None:
+            merged[field] = partial[field]
+    return merged
+
+
+def missing_fields(data):
+    """Clinical fields that have not been found yet."""
+    return [field for field in CLINICAL_FIELDS if data.get(field) is None]
@@ -0,0 +1,223 @@
+"""
+Compiled NumPy Scorer
+Evaluates the trained scaler and estimator from plain NumPy arrays
+
+sklearn's predict_proba re-validates its input, checks feature names and
+dispatches through several layers on every call, which costs far more than
+the arithmetic for an 11-feature model. Compiling pulls the fitted state out
+into flat arrays once:
+
+- linear models: coefficient vector and intercept, scored with a dot
+  product plus sigmoid
+- trees and forests: concatenated node arrays, traversed for all rows and
+  all trees at once, one tree level per NumPy step
+
+The scorer reproduces sklearn's operations in the same order and dtypes
+(float64 scaling, float32 tree inputs, sequential forest averaging), so its
+output is bit-for-bit identical; verify_scorer checks exactly that before a
+predictor uses it.
+"""
+import numpy as np
+
+# Estimator kinds the compiler understands.
+KIND_TREE = 'tree'
+KIND_FOREST = 'forest'
+KIND_LINEAR = 'linear'
+
+
+def _tree_arrays(tree):
+    """Node arrays of one fitted sklearn Tree plus its leaf probability table."""
+    value = np.asarray(tree.value, dtype=np.float64)[:, 0, :]
+    # sklearn < 1.4 stores class counts and normalizes in predict_proba, later
+    # versions store fractions. Normalizing here the way sklearn does keeps
+    # the stored table bit-identical to what predict_proba returns.
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    if not np.allclose(normalizer, 1.0):
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+    nodes = tree.__getstate__()['nodes']
+    if 'missing_go_to_left' in nodes.dtype.names:
+        missing_go_to_left = nodes['missing_go_to_left'].astype(np.uint8)
+    else:
+        missing_go_to_left = np.zeros(tree.node_count, dtype=np.uint8)
+
+    return {
+        'left': np.asarray(tree.children_left, dtype=np.int64),
+        'right': np.asarray(tree.children_right, dtype=np.int64),
+        'feature': np.asarray(tree.feature, dtype=np.int64),
+        'threshold': np.asarray(tree.threshold, dtype=np.float64),
+        'missing_left': missing_go_to_left,
+        'proba': np.ascontiguousarray(value),
+    }
+
+
+def extract_arrays(model, scaler=None):
+    """
+    Pull the numeric state out of a fitted estimator and scaler.
+
+    Returns:
+        (meta, arrays) describing the model, as used by CompiledScorer and
+        the memory-mapped artifact format
+
+    Raises:
+        ValueError: for estimators or scalers that cannot be compiled
+    """
+    classes = np.asarray(model.classes_)
+    meta = {
+        'estimator': type(model).__name__,
+        'n_features': int(getattr(model, 'n_features_in_', 11)),
+        'classes': classes.tolist(),
+    }
+    arrays = {}
+
+    if hasattr(model, 'tree_'):
+        meta['kind'] = KIND_TREE
+        trees = [model.tree_]
+    elif hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+        meta['kind'] = KIND_FOREST
+        trees = [e.tree_ for e in model.estimators_]
+    elif hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        if len(classes) != 2:
+            raise ValueError('Only binary linear models are supported')
+        meta['kind'] = KIND_LINEAR
+        arrays['coef'] = np.ascontiguousarray(np.ravel(model.coef_), dtype=np.float64)
+        arrays['intercept'] = np.ascontiguousarray(np.ravel(model.intercept_), dtype=np.float64)
+        trees = []
+    else:
+        raise ValueError(f'Unsupported estimator: {type(model).__name__}')
+
+    if trees:
+        # Concatenate all trees into one set of node arrays; child indices are
+        # rebased onto the concatenation and tree_offsets marks each root.
+        per_tree = [_tree_arrays(tree) for tree in trees]
+        offsets = np.cumsum([0] + [len(t['left']) for t in per_tree[:-1]]).astype(np.int64)
+        for name in ('left', 'right'):
+            arrays[name] = np.concatenate([
+                np.where(t[name] >= 0, t[name] + offset, -1) for t, offset in zip(per_tree, offsets)
+            ])
+        for name in ('feature', 'threshold', 'missing_left', 'proba'):
+            arrays[name] = np.concatenate([t[name] for t in per_tree])
+        arrays['tree_offsets'] = offsets
+        meta['max_depth'] = int(max(tree.max_depth for tree in trees))
+
+    if scaler is not None:
+        if not (hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_')):
+            raise ValueError(f'Unsupported scaler: {type(scaler).__name__}')
+        n_features = meta['n_features']
+        # Subtracting 0 and dividing by 1 are exact, so disabled steps stay bit-identical.
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+        arrays['scaler_mean'] = np.ascontiguousarray(
+            mean if mean is not None else np.zeros(n_features), dtype=np.float64
+        )
+        arrays['scaler_scale'] = np.ascontiguousarray(
+            scale if scale is not None else np.ones(n_features), dtype=np.float64
+        )
+
+    return meta, arrays
+
+
+class CompiledScorer:
+    """
+    Scaler plus estimator evaluated from flat arrays.
+
+    Args:
+        meta: estimator description from extract_arrays
+        arrays: name -> ndarray mapping from extract_arrays; may be read-only
+                memory-mapped views, nothing is written to them
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.kind = meta['kind']
+        self.classes_ = np.asarray(meta['classes'])
+        self.n_features_in_ = meta['n_features']
+        self.has_scaler = 'scaler_mean' in arrays
+
+    def scale(self, X):
+        """StandardScaler.transform: same operations in the same order, on a float64 copy."""
+        X = np.array(X, dtype=np.float64)
+        if self.has_scaler:
+            X -= self.arrays['scaler_mean']
+            X /= self.arrays['scaler_scale']
+        return X
+
+    def model_proba(self, X):
+        """Estimator predict_proba for already-scaled rows."""
+        if self.kind == KIND_LINEAR:
+            from scipy.special import expit
+
+            decision = np.asarray(X, dtype=np.float64) @ self.arrays['coef'] + self.arrays['intercept']
+            positive = expit(decision)
+            return np.stack([1 - positive, positive], axis=1)
+        return self._forest_proba(X)
+
+    def _leaves(self, X):
+        """Leaf index reached by every row in every tree, shape (rows, trees)."""
+        a = self.arrays
+        left, right, feature = a['left'], a['right'], a['feature']
+        threshold, missing_left = a['threshold'], a['missing_left']
+
+        rows, n_features = X.shape
+        n_trees = len(a['tree_offsets'])
+        # One flat (row, tree) walker per entry; row_base indexes the row in X.ravel().
+        flat = X.ravel()
+        row_base = np.repeat(np.arange(rows, dtype=np.int64) * n_features, n_trees)
+        node = np.tile(a['tree_offsets'], rows)
+        for _ in range(self.meta['max_depth']):
+            # Leaves have feature -2 and children -1; they are looked up
+            # harmlessly and then stay where they are.
+            values = flat[row_base + feature[node]]
+            go_left = values <= threshold[node]
+            missing = np.isnan(values)
+            if missing.any():
+                go_left = np.where(missing, missing_left[node] == 1, go_left)
+            child = np.where(go_left, left[node], right[node])
+            node = np.where(child >= 0, child, node)
+        return node.reshape(rows, n_trees)
+
+    def _forest_proba(self, X):
+        # sklearn trees evaluate float32 inputs against float64 thresholds.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        leaf_proba = self.arrays['proba'][self._leaves(X)]
+        if self.kind == KIND_TREE:
+            return leaf_proba[:, 0, :]
+
+        # Accumulate tree by tree, as sklearn does, rather than a pairwise sum().
+        proba = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for index in range(leaf_proba.shape[1]):
+            proba += leaf_proba[:, index, :]
+        proba /= leaf_proba.shape[1]
+        return proba
+
+    def __call__(self, X):
+        """predict_proba for raw (unscaled) feature rows."""
+        return self.model_proba(self.scale(X))
+
+
+def compile_estimator(model, scaler=None):
+    """
+    Compile a fitted estimator and scaler into a CompiledScorer.
+
+    Returns:
+        CompiledScorer, or None when the estimator cannot be compiled
+    """
+    # Artifact-backed models already evaluate through a compiled scorer.
+    compiled = getattr(model, 'scorer', None)
+    if isinstance(compiled, CompiledScorer):
+        return compiled
+    try:
+        return CompiledScorer(*extract_arrays(model, scaler))
+    except (ValueError, AttributeError):
+        return None
+
+
+def verify_scorer(scorer, model, scaler, X):
+    """True when the scorer's probabilities equal the estimator's bit for bit on X."""
+    X = np.asarray(X, dtype=np.float64)
+    scaled = scaler.transform(X) if scaler is not None else X
+    expected = np.asarray(model.predict_proba(scaled), dtype=np.float64)
+    actual = scorer(X)
+    return expected.shape == actual.shape and np.array_equal(expected, actual, equal_nan=True)
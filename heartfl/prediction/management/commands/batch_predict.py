@@ -0,0 +1,55 @@
+"""
+Django management command to score a hospital CSV dataset in bulk.
+
+Usage:
+    python manage.py batch_predict media/hospital_datasets/Hospital1/Hospital_A.csv
+    python manage.py batch_predict input.csv --output scored.csv --chunk-size 10000
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.batch_scoring import DEFAULT_CHUNK_SIZE, ScoringStats, score_csv
+from prediction.model_registry import get_predictor
+
+
+class Command(BaseCommand):
+    help = "Score every row of a hospital CSV and write a scored CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Hospital CSV with the raw training-set columns')
+        parser.add_argument(
+            '--output',
+            help='Scored CSV path (default: <input>_scored.csv)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows scored per model call (default: {DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['csv_path']
+        if not os.path.exists(csv_path):
+            raise CommandError(f'CSV file not found: {csv_path}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        output_path = options['output'] or f'{os.path.splitext(csv_path)[0]}_scored.csv'
+        stats = ScoringStats()
+
+        try:
+            with open(output_path, 'w', newline='') as output:
+                for text in score_csv(csv_path, get_predictor(), options['chunk_size'], stats):
+                    output.write(text)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Scored {stats.rows} rows in {stats.seconds:.2f}s '
+                f'({stats.rows_per_second:,.0f} rows/s) -> {output_path}'
+            )
+        )
@@ -0,0 +1,56 @@
+"""
+Django management command to benchmark the OCR page pipeline.
+
+Runs every page of a scanned PDF through each OCR mode in its own process
+and writes seconds per page and peak RSS as JSON:
+
+- png:        the original path, 300-dpi RGB render, PNG encode, PIL decode
+- grayscale:  300-dpi grayscale render written straight to Tesseract as PGM
+- adaptive:   150 dpi first, 300 dpi only for low-confidence pages
+
+Without the tesseract binary only rendering and image hand-off are timed.
+
+Usage:
+    python manage.py benchmark_ocr
+    python manage.py benchmark_ocr --pdf reports/scan.pdf --output bench/ocr.json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from prediction.benchmarks import ocr_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark OCR time per page and peak memory of each rendering mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pdf', help='Scanned PDF to use (default: a synthetic scanned report)')
+        parser.add_argument('--pages', type=int, default=4, help='Pages in the synthetic report (default: 4)')
+        parser.add_argument(
+            '--output',
+            default='ocr_benchmark.json',
+            help='JSON results path (default: ocr_benchmark.json, "-" for stdout)',
+        )
+
+    def handle(self, *args, **options):
+        results = ocr_benchmark(pdf_path=options['pdf'], pages=options['pages'])
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+        if not results['tesseract']:
+            self.stdout.write(self.style.WARNING('  tesseract not found: timing rendering only'))
+        for mode, result in results['modes'].items():
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"  {mode:<10} failed: {result['error']}"))
+                continue
+            self.stdout.write(
+                f"  {mode:<10} {result['seconds_per_page'] * 1000:>8.1f} ms/page  "
+                f"peak RSS {(result['peak_rss_bytes'] or 0) / 1024 / 1024:>7.1f} MB"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✓ Benchmark results written to {options['output']}"))
@@ -0,0 +1,84 @@
+"""
+Django management command to benchmark the prediction hot path.
+
+Writes single-row latency percentiles, batch throughput, warm and cold load
+times and per-worker memory for each scoring backend, plus clinical-text
+parser timings on long OCR dumps and report render times, as JSON so
+results can be compared across commits.
+
+Usage:
+    python manage.py benchmark_prediction
+    python manage.py benchmark_prediction --output bench/prediction.json --iterations 5000
+    python manage.py benchmark_prediction --quick
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from prediction.benchmarks import BATCH_SIZES, OCR_DUMP_PAGES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Benchmark HeartDiseasePredictor latency, throughput, load time and memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='prediction_benchmark.json',
+            help='JSON results path (default: prediction_benchmark.json, "-" for stdout)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=1000,
+            help='Single-row calls timed per method (default: 1000)',
+        )
+        parser.add_argument(
+            '--quick',
+            action='store_true',
+            help='Small smoke run: 100 iterations, batches up to 1k rows, no cold start',
+        )
+        parser.add_argument('--no-cold-start', action='store_true', help='Skip the subprocess cold-start run')
+
+    def handle(self, *args, **options):
+        quick = options['quick']
+        results = run_benchmarks(
+            iterations=100 if quick else options['iterations'],
+            sizes=BATCH_SIZES[:3] if quick else BATCH_SIZES,
+            include_cold_start=not (quick or options['no_cold_start']),
+            max_rows=5000 if quick else None,
+            parser_pages=OCR_DUMP_PAGES[:2] if quick else OCR_DUMP_PAGES,
+            report_iterations=10 if quick else 50,
+        )
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+        for name, backend in results['backends'].items():
+            latency = backend['latency']['predict_from_features']
+            largest = list(backend['throughput'].values())[-1]
+            self.stdout.write(
+                f"  {name:<9} p50 {latency['p50_us']:>8.1f} us  p99 {latency['p99_us']:>8.1f} us  "
+                f"{largest['rows_per_second']:>12,.0f} rows/s"
+            )
+        for pages, parser in results.get('clinical_parser', {}).items():
+            self.stdout.write(
+                f"  parser {pages:>3} pages  {parser['single_pass_seconds'] * 1000:>8.2f} ms  "
+                f"(original {parser['reference_seconds'] * 1000:.2f} ms, {parser['speedup']:.1f}x)"
+            )
+        for layout, report in results.get('report_rendering', {}).items():
+            self.stdout.write(
+                f"  report {layout:<8} {report['cached_styles_ms']:>8.2f} ms  "
+                f"(styles rebuilt per report {report['rebuilt_styles_ms']:.2f} ms)"
+            )
+        if 'cold_start' in results and 'load_seconds' in results['cold_start']:
+            cold = results['cold_start']
+            self.stdout.write(
+                f"  cold start {cold['load_seconds'] * 1000:.1f} ms, "
+                f"{(cold.get('model_rss_bytes') or 0) / 1024 / 1024:.1f} MB per worker"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✓ Benchmark results written to {options['output']}"))
@@ -0,0 +1,84 @@
+"""
+Django management command to export the trained model as a memory-mapped artifact.
+
+Workers load ml_models/heart_disease_model.artifact instead of unpickling the
+model whenever the artifact was exported from the current pickle files.
+
+Usage:
+    python manage.py export_model_artifact
+    python manage.py export_model_artifact --verify-csv media/hospital_datasets/Hospital1/Hospital_A.csv
+"""
+
+import os
+import pickle
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.batch_scoring import encode_chunk
+from prediction.compiled_scorer import verify_scorer
+from prediction.ml_model import HeartDiseasePredictor, synthetic_batch
+from prediction.model_artifacts import export_artifact, load_artifact
+
+
+class Command(BaseCommand):
+    help = "Export the pickled model and scaler to a memory-mapped artifact file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-path', help='Pickled estimator (default: ml_models/heart_disease_model.pkl)')
+        parser.add_argument('--scaler-path', help='Pickled scaler (default: ml_models/scaler.pkl)')
+        parser.add_argument('--output', help='Artifact path (default: next to the model pickle)')
+        parser.add_argument(
+            '--verify-csv',
+            action='append',
+            default=[],
+            help='Hospital CSV whose rows must score identically (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        predictor = HeartDiseasePredictor(model_path=options['model_path'], scaler_path=options['scaler_path'])
+        if predictor.model_source == 'artifact':
+            # Always export from the sklearn objects, never from an older artifact.
+            predictor = _pickle_predictor(predictor)
+        if predictor.model is None:
+            raise CommandError(f'No trained model could be loaded from {predictor.model_path}')
+
+        try:
+            path = export_artifact(predictor, options['output'])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        started = time.perf_counter()
+        model, _ = load_artifact(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        batches = [('synthetic batch', synthetic_batch(rows=1000))]
+        for csv_path in options['verify_csv']:
+            if not os.path.exists(csv_path):
+                raise CommandError(f'CSV file not found: {csv_path}')
+            batches.append((csv_path, encode_chunk(pd.read_csv(csv_path))))
+
+        for name, X in batches:
+            if not verify_scorer(model.scorer, predictor.model, predictor.scaler, X):
+                os.remove(path)
+                raise CommandError(f'Artifact predictions differ from scikit-learn on {name}; artifact removed')
+            self.stdout.write(f'  ✓ {len(X)} rows identical ({name})')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Exported {model.artifact.meta["estimator"]} to {path} '
+                f'({os.path.getsize(path):,} bytes, loads in {load_ms:.2f} ms)'
+            )
+        )
+
+
+def _pickle_predictor(predictor):
+    """Predictor holding the unpickled sklearn objects for the same files."""
+    with open(predictor.model_path, 'rb') as f:
+        predictor.model = pickle.load(f)
+    if os.path.exists(predictor.scaler_path):
+        with open(predictor.scaler_path, 'rb') as f:
+            predictor.scaler = pickle.load(f)
+    predictor.model_source = 'pickle'
+    return predictor
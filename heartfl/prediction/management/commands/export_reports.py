@@ -0,0 +1,83 @@
+"""
+Django management command to export prediction reports as one ZIP.
+
+Usage:
+    python manage.py export_reports --output reports.zip
+    python manage.py export_reports --hospital 3 --start 2025-01-01 --end 2025-03-31 --output q1.zip
+    python manage.py export_reports --doctor 7 --workers 8 --output dr7.zip
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from hospitals.models import Doctor, Hospital
+from prediction.report_cache import get_report_cache
+from prediction.report_export import ExportStats, iter_report_zip, select_predictions
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'{value!r} is not a YYYY-MM-DD date')
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Render the PDF reports of the selected predictions into a ZIP archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help='ZIP file to write')
+        parser.add_argument('--doctor', type=int, help='Only predictions by this Doctor id')
+        parser.add_argument('--hospital', type=int, help="Only predictions by this Hospital id's doctors")
+        parser.add_argument('--start', type=_date, help='First prediction date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=_date, help='Last prediction date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Render processes (default: REPORT_EXPORT_WORKERS)',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Render every report instead of reusing and filling the report cache',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] <= 0:
+            raise CommandError('--workers must be positive')
+        try:
+            doctor = Doctor.objects.get(pk=options['doctor']) if options['doctor'] else None
+            hospital = Hospital.objects.get(pk=options['hospital']) if options['hospital'] else None
+        except (Doctor.DoesNotExist, Hospital.DoesNotExist) as exc:
+            raise CommandError(str(exc)) from exc
+
+        predictions = select_predictions(doctor, hospital, options['start'], options['end'])
+        stats = ExportStats(predictions.count())
+        if not stats.total:
+            raise CommandError('No predictions match the selection')
+
+        step = max(1, stats.total // 10)
+
+        def progress(stats):
+            if stats.reports % step == 0 or stats.reports == stats.total:
+                self.stdout.write(
+                    f'  {stats.reports:>6}/{stats.total} reports  '
+                    f'{stats.reports_per_second:>7.1f} reports/s  ({stats.cached} cached)'
+                )
+
+        with open(options['output'], 'wb') as output:
+            for chunk in iter_report_zip(
+                predictions.iterator(chunk_size=200),
+                cache=None if options['no_cache'] else get_report_cache(),
+                workers=options['workers'],
+                stats=stats,
+                progress=progress,
+            ):
+                output.write(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Exported {stats.reports} reports ({stats.bytes / 1e6:.1f} MB) in {stats.seconds:.2f}s '
+                f'({stats.reports_per_second:,.1f} reports/s) -> {options["output"]}'
+            )
+        )
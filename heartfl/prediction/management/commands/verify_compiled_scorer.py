@@ -0,0 +1,83 @@
+"""
+Django management command to check the compiled NumPy scorer against scikit-learn.
+
+Scores every bundled hospital CSV (or the given files) with both the pickled
+estimator and the compiled scorer and fails unless the probabilities are
+identical bit for bit.
+
+Usage:
+    python manage.py verify_compiled_scorer
+    python manage.py verify_compiled_scorer path/to/hospital.csv
+"""
+
+import os
+import pickle
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.batch_scoring import bundled_hospital_csvs, encode_chunk
+from prediction.compiled_scorer import compile_estimator, verify_scorer
+from prediction.ml_model import default_model_path, default_scaler_path
+
+
+class Command(BaseCommand):
+    help = "Verify the compiled scorer reproduces scikit-learn exactly on hospital CSVs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_paths', nargs='*', help='CSV files (default: bundled hospital datasets)')
+        parser.add_argument('--model-path', default=None, help='Pickled estimator')
+        parser.add_argument('--scaler-path', default=None, help='Pickled scaler')
+
+    def handle(self, *args, **options):
+        model_path = options['model_path'] or default_model_path()
+        scaler_path = options['scaler_path'] or default_scaler_path()
+        if not os.path.exists(model_path):
+            raise CommandError(f'Model file not found: {model_path}')
+
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        scaler = None
+        if os.path.exists(scaler_path):
+            with open(scaler_path, 'rb') as f:
+                scaler = pickle.load(f)
+
+        scorer = compile_estimator(model, scaler)
+        if scorer is None:
+            raise CommandError(f'{type(model).__name__} cannot be compiled')
+
+        csv_paths = options['csv_paths'] or bundled_hospital_csvs()
+        if not csv_paths:
+            raise CommandError('No hospital CSVs found to verify against')
+
+        failures = 0
+        for csv_path in csv_paths:
+            try:
+                X = encode_chunk(pd.read_csv(csv_path))
+            except ValueError as exc:
+                raise CommandError(f'{csv_path}: {exc}') from exc
+
+            started = time.perf_counter()
+            scaled = scaler.transform(X) if scaler is not None else X
+            model.predict_proba(scaled)
+            sklearn_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            scorer(X)
+            compiled_seconds = time.perf_counter() - started
+
+            if verify_scorer(scorer, model, scaler, X):
+                self.stdout.write(
+                    f'  ✓ {len(X)} rows identical, {sklearn_seconds * 1000:.1f} ms -> '
+                    f'{compiled_seconds * 1000:.1f} ms ({csv_path})'
+                )
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'  ✗ probabilities differ ({csv_path})'))
+
+        if failures:
+            raise CommandError(f'Compiled scorer differs from scikit-learn on {failures} file(s)')
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Compiled {scorer.meta["estimator"]} verified on {len(csv_paths)} file(s)')
+        )
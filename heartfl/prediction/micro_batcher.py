@@ -0,0 +1,172 @@
+"""
+Micro-Batching Inference
+Coalesces concurrent single-row predictions into one predict_proba call
+
+Each request thread puts its feature row on a queue and waits on a Future.
+A background thread collects rows until either the batch is full or the wait
+window has elapsed, scores them with one predict_many call and resolves every
+Future. This trades up to PREDICTION_MICROBATCH_MAX_WAIT_MS of latency for
+far fewer sklearn calls on multi-threaded workers (gthread, ASGI).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import get_predictor
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request waits for its batch before giving up.
+DEFAULT_TIMEOUT = 10.0
+
+
+class MicroBatcher:
+    """
+    Queue-backed batcher in front of the shared predictor.
+
+    Args:
+        max_batch_size: rows scored per model call at most
+        max_wait_ms: how long the first row in a batch waits for company
+        predictor_getter: callable returning the predictor to use per batch
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0, predictor_getter=get_predictor):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._predictor_getter = predictor_getter
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+
+    def _ensure_worker(self):
+        """Start the worker thread, again after a fork since threads do not survive it."""
+        if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run, args=(self._queue,), name='heartfl-microbatch', daemon=True
+            )
+            self._worker.start()
+
+    def submit(self, features_list, predictor=None):
+        """
+        Queue one 11-value feature row; returns a Future of (label, probability).
+        Pass predictor to pin the model that scores it (e.g. across a hot reload).
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((features_list, future, predictor))
+        return future
+
+    def predict_from_features(self, features_list, timeout=None, predictor=None):
+        """
+        Blocking equivalent of HeartDiseasePredictor.predict_from_features.
+        Waits at most timeout seconds (default PREDICTION_MICROBATCH_TIMEOUT).
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'PREDICTION_MICROBATCH_TIMEOUT', DEFAULT_TIMEOUT)
+        return self.submit(features_list, predictor).result(timeout=timeout)
+
+    def _collect(self, work_queue):
+        """Block for the first row, then gather more until full or the window closes."""
+        batch = [work_queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(work_queue.get(timeout=remaining) if remaining > 0 else work_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, work_queue):
+        while True:
+            batch = []
+            try:
+                batch = self._collect(work_queue)
+
+                # Rows pinned to different predictors (rare: only around a model swap)
+                # are scored separately.
+                groups = {}
+                for row, future, predictor in batch:
+                    predictor = predictor or self._predictor_getter()
+                    groups.setdefault(id(predictor), (predictor, []))[1].append((row, future))
+
+                for predictor, items in groups.values():
+                    self._score(predictor, items)
+            except Exception as exc:
+                # Keep the worker alive: fail this batch's waiting requests only.
+                logger.exception('Micro-batch failed: %s', exc)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _score(self, predictor, items):
+        futures = [future for _, future in items]
+        try:
+            features = np.array([row for row, _ in items], dtype=np.float64)
+            result = predictor.predict_many(features)
+        except Exception as exc:
+            logger.exception('Micro-batch prediction failed: %s', exc)
+            for future in futures:
+                future.set_exception(exc)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._rows += len(items)
+            self._largest_batch = max(self._largest_batch, len(items))
+
+        for index, future in enumerate(futures):
+            label = 'High Risk' if result.labels[index] == 1 else 'Low Risk'
+            future.set_result((label, float(result.probabilities[index])))
+
+    def stats(self):
+        """Counters describing the batch sizes achieved so far."""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide MicroBatcher configured from settings."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    max_batch_size=getattr(settings, 'PREDICTION_MICROBATCH_MAX_SIZE', 64),
+                    max_wait_ms=getattr(settings, 'PREDICTION_MICROBATCH_MAX_WAIT_MS', 2.0),
+                )
+    return _batcher
+
+
+def predict_from_features(features_list, predictor=None):
+    """Score one feature row, through the micro-batcher when it is enabled."""
+    if getattr(settings, 'PREDICTION_MICROBATCH_ENABLED', False):
+        return get_batcher().predict_from_features(features_list, predictor=predictor)
+    return (predictor or get_predictor()).predict_from_features(features_list)
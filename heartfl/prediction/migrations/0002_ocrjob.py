@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-17 02:13
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('pdf_file', models.FileField(blank=True, help_text='Deleted once the job finishes', upload_to='ocr_jobs/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('pages_done', models.PositiveIntegerField(default=0)),
+                ('pages_total', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, help_text='Parsed clinical fields', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocr_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'OCR Job',
+                'verbose_name_plural': 'OCR Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -3,219 +3,254 @@ ML Model Integration
 Heart Disease Prediction using scikit-learn
 This module handles loading and using the pre-trained model
 """
+import hashlib
 import os
 import pickle
+from collections import namedtuple
+
 import numpy as np
 from django.conf import settings
+from django.db.models import QuerySet
+
+from .compiled_scorer import compile_estimator, verify_scorer
+from .model_artifacts import artifact_path_for, load_artifact
+from .rule_scorer import rule_based_predict
+
+NUM_FEATURES = 11
+
+# model_hash reported when the rule-based fallback is serving predictions.
+RULES_MODEL_HASH = 'rules'
+
+# PatientData fields in model feature order.
+PATIENT_FEATURE_FIELDS = (
+    'age', 'gender', 'chest_pain_type', 'resting_bp', 'cholesterol', 'fasting_bs',
+    'resting_ecg', 'max_heart_rate', 'exercise_angina', 'oldpeak', 'st_slope',
+)
+
+# Result of predict_many: labels (1=High Risk, 0=Low Risk) and
+# probability (%) of the predicted class, one entry per input row.
+BatchPrediction = namedtuple('BatchPrediction', ['labels', 'probabilities'])
+
+
+def default_model_path():
+    """Path of the pickled estimator shipped in ml_models/"""
+    return os.path.join(settings.BASE_DIR, 'ml_models', 'heart_disease_model.pkl')
+
+
+def default_scaler_path():
+    """Path of the pickled feature scaler shipped in ml_models/"""
+    return os.path.join(settings.BASE_DIR, 'ml_models', 'scaler.pkl')
+
+
+# Plausible (low, high) range per feature for synthetic validation batches.
+_SYNTHETIC_RANGES = [
+    (25, 80), (0, 1), (0, 3), (90, 200), (120, 400), (0, 1),
+    (0, 2), (60, 200), (0, 1), (0, 6), (0, 2),
+]
+
+
+def synthetic_batch(rows=64, seed=0):
+    """Deterministic batch of plausible patients used to validate and warm a model."""
+    rng = np.random.default_rng(seed)
+    low = np.array([r[0] for r in _SYNTHETIC_RANGES], dtype=np.float64)
+    high = np.array([r[1] for r in _SYNTHETIC_RANGES], dtype=np.float64)
+    return np.round(rng.uniform(low, high, size=(rows, NUM_FEATURES)), 1)
+
+
+def _read_bytes(path):
+    """File contents, or None when the file does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
 
 
 class HeartDiseasePredictor:
     """
     Heart Disease Prediction Model Wrapper
     Loads the pre-trained model and makes predictions
+
+    Instances hold no per-request state once loaded, so a single predictor
+    can be shared across threads. Views should obtain it from
+    prediction.model_registry instead of constructing a new one.
     """
     
-    def __init__(self):
+    def __init__(self, model_path=None, scaler_path=None):
         self.model = None
         self.scaler = None
-        self.model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'heart_disease_model.pkl')
-        self.scaler_path = os.path.join(settings.BASE_DIR, 'ml_models', 'scaler.pkl')
+        self.scorer = None
+        self.model_hash = RULES_MODEL_HASH
+        self.model_path = model_path or default_model_path()
+        self.scaler_path = scaler_path or default_scaler_path()
         self.load_model()
     
     def load_model(self):
         """
-        Load the pre-trained model and scaler from pickle files
+        Load the pre-trained model and scaler
+        Prefers a memory-mapped artifact exported from the same pickle files
+        (see prediction.model_artifacts) and falls back to unpickling them.
         If model doesn't exist, use a dummy predictor for demo
         """
+        # Hash of the pickle bytes identifies exactly which model serves a prediction.
+        digest = hashlib.sha256()
+        self.model_source = None
         try:
-            if os.path.exists(self.model_path):
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                print("Heart disease model loaded successfully")
-            else:
+            model_bytes = _read_bytes(self.model_path)
+            scaler_bytes = _read_bytes(self.scaler_path)
+            for data in (model_bytes, scaler_bytes):
+                if data is not None:
+                    digest.update(data)
+
+            if model_bytes is None:
                 print("Model file not found. Using dummy predictor for demo.")
                 self.model = None
-            
-            # Load scaler if available
-            if os.path.exists(self.scaler_path):
-                with open(self.scaler_path, 'rb') as f:
-                    self.scaler = pickle.load(f)
-                print("Feature scaler loaded successfully")
+            elif self._load_artifact(digest.hexdigest(), scaler_bytes is not None):
+                print("Heart disease model loaded from memory-mapped artifact")
             else:
-                self.scaler = None
+                self.model = pickle.loads(model_bytes)
+                self.model_source = 'pickle'
+                print("Heart disease model loaded successfully")
+            
+            # Load scaler if available (the artifact already carries it)
+            if self.model_source != 'artifact':
+                if scaler_bytes is not None:
+                    self.scaler = pickle.loads(scaler_bytes)
+                    print("Feature scaler loaded successfully")
+                else:
+                    self.scaler = None
         except Exception as e:
             print(f"Error loading model: {e}. Using dummy predictor.")
             self.model = None
             self.scaler = None
+
+        self.model_hash = digest.hexdigest() if self.model is not None else RULES_MODEL_HASH
+        self.scorer = self._compile_scorer()
+
+    def _compile_scorer(self):
+        """
+        Compiled NumPy scorer for the loaded model (see prediction.compiled_scorer),
+        used only if it reproduces the estimator's probabilities exactly.
+        """
+        if self.model is None:
+            return None
+        try:
+            scorer = compile_estimator(self.model, self.scaler)
+            if scorer is None:
+                return None
+            if not verify_scorer(scorer, self.model, self.scaler, synthetic_batch()):
+                print("Compiled scorer disagrees with the model. Using the estimator directly.")
+                return None
+            return scorer
+        except Exception as e:
+            print(f"Could not compile model: {e}. Using the estimator directly.")
+            return None
+
+    def _load_artifact(self, source_hash, needs_scaler):
+        """Use the memory-mapped artifact if it was exported from these exact pickles."""
+        artifact_path = artifact_path_for(self.model_path)
+        if not os.path.exists(artifact_path):
+            return False
+        try:
+            model, scaler = load_artifact(artifact_path)
+        except Exception as e:
+            print(f"Ignoring unreadable model artifact: {e}")
+            return False
+        if model.artifact.meta.get('source_hash') != source_hash or (needs_scaler and scaler is None):
+            print("Model artifact is stale. Re-export it with manage.py export_model_artifact.")
+            return False
+
+        self.model = model
+        self.scaler = scaler
+        self.model_source = 'artifact'
+        return True
+
+    @property
+    def model_version(self):
+        """Short content-derived version recorded on every PredictionResult."""
+        return self.model_hash[:12]
     
-    def predict_from_features(self, features_list):
+    def predict_many(self, rows):
         """
-        Make prediction from feature vector (list of 11 values).
-        
+        Score a batch of patients with one scaler and one predict_proba call.
+
         Args:
-            features_list: List of 11 features [age, sex, cp, bp, chol, fbs, ecg, hr, ea, oldpeak, slope]
-        
+            rows: (N, 11) feature matrix, list of feature lists, list of
+                  PatientData rows or a PatientData QuerySet
+
         Returns:
-            (prediction_label, probability_percentage)
+            BatchPrediction with int8 labels (1=High Risk, 0=Low Risk) and
+            float64 probabilities (%) of the predicted class
         """
-        features = np.array(features_list, dtype=float).reshape(1, -1)
-        
+        features = self.feature_matrix(rows)
+        if features.shape[0] == 0:
+            return BatchPrediction(np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.float64))
+
         if self.model is not None:
             try:
-                # Keep inference preprocessing aligned with training.
-                if self.scaler is not None:
-                    features = self.scaler.transform(features)
-
-                prediction = self.model.predict(features)[0]
-                probability = self.model.predict_proba(features)[0]
-
-                # Use predicted-class confidence instead of a hardcoded class index.
-                prob_percentage = self._get_predicted_class_probability(prediction, probability)
-                
-                result = 'High Risk' if prediction == 1 else 'Low Risk'
-                return result, float(prob_percentage)
-                
+                if self.scorer is not None:
+                    probability = self.scorer(features)
+                else:
+                    # Keep inference preprocessing aligned with training.
+                    scaled = self.scaler.transform(features) if self.scaler is not None else features
+                    probability = np.asarray(self.model.predict_proba(scaled), dtype=np.float64)
+
+                # Derive labels from the same call instead of a second predict().
+                predicted_index = probability.argmax(axis=1)
+                classes = np.asarray(getattr(self.model, 'classes_', np.arange(probability.shape[1])))
+                labels = (classes[predicted_index] == 1).astype(np.int8)
+                probabilities = probability[np.arange(len(predicted_index)), predicted_index] * 100
+                return BatchPrediction(labels, probabilities)
+
             except Exception as e:
                 print(f"Prediction error: {e}")
-                return self._dummy_prediction_from_features(features_list)
-        else:
-            return self._dummy_prediction_from_features(features_list)
-    
-    def _dummy_prediction_from_features(self, features_list):
+
+        return self._dummy_predict_many(features)
+
+    def _dummy_predict_many(self, features):
         """
-        Dummy predictor using feature vector (for backward compatibility).
-        Uses comprehensive risk scoring based on established factors.
+        Dummy predictor for demo and fresh nodes without a trained model.
+        Uses the vectorized rule-based risk scoring in prediction.rule_scorer.
         """
-        # features_list: [age, sex, cp, bp, chol, fbs, ecg, hr, ea, oldpeak, slope]
-        age = features_list[0]
-        sex = features_list[1]  # 1=Male, 0=Female
-        chest_pain_type = features_list[2]
-        resting_bp = features_list[3]
-        cholesterol = features_list[4]
-        fasting_bs = features_list[5]
-        resting_ecg = features_list[6]
-        max_heart_rate = features_list[7]
-        exercise_angina = features_list[8]
-        oldpeak = features_list[9]
-        st_slope = features_list[10]
-        
-        risk_score = 20  # Base score
-        
-        # Age risk
-        if age >= 70:
-            risk_score += 25
-        elif age >= 60:
-            risk_score += 20
-        elif age >= 50:
-            risk_score += 15
-        elif age >= 40:
-            risk_score += 8
-        else:
-            risk_score += 2
-        
-        # Sex risk
-        if sex == 1:
-            risk_score += 10
-        
-        # Cholesterol risk
-        if cholesterol >= 300:
-            risk_score += 30
-        elif cholesterol >= 240:
-            risk_score += 25
-        elif cholesterol >= 200:
-            risk_score += 15
-        elif cholesterol >= 160:
-            risk_score += 5
-        elif cholesterol < 160:
-            risk_score -= 2
-        
-        # Blood Pressure risk
-        if resting_bp >= 180:
-            risk_score += 25
-        elif resting_bp >= 160:
-            risk_score += 20
-        elif resting_bp >= 140:
-            risk_score += 15
-        elif resting_bp >= 130:
-            risk_score += 10
-        elif resting_bp >= 120:
-            risk_score += 5
-        elif resting_bp < 120:
-            risk_score -= 3
-        
-        # Heart Rate risk
-        if max_heart_rate < 60:
-            risk_score += 15
-        elif max_heart_rate < 70:
-            risk_score += 8
-        elif max_heart_rate <= 100:
-            risk_score -= 2
-        elif max_heart_rate <= 120:
-            risk_score += 3
-        elif max_heart_rate <= 150:
-            risk_score += 8
-        else:
-            risk_score += 12
-        
-        # Chest Pain Type risk
-        if chest_pain_type == 0:
-            risk_score += 20
-        elif chest_pain_type == 1:
-            risk_score += 12
-        elif chest_pain_type == 2:
-            risk_score += 5
-        else:
-            risk_score += 2
-        
-        # Exercise-induced Angina risk
-        if exercise_angina == 1:
-            risk_score += 25
-        
-        # ST Depression risk
-        if oldpeak >= 3.0:
-            risk_score += 30
-        elif oldpeak >= 2.0:
-            risk_score += 25
-        elif oldpeak >= 1.5:
-            risk_score += 20
-        elif oldpeak >= 1.0:
-            risk_score += 15
-        elif oldpeak >= 0.5:
-            risk_score += 10
-        elif oldpeak > 0:
-            risk_score += 5
-        
-        # ST Slope risk
-        if st_slope == 2:
-            risk_score += 15
-        elif st_slope == 1:
-            risk_score += 8
-        
-        # Resting ECG risk
-        if resting_ecg == 2:
-            risk_score += 15
-        elif resting_ecg == 1:
-            risk_score += 10
-        
-        # Fasting Blood Sugar risk
-        if fasting_bs == 1:
-            risk_score += 15
-        
-        # Normalize score
-        risk_score = max(10, min(95, risk_score))
+        labels, scores = rule_based_predict(features)
+        return BatchPrediction(labels, scores)
+
+    def feature_matrix(self, rows):
+        """Convert any supported batch input into a float64 (N, 11) matrix."""
+        if isinstance(rows, QuerySet):
+            values = list(rows.values_list(*PATIENT_FEATURE_FIELDS))
+            if not values:
+                return np.zeros((0, NUM_FEATURES), dtype=np.float64)
+            matrix = np.array(values, dtype=object)
+            matrix[:, 1] = matrix[:, 1] == 'M'  # Sex: 1=Male, 0=Female
+            return matrix.astype(np.float64)
+
+        if isinstance(rows, np.ndarray):
+            return np.asarray(rows, dtype=np.float64).reshape(-1, NUM_FEATURES)
+
+        rows = list(rows)
+        if rows and not isinstance(rows[0], (list, tuple, np.ndarray)):
+            rows = [self._patient_row(patient) for patient in rows]
+        return np.array(rows, dtype=np.float64).reshape(-1, NUM_FEATURES)
+
+    def predict_from_features(self, features_list):
+        """
+        Make prediction from feature vector (list of 11 values).
         
-        # High risk if >= 50
-        result = 'High Risk' if risk_score >= 50 else 'Low Risk'
-        probability = risk_score
+        Args:
+            features_list: List of 11 features [age, sex, cp, bp, chol, fbs, ecg, hr, ea, oldpeak, slope]
         
-        return result, probability
-    
-    def prepare_features(self, patient_data):
-        """
-        Prepare patient data for prediction
-        Convert model fields to feature array
+        Returns:
+            (prediction_label, probability_percentage)
         """
-        features = [
+        batch = self.predict_many([features_list])
+        result = 'High Risk' if batch.labels[0] == 1 else 'Low Risk'
+        return result, float(batch.probabilities[0])
+    
+    def _patient_row(self, patient_data):
+        """Feature list for a Django or MongoDB PatientData record."""
+        if hasattr(patient_data, 'to_feature_vector'):
+            return patient_data.to_feature_vector()
+        return [
             patient_data.age,
             1 if patient_data.gender == 'M' else 0,  # Sex: 1=Male, 0=Female
             patient_data.chest_pain_type,
@@ -228,191 +263,19 @@ class HeartDiseasePredictor:
             patient_data.oldpeak,
             patient_data.st_slope
         ]
-        return np.array(features).reshape(1, -1)
 
-    def _get_predicted_class_probability(self, prediction, probability_row):
-        """Return probability (%) for the predicted class using model classes mapping."""
-        classes = list(getattr(self.model, 'classes_', []))
-        if classes:
-            try:
-                predicted_index = classes.index(prediction)
-                return float(probability_row[predicted_index] * 100)
-            except ValueError:
-                pass
+    def prepare_features(self, patient_data):
+        """
+        Prepare patient data for prediction
+        Convert model fields to feature array
+        """
+        return np.array(self._patient_row(patient_data)).reshape(1, -1)
 
-        # Fallback for uncommon estimators where classes_ mapping is unavailable.
-        return float(np.max(probability_row) * 100)
-    
     def predict(self, patient_data):
         """
         Make prediction for patient data
         Returns: (prediction_label, probability_percentage)
         """
-        features = self.prepare_features(patient_data)
-        
-        if self.model is not None:
-            try:
-                # Scale features if scaler available
-                if self.scaler is not None:
-                    features_scaled = self.scaler.transform(features)
-                else:
-                    features_scaled = features
-                
-                # Use actual model prediction
-                prediction = self.model.predict(features_scaled)[0]
-                probability = self.model.predict_proba(features_scaled)[0]
-
-                prob_percentage = self._get_predicted_class_probability(prediction, probability)
-                
-                result = 'high' if prediction == 1 else 'low'
-                return result, float(prob_percentage)
-                
-            except Exception as e:
-                print(f"Prediction error: {e}")
-                return self._dummy_prediction(features)
-        else:
-            # Use dummy prediction for demo
-            return self._dummy_prediction(features)
-    
-    def _dummy_prediction(self, features):
-        """
-        Improved dummy prediction logic using comprehensive risk scoring.
-        Based on established cardiovascular risk factors.
-        
-        Features: [age, sex(1=M,0=F), chest_pain, bp, cholesterol, fasting_bs, ecg, hr, exercise_angina, oldpeak, st_slope]
-        """
-        # Extract all features
-        age = features[0][0]
-        sex = features[0][1]  # 1=Male, 0=Female
-        chest_pain_type = features[0][2]
-        resting_bp = features[0][3]
-        cholesterol = features[0][4]
-        fasting_bs = features[0][5]  # 1=True(>120), 0=False
-        resting_ecg = features[0][6]
-        max_heart_rate = features[0][7]
-        exercise_angina = features[0][8]  # 1=Yes, 0=No
-        oldpeak = features[0][9]  # ST depression
-        st_slope = features[0][10]
-        
-        risk_score = 20  # Base score
-        
-        # ============ AGE RISK (important predictor) ============
-        if age >= 70:
-            risk_score += 25
-        elif age >= 60:
-            risk_score += 20
-        elif age >= 50:
-            risk_score += 15
-        elif age >= 40:
-            risk_score += 8
-        else:
-            risk_score += 2  # Even young people can have risk
-        
-        # ============ SEX RISK ============
-        # Males have higher risk, but females with risk factors also at risk
-        if sex == 1:  # Male
-            risk_score += 10
-        
-        # ============ CHOLESTEROL RISK (strong predictor) ============
-        if cholesterol >= 300:
-            risk_score += 30
-        elif cholesterol >= 240:
-            risk_score += 25
-        elif cholesterol >= 200:
-            risk_score += 15
-        elif cholesterol >= 160:
-            risk_score += 5
-        # Low cholesterol is protective
-        elif cholesterol < 160:
-            risk_score -= 2
-        
-        # ============ BLOOD PRESSURE RISK (strong predictor) ============
-        if resting_bp >= 180:
-            risk_score += 25
-        elif resting_bp >= 160:
-            risk_score += 20
-        elif resting_bp >= 140:
-            risk_score += 15
-        elif resting_bp >= 130:
-            risk_score += 10
-        elif resting_bp >= 120:
-            risk_score += 5
-        # Normal BP is protective
-        elif resting_bp < 120:
-            risk_score -= 3
-        
-        # ============ HEART RATE RISK ============
-        # Both too low (<60) and too high (>100) are concerning
-        if max_heart_rate < 60:
-            risk_score += 15  # Low HR can indicate cardiac issues
-        elif max_heart_rate < 70:
-            risk_score += 8
-        elif max_heart_rate <= 100:
-            risk_score -= 2  # Normal resting HR is good
-        elif max_heart_rate <= 120:
-            risk_score += 3  # Slightly elevated
-        elif max_heart_rate <= 150:
-            risk_score += 8  # Elevated
-        else:  # >150
-            risk_score += 12  # High HR concerning
-        
-        # ============ CHEST PAIN TYPE RISK ============
-        # 0=Typical Angina, 1=Atypical, 2=Non-anginal, 3=Asymptomatic
-        if chest_pain_type == 0:
-            risk_score += 20  # Typical angina is concerning
-        elif chest_pain_type == 1:
-            risk_score += 12  # Atypical is moderate
-        elif chest_pain_type == 2:
-            risk_score += 5   # Non-anginal is mild
-        else:
-            risk_score += 2   # Asymptomatic (but needs context)
-        
-        # ============ EXERCISE-INDUCED ANGINA RISK (strong predictor) ============
-        if exercise_angina == 1:
-            risk_score += 25  # Very concerning indicator
-        
-        # ============ ST DEPRESSION (OLDPEAK) RISK (strong predictor) ============
-        if oldpeak >= 3.0:
-            risk_score += 30  # Severe ST depression
-        elif oldpeak >= 2.0:
-            risk_score += 25
-        elif oldpeak >= 1.5:
-            risk_score += 20
-        elif oldpeak >= 1.0:
-            risk_score += 15
-        elif oldpeak >= 0.5:
-            risk_score += 10
-        elif oldpeak > 0:
-            risk_score += 5
-        
-        # ============ ST SLOPE RISK ============
-        # 0=Upsloping (good), 1=Flat (moderate), 2=Downsloping (bad)
-        if st_slope == 2:
-            risk_score += 15  # Downsloping is concerning
-        elif st_slope == 1:
-            risk_score += 8   # Flat is moderate
-        # Upsloping is neutral (0)
-        
-        # ============ RESTING ECG RISK ============
-        # 0=Normal, 1=ST-T wave abnormality, 2=LVH
-        if resting_ecg == 2:
-            risk_score += 15  # Left ventricular hypertrophy
-        elif resting_ecg == 1:
-            risk_score += 10  # ST-T wave abnormality
-        
-        # ============ FASTING BLOOD SUGAR RISK (diabetes) ============
-        if fasting_bs == 1:  # >120 mg/dl
-            risk_score += 15  # Diabetes/high blood sugar is risk factor
-        
-        # ============ NORMALIZE SCORE ============
-        # Clamp between 10-95 (never 0 or 100 for realism)
-        risk_score = max(10, min(95, risk_score))
-        
-        # ============ DETERMINE PREDICTION ============
-        # Using 50th percentile as threshold
-        # High risk: >= 50, Low risk: < 50
-        prediction = 'high' if risk_score >= 50 else 'low'
-        
-        return prediction, float(risk_score)
-
-
+        batch = self.predict_many([patient_data])
+        result = 'high' if batch.labels[0] == 1 else 'low'
+        return result, float(batch.probabilities[0])
@@ -0,0 +1,146 @@
+"""
+Memory-Mapped Model Artifacts
+Zero-copy on-disk format for the scaler and estimator arrays
+
+Unpickling the model imports scikit-learn and copies every array into each
+worker's private memory. The artifact format instead stores the numeric
+arrays (scaler mean/scale, linear coefficients or tree node arrays) in one
+file that every worker memory-maps read-only, so all workers share the same
+physical pages and a cold start is a file open plus a JSON header parse.
+
+File layout:
+    8 bytes   magic b'HFLART01'
+    8 bytes   little-endian header length
+    N bytes   JSON header {"meta": {...}, "arrays": {name: {dtype, shape, offset}}}
+    ...       raw array data, each array aligned to 64 bytes
+"""
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from .compiled_scorer import CompiledScorer, extract_arrays
+
+MAGIC = b'HFLART01'
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.artifact'
+
+
+def artifact_path_for(model_path):
+    """ml_models/heart_disease_model.pkl -> ml_models/heart_disease_model.artifact"""
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def write_artifact(path, meta, arrays):
+    """Write arrays to a single aligned buffer file, atomically."""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    header = json.dumps({'meta': meta, 'arrays': layout}, sort_keys=True).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    # Rename so workers never map a half-written file.
+    os.replace(tmp_path, path)
+
+
+def export_artifact(predictor, path=None):
+    """
+    Export a loaded HeartDiseasePredictor's arrays next to its pickle.
+
+    Returns:
+        path of the written artifact
+    """
+    if predictor.model is None:
+        raise ValueError('Predictor has no trained model to export')
+    meta, arrays = extract_arrays(predictor.model, predictor.scaler)
+    meta.update({
+        'source_hash': predictor.model_hash,
+        'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    path = path or artifact_path_for(predictor.model_path)
+    write_artifact(path, meta, arrays)
+    return path
+
+
+class ModelArtifact:
+    """Read-only, memory-mapped view of an artifact file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{path} is not a HeartFL model artifact')
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_length))
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        self.meta = header['meta']
+        self._buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        self.arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            array = np.frombuffer(self._buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+            self.arrays[name] = array.reshape(spec['shape'])
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+
+class ArtifactScaler:
+    """StandardScaler.transform over memory-mapped mean/scale arrays."""
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.mean_ = scorer.arrays['scaler_mean']
+        self.scale_ = scorer.arrays['scaler_scale']
+        self.n_features_in_ = len(self.mean_)
+
+    def transform(self, X):
+        return self.scorer.scale(X)
+
+
+class ArtifactModel:
+    """Estimator replacement evaluated directly from memory-mapped arrays."""
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.scorer = CompiledScorer(artifact.meta, artifact.arrays)
+        self.kind = self.scorer.kind
+        self.classes_ = self.scorer.classes_
+        self.n_features_in_ = self.scorer.n_features_in_
+
+    def predict_proba(self, X):
+        return self.scorer.model_proba(X)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_artifact(path):
+    """Return (model, scaler) backed by a memory-mapped artifact."""
+    model = ArtifactModel(ModelArtifact(path))
+    scaler = ArtifactScaler(model.scorer) if model.scorer.has_scaler else None
+    return model, scaler
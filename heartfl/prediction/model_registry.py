@@ -0,0 +1,148 @@
+"""
+Model Registry
+Process-wide cache of loaded HeartDiseasePredictor instances
+
+Unpickling the model and scaler is the most expensive part of a prediction
+request, so each model/scaler pair is loaded once per process and shared by
+every request thread. Under gunicorn the master can preload the registry
+before forking (see gunicorn_config.py) so workers share the pages
+copy-on-write instead of each paying the load cost.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows development machines
+    resource = None
+
+from .ml_model import HeartDiseasePredictor, default_model_path, default_scaler_path
+
+logger = logging.getLogger(__name__)
+
+
+def _footprint(predictor):
+    """
+    Approximate bytes held by the model and scaler. Their state is dominated
+    by NumPy arrays, which pickle stores verbatim, so the serialized size is a
+    close and cheap estimate.
+    """
+    if predictor.model_source == 'artifact':
+        # Memory-mapped pages are shared by every worker on the host.
+        return predictor.model.artifact.nbytes
+    total = 0
+    for obj in (predictor.model, predictor.scaler):
+        if obj is not None:
+            total += len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    return total
+
+
+class ModelRegistry:
+    """
+    Thread-safe registry of loaded predictors keyed by (model_path, scaler_path).
+    Records load time and memory footprint for every entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._predictors = {}
+        self._stats = {}
+
+    def _key(self, model_path=None, scaler_path=None):
+        return (
+            os.path.abspath(model_path or default_model_path()),
+            os.path.abspath(scaler_path or default_scaler_path()),
+        )
+
+    def get(self, model_path=None, scaler_path=None):
+        """Return the shared predictor for the given artifacts, loading it on first use."""
+        key = self._key(model_path, scaler_path)
+        predictor = self._predictors.get(key)
+        if predictor is not None:
+            return predictor
+
+        with self._lock:
+            # Another thread may have finished loading while we waited.
+            predictor = self._predictors.get(key)
+            if predictor is None:
+                predictor = self._load(*key)
+                self._predictors[key] = predictor
+        return predictor
+
+    def _load(self, model_path, scaler_path):
+        """Load a predictor and record how long it took and how much memory it holds."""
+        started = time.perf_counter()
+        predictor = HeartDiseasePredictor(model_path=model_path, scaler_path=scaler_path)
+        load_seconds = time.perf_counter() - started
+
+        stats = {
+            'model_path': model_path,
+            'scaler_path': scaler_path,
+            'model_loaded': predictor.model is not None,
+            'model_source': predictor.model_source,
+            'compiled': predictor.scorer is not None,
+            'model_version': predictor.model_version,
+            'scaler_loaded': predictor.scaler is not None,
+            'load_seconds': load_seconds,
+            'memory_bytes': _footprint(predictor),
+            'process_max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            'loaded_at': time.time(),
+            'pid': os.getpid(),
+        }
+        self._stats[(model_path, scaler_path)] = stats
+        logger.info(
+            'Loaded predictor %s in %.1f ms (%d bytes)',
+            os.path.basename(model_path), load_seconds * 1000, stats['memory_bytes'],
+        )
+        return predictor
+
+    def swap(self, predictor):
+        """
+        Atomically replace the predictor registered for its artifact paths.
+        Requests already holding the old predictor finish on it undisturbed.
+        """
+        key = self._key(predictor.model_path, predictor.scaler_path)
+        with self._lock:
+            previous = self._predictors.get(key)
+            self._predictors[key] = predictor
+            if key in self._stats:
+                self._stats[key]['model_version'] = predictor.model_version
+                self._stats[key]['swapped_at'] = time.time()
+        logger.info(
+            'Swapped predictor %s: %s -> %s',
+            os.path.basename(predictor.model_path),
+            previous.model_version if previous else None,
+            predictor.model_version,
+        )
+        return previous
+
+    def preload(self, model_path=None, scaler_path=None):
+        """Eagerly load a predictor, e.g. in the gunicorn master before workers fork."""
+        return self.get(model_path, scaler_path)
+
+    def stats(self):
+        """Return load statistics for every predictor loaded in this process."""
+        with self._lock:
+            return [dict(entry) for entry in self._stats.values()]
+
+    def clear(self):
+        """Drop all cached predictors so the next get() reloads from disk."""
+        with self._lock:
+            self._predictors.clear()
+            self._stats.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_predictor(model_path=None, scaler_path=None):
+    """Shortcut for registry.get() used by the prediction views."""
+    predictor = registry.get(model_path, scaler_path)
+    if model_path is None and scaler_path is None:
+        # Imported here: the watcher itself depends on this module.
+        from .model_watcher import ensure_watcher
+        ensure_watcher()
+    return predictor
@@ -0,0 +1,138 @@
+"""
+Model Hot Reload
+Background watcher that swaps in a retrained model without restarting workers
+
+Every PREDICTION_MODEL_WATCH_INTERVAL seconds the watcher stats the model and
+scaler files. When their mtime or size changes it loads the new artifacts on
+its own thread, validates them, warms them with a synthetic batch and only
+then swaps them into the registry. A new predictor whose content hash matches
+the current one is discarded, so touching a file does not trigger a swap.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .ml_model import NUM_FEATURES, HeartDiseasePredictor, synthetic_batch
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+def validate_predictor(predictor):
+    """
+    Raise ValueError unless the predictor can score the synthetic batch.
+    Calls the estimator directly so errors are not masked by the rule fallback.
+    """
+    model = predictor.model
+    if model is None:
+        raise ValueError('model artifact could not be loaded')
+    if not hasattr(model, 'predict_proba'):
+        raise ValueError(f'{type(model).__name__} has no predict_proba')
+    n_features = getattr(model, 'n_features_in_', NUM_FEATURES)
+    if n_features != NUM_FEATURES:
+        raise ValueError(f'model expects {n_features} features, not {NUM_FEATURES}')
+
+    batch = synthetic_batch()
+    scaled = predictor.scaler.transform(batch) if predictor.scaler is not None else batch
+    probability = np.asarray(model.predict_proba(scaled))
+    if probability.shape[0] != len(batch) or not np.all(np.isfinite(probability)):
+        raise ValueError('model returned invalid probabilities for the warm-up batch')
+
+    # Warm the full predict_many path before the predictor takes traffic.
+    predictor.predict_many(batch)
+
+
+def _signature(*paths):
+    """(mtime_ns, size) of each path, None for missing files."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class ModelWatcher:
+    """Polls a registry's model artifacts and hot-swaps validated replacements."""
+
+    def __init__(self, interval=5.0, registry=registry, model_path=None, scaler_path=None):
+        self.interval = interval
+        self.registry = registry
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.rejected = 0
+
+    def start(self):
+        self.prime()
+        self._thread = threading.Thread(target=self._run, name='heartfl-model-watcher', daemon=True)
+        self._thread.start()
+
+    def prime(self):
+        """Record the signature of the artifacts currently being served."""
+        current = self.registry.get(self.model_path, self.scaler_path)
+        self._signature = _signature(current.model_path, current.scaler_path)
+
+    def stop(self):
+        self._stop.set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:
+                logger.exception('Model watcher check failed: %s', exc)
+
+    def check(self):
+        """Reload if the artifacts changed; returns True when a new model was swapped in."""
+        current = self.registry.get(self.model_path, self.scaler_path)
+        signature = _signature(current.model_path, current.scaler_path)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        candidate = HeartDiseasePredictor(model_path=current.model_path, scaler_path=current.scaler_path)
+        if candidate.model_hash == current.model_hash:
+            return False
+
+        try:
+            validate_predictor(candidate)
+        except Exception as exc:
+            self.rejected += 1
+            logger.warning('Rejected new model artifact %s: %s', current.model_path, exc)
+            return False
+
+        self.registry.swap(candidate)
+        self.reloads += 1
+        return True
+
+
+_watcher = None
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def ensure_watcher():
+    """Start one watcher per process when PREDICTION_MODEL_WATCH_INTERVAL > 0."""
+    global _watcher, _watcher_pid
+    if _watcher_pid == os.getpid():
+        return _watcher
+    interval = getattr(settings, 'PREDICTION_MODEL_WATCH_INTERVAL', 0)
+    with _watcher_lock:
+        if _watcher_pid != os.getpid():
+            # Threads do not survive fork, so each worker starts its own.
+            _watcher = ModelWatcher(interval) if interval > 0 else None
+            if _watcher is not None:
+                _watcher.start()
+            _watcher_pid = os.getpid()
+    return _watcher
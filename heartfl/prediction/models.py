@@ -2,6 +2,9 @@
 Prediction Models
 Manages patient data and prediction results
 """
+import uuid
+
+from django.conf import settings
 from django.db import models
 from hospitals.models import Doctor
 
@@ -87,3 +90,49 @@ class PredictionResult(models.Model):
     def get_risk_class(self):
         """Return CSS class for risk level"""
         return 'danger' if self.prediction == 'high' else 'success'
+
+
+class OCRJob(models.Model):
+    """
+    Background extraction of clinical data from an uploaded PDF report
+    Created by the upload endpoint and polled by the prediction page
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ocr_jobs')
+    file_name = models.CharField(max_length=255)
+    pdf_file = models.FileField(upload_to='ocr_jobs/', blank=True, help_text="Deleted once the job finishes")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+
+    # Progress in pages processed out of the document's page count
+    pages_done = models.PositiveIntegerField(default=0)
+    pages_total = models.PositiveIntegerField(default=0)
+
+    result = models.JSONField(blank=True, null=True, help_text="Parsed clinical fields")
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'OCR Job'
+        verbose_name_plural = 'OCR Jobs'
+
+    def __str__(self):
+        return f"{self.file_name} - {self.status} ({self.pages_done}/{self.pages_total})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
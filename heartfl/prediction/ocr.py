@@ -0,0 +1,313 @@
+"""
+PDF Text Extraction
+Embedded text first, OCR for scanned pages on a bounded process pool
+
+Rendering a 300-dpi pixmap and running Tesseract takes seconds per page, so
+scanned pages are fanned out to a small pool of worker processes instead of
+running one after another on the request thread. Results are reassembled in
+page order, either all at once (extract_pdf_text) or page by page so the
+caller can stop early (iter_page_texts). The pool is capped by
+OCR_MAX_WORKERS so a burst of uploads cannot take every core away from
+prediction traffic, and each document has OCR_DOCUMENT_TIMEOUT seconds to
+finish.
+
+Pages are rendered in grayscale and written to Tesseract as an uncompressed
+PGM straight from the pixmap buffer; the old path encoded a PNG, decoded it
+with PIL and let pytesseract encode it to PNG again. In adaptive mode
+(OCR_ADAPTIVE) a page is first read at OCR_FAST_DPI and rendered again at
+OCR_DPI only when Tesseract's confidence in the words that carry digits,
+the values the clinical parser reads, is below OCR_MIN_CONFIDENCE.
+
+Documents can be passed as bytes or as a path. Paths are opened in place by
+the parent and the workers, so a large scan is never held in memory, and
+each worker empties MuPDF's resource store after every page so its memory
+does not grow with the length of the document.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OCR_DPI = 300
+OCR_FAST_DPI = 150
+OCR_MIN_CONFIDENCE = 70
+OCR_DOCUMENT_TIMEOUT = 25
+
+
+class OCRDependencyError(RuntimeError):
+    """PyMuPDF or pytesseract is not installed."""
+
+
+class OCRTimeoutError(RuntimeError):
+    """A document did not finish OCR within OCR_DOCUMENT_TIMEOUT."""
+
+
+class PDFRejectedError(ValueError):
+    """An upload cannot be opened as a PDF or has more pages than OCR_MAX_PAGES."""
+
+
+def _import_fitz():
+    try:
+        import fitz
+    except ImportError as exc:
+        raise OCRDependencyError('OCR dependencies are missing. Install pytesseract and PyMuPDF.') from exc
+    return fitz
+
+
+def _open(fitz, pdf):
+    """Open a PDF given as bytes, or as a path without reading it into memory."""
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf, filetype='pdf')
+    return fitz.open(os.fspath(pdf), filetype='pdf')
+
+
+@contextmanager
+def _on_disk(pdf):
+    """Path workers can open: pdf itself, or a temporary copy of PDF bytes."""
+    if not isinstance(pdf, (bytes, bytearray, memoryview)):
+        yield os.fspath(pdf)
+        return
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as handle:
+        handle.write(pdf)
+    try:
+        yield handle.name
+    finally:
+        try:
+            os.remove(handle.name)
+        except OSError:
+            # Windows cannot remove a file a worker still has open.
+            logger.warning('Could not remove OCR temp file %s', handle.name)
+
+
+def check_pdf(pdf, max_pages=None):
+    """
+    Open a PDF just far enough to count its pages.
+
+    Returns:
+        the page count
+
+    Raises:
+        PDFRejectedError: if it is not a readable PDF or has more than max_pages
+                          pages (default: settings.OCR_MAX_PAGES)
+    """
+    fitz = _import_fitz()
+    max_pages = max_pages if max_pages is not None else getattr(settings, 'OCR_MAX_PAGES', 50)
+    try:
+        with _open(fitz, pdf) as document:
+            encrypted = document.needs_pass
+            page_count = document.page_count
+    except (RuntimeError, ValueError) as exc:
+        raise PDFRejectedError('The file is not a readable PDF.') from exc
+    if encrypted:
+        raise PDFRejectedError('Password-protected PDFs are not supported.')
+    if max_pages and page_count > max_pages:
+        raise PDFRejectedError(f'The PDF has {page_count} pages; at most {max_pages} can be processed.')
+    return page_count
+
+
+def _worker_init():
+    # Tesseract otherwise starts one OpenMP thread per core in every worker.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def render_page(page, dpi, path):
+    """Write a grayscale render of a fitz page to path as PGM, without any image re-encoding."""
+    import fitz
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    pix.save(path, output='pgm')
+    return pix.width, pix.height
+
+
+def field_confidence(words, confidences):
+    """
+    Mean Tesseract confidence (0-100) of the words that contain digits, or of
+    all words when none do. None when Tesseract found no words at all.
+    """
+    scored = [(word, float(conf)) for word, conf in zip(words, confidences) if word.strip() and float(conf) >= 0]
+    numeric = [conf for word, conf in scored if any(char.isdigit() for char in word)]
+    values = numeric or [conf for _, conf in scored]
+    return sum(values) / len(values) if values else None
+
+
+def _tesseract(image_path, with_confidence):
+    import pytesseract
+
+    if not with_confidence:
+        return pytesseract.image_to_string(image_path) or '', None
+    data = pytesseract.image_to_data(image_path, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for index, word in enumerate(data['text']):
+        if word.strip():
+            line = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+            lines.setdefault(line, []).append(word)
+    text = '\n'.join(' '.join(words) for words in lines.values())
+    return text, field_confidence(data['text'], data['conf'])
+
+
+def ocr_page(pdf_path, page_index, dpi=OCR_DPI, fast_dpi=None, min_confidence=OCR_MIN_CONFIDENCE):
+    """
+    Render one page and OCR it. Runs inside a pool worker process.
+
+    With fast_dpi set the page is read at fast_dpi first and rendered again
+    at dpi only if field_confidence is below min_confidence.
+    """
+    import fitz
+
+    handle, image_path = tempfile.mkstemp(suffix='.pgm')
+    os.close(handle)
+    try:
+        with fitz.open(pdf_path) as document:
+            page = document[page_index]
+            if fast_dpi and fast_dpi < dpi:
+                render_page(page, fast_dpi, image_path)
+                text, confidence = _tesseract(image_path, with_confidence=True)
+                if confidence is not None and confidence >= min_confidence:
+                    return text
+                logger.debug('Page %d confidence %s at %d dpi, retrying at %d dpi', page_index, confidence, fast_dpi, dpi)
+            render_page(page, dpi, image_path)
+        return _tesseract(image_path, with_confidence=False)[0]
+    finally:
+        os.remove(image_path)
+        # Drop images and fonts MuPDF cached while rendering this page.
+        fitz.TOOLS.store_shrink(100)
+
+
+def ocr_options():
+    """Keyword arguments for ocr_page from settings, read in the parent process."""
+    adaptive = getattr(settings, 'OCR_ADAPTIVE', True)
+    return {
+        'dpi': getattr(settings, 'OCR_DPI', OCR_DPI),
+        'fast_dpi': getattr(settings, 'OCR_FAST_DPI', OCR_FAST_DPI) if adaptive else None,
+        'min_confidence': getattr(settings, 'OCR_MIN_CONFIDENCE', OCR_MIN_CONFIDENCE),
+    }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide OCR pool, created on first use and again after a fork."""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: forking a multi-threaded gunicorn worker is not safe.
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, getattr(settings, 'OCR_MAX_WORKERS', 2)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_worker_init,
+            )
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the pool; the next get_pool() call starts a fresh one."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
+
+
+def _submit(func, *args, **kwargs):
+    try:
+        return get_pool().submit(func, *args, **kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OOM killer); start over once.
+        shutdown_pool()
+        return get_pool().submit(func, *args, **kwargs)
+
+
+def iter_page_texts(pdf, timeout=None, start_page=0):
+    """
+    Yield (page_index, text, page_count) in page order, OCRing scanned pages lazily.
+    Pages before start_page are skipped (their text is already known).
+
+    Only as many scanned pages as the pool has workers are rendered ahead of
+    the consumer, so a caller that stops iterating early (see
+    ocr_jobs.extract_clinical_data) never pays for the remaining pages:
+    closing the generator cancels OCR that has not started.
+
+    Raises:
+        OCRTimeoutError: if OCR runs past timeout seconds in total
+    """
+    fitz = _import_fitz()
+    timeout = timeout if timeout is not None else getattr(settings, 'OCR_DOCUMENT_TIMEOUT', OCR_DOCUMENT_TIMEOUT)
+    deadline = time.monotonic() + timeout
+
+    with _open(fitz, pdf) as document:
+        embedded = [(page.get_text('text') or '').strip() for page in document]
+    page_count = len(embedded)
+    scanned_pages = [index for index, text in enumerate(embedded) if not text and index >= start_page]
+    if not scanned_pages:
+        for index in range(start_page, page_count):
+            yield index, embedded[index], page_count
+        return
+
+    try:
+        import pytesseract  # noqa: F401  (fail here rather than in a worker)
+    except ImportError as exc:
+        raise OCRDependencyError('OCR dependencies are missing. Install pytesseract and PyMuPDF.') from exc
+
+    lookahead = max(1, getattr(settings, 'OCR_MAX_WORKERS', 2))
+    options = ocr_options()
+    in_flight = {}
+    next_scan = 0
+    # Workers open the document from disk rather than receiving a copy per page.
+    with _on_disk(pdf) as pdf_path:
+        try:
+            for index in range(start_page, page_count):
+                text = embedded[index]
+                if not text:
+                    while next_scan < len(scanned_pages) and len(in_flight) < lookahead:
+                        page = scanned_pages[next_scan]
+                        in_flight[page] = _submit(ocr_page, pdf_path, page, **options)
+                        next_scan += 1
+                    try:
+                        text = in_flight.pop(index).result(timeout=max(0.0, deadline - time.monotonic()))
+                    except FutureTimeoutError as exc:
+                        raise OCRTimeoutError(f'OCR did not finish within {timeout} seconds') from exc
+                yield index, text, page_count
+        finally:
+            for future in in_flight.values():
+                future.cancel()
+
+
+def extract_pdf_text(pdf, timeout=None, progress=None):
+    """
+    Extract text from PDF using embedded text first, then OCR fallback per page.
+
+    Args:
+        pdf: raw PDF content, or the path of a PDF file
+        timeout: seconds allowed for OCR of the whole document
+                 (default: settings.OCR_DOCUMENT_TIMEOUT)
+        progress: optional callable(pages_done, pages_total)
+
+    Returns:
+        whitespace-normalized text of all pages, in page order
+    """
+    page_text_chunks = []
+    for index, text, page_count in iter_page_texts(pdf, timeout):
+        page_text_chunks.append(text)
+        if progress is not None:
+            progress(index + 1, page_count)
+
+    joined_text = '\n'.join(page_text_chunks)
+    return re.sub(r'\s+', ' ', joined_text).strip()
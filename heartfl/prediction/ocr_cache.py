@@ -0,0 +1,147 @@
+"""
+OCR Result Cache
+Disk cache of extracted report text and parsed fields, keyed by PDF content
+
+Doctors often upload the same report twice, e.g. after a form validation
+error, and each upload used to re-run rendering and Tesseract. Entries are
+keyed by the SHA-256 of the uploaded bytes and hold the text of every page
+that was read plus the parsed fields. Each entry records the
+clinical_parser.PARSER_VERSION it was parsed with; when the parser changes,
+the cached text is parsed again instead of being OCRed again.
+
+One JSON file per entry under OCR_CACHE_DIR. Reads touch the file's mtime
+and writes evict the least recently used files once the directory grows past
+OCR_CACHE_MAX_BYTES. Entries older than OCR_CACHE_TTL seconds are dropped,
+since report text is patient data.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+ENTRY_SUFFIX = '.json'
+
+# page_texts holds whitespace-normalized text of pages 0..len-1 in order.
+OCRCacheEntry = namedtuple('OCRCacheEntry', ['page_texts', 'pages_total', 'parser_version', 'data'])
+
+
+def pdf_digest(pdf):
+    """Cache key of an uploaded PDF, given as bytes or as a path (read in chunks)."""
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(pdf).hexdigest()
+    with open(pdf, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class OCRCache:
+    """Size-bounded LRU of OCRCacheEntry files in one directory, safe across processes."""
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, ttl=86400):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest + ENTRY_SUFFIX)
+
+    def get(self, digest):
+        """Return the entry for digest, or None if it is missing or expired."""
+        path = self._path(digest)
+        try:
+            if self.ttl and os.stat(path).st_mtime < time.time() - self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, encoding='utf-8') as f:
+                entry = OCRCacheEntry(**json.load(f))
+            # mtime doubles as the last-used time for eviction.
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, digest, entry):
+        """Store an entry atomically, then evict until the cache fits max_bytes."""
+        path = self._path(digest)
+        tmp_path = f'{path}.tmp{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry._asdict(), f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones past max_bytes."""
+        entries = []
+        for item in os.scandir(self.directory):
+            if not item.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = item.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, item.path))
+
+        expired_before = time.time() - self.ttl if self.ttl else None
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes and (expired_before is None or mtime >= expired_before):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for item in os.scandir(self.directory):
+            if item.name.endswith(ENTRY_SUFFIX):
+                try:
+                    os.remove(item.path)
+                except OSError:
+                    pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_dir = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide OCRCache configured from settings, or None when OCR_CACHE_DIR is empty."""
+    global _cache, _cache_dir
+    directory = getattr(settings, 'OCR_CACHE_DIR', None)
+    if not directory:
+        return None
+    if _cache is None or _cache_dir != directory:
+        with _cache_lock:
+            if _cache is None or _cache_dir != directory:
+                _cache = OCRCache(
+                    directory,
+                    max_bytes=getattr(settings, 'OCR_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                    ttl=getattr(settings, 'OCR_CACHE_TTL', 86400),
+                )
+                _cache_dir = directory
+    return _cache
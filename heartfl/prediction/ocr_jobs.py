@@ -0,0 +1,249 @@
+"""
+OCR Job Queue
+Runs PDF extraction in the background so uploads return immediately
+
+The upload endpoint stores the PDF and an OCRJob row, then hands the job id
+to a small in-process thread pool. Workers claim jobs with an atomic status
+update, run the OCR pipeline (which fans pages out to the OCR process pool)
+and record progress as pages done out of pages total, so the prediction
+page can poll for status. Extraction stops at the first page by which all
+clinical fields have been found, and a re-uploaded PDF is served from the
+OCR cache (see ocr_cache.py). The database is the only shared state; there is
+no external broker.
+"""
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .clinical_parser import (
+    CLINICAL_FIELDS, PARSER_VERSION, merge_clinical_data, missing_fields, parse_clinical_data,
+)
+from .models import OCRJob
+from .ocr_cache import OCRCacheEntry, get_cache, pdf_digest
+from .ocr import OCRTimeoutError, check_pdf, iter_page_texts
+
+logger = logging.getLogger(__name__)
+
+# data is None when no page had any text at all. page_texts holds the
+# whitespace-normalized text of the pages_processed pages that were read.
+ClinicalExtraction = namedtuple('ClinicalExtraction', ['data', 'pages_processed', 'pages_total', 'page_texts'])
+
+
+def extract_clinical_data(pdf, timeout=None, progress=None, cached=None):
+    """
+    Parse a report page by page, stopping as soon as every clinical field is filled.
+
+    Lab values are almost always on the first page, so later pages of a long
+    report are usually never rendered or OCRed.
+
+    Args:
+        pdf: raw PDF content, or the path of a PDF file
+        progress: optional callable(pages_done, pages_total)
+        cached: OCRCacheEntry from an earlier run; its page texts are parsed
+                again and only the pages after them are read from the PDF
+    """
+    data = dict.fromkeys(CLINICAL_FIELDS)
+    page_texts = []
+    pages_total = 0
+
+    def add_page(text):
+        page_texts.append(text)
+        if text:
+            merge_clinical_data(data, parse_clinical_data(text))
+
+    if cached is not None:
+        pages_total = cached.pages_total
+        for text in cached.page_texts:
+            add_page(text)
+        if progress is not None:
+            progress(len(page_texts), pages_total)
+
+    if missing_fields(data) and (cached is None or len(page_texts) < pages_total):
+        pages = iter_page_texts(pdf, timeout, start_page=len(page_texts))
+        try:
+            for index, text, pages_total in pages:
+                add_page(re.sub(r'\s+', ' ', text).strip())
+                if progress is not None:
+                    progress(index + 1, pages_total)
+                if not missing_fields(data):
+                    break
+        finally:
+            # Cancels OCR of pages that are no longer needed.
+            pages.close()
+
+    pages_processed = len(page_texts)
+    if pages_processed < pages_total:
+        logger.info('All clinical fields found after %d of %d pages', pages_processed, pages_total)
+    return ClinicalExtraction(data if any(page_texts) else None, pages_processed, pages_total, page_texts)
+
+
+def extract_clinical_data_cached(pdf, timeout=None, progress=None):
+    """
+    extract_clinical_data through the OCR cache.
+
+    An entry parsed by the current PARSER_VERSION is returned as is. An older
+    one has its text parsed again, so a parser change never re-runs OCR for
+    pages that were already read.
+    """
+    cache = get_cache()
+    if cache is None:
+        return extract_clinical_data(pdf, timeout, progress)
+
+    digest = pdf_digest(pdf)
+    entry = cache.get(digest)
+    if entry is not None and entry.parser_version == PARSER_VERSION:
+        if progress is not None:
+            progress(len(entry.page_texts), entry.pages_total)
+        return ClinicalExtraction(entry.data, len(entry.page_texts), entry.pages_total, entry.page_texts)
+    if entry is not None:
+        logger.info('Re-parsing cached OCR text parsed by parser version %s', entry.parser_version)
+
+    extraction = extract_clinical_data(pdf, timeout, progress, cached=entry)
+    try:
+        cache.put(digest, OCRCacheEntry(
+            page_texts=extraction.page_texts,
+            pages_total=extraction.pages_total,
+            parser_version=PARSER_VERSION,
+            data=extraction.data,
+        ))
+    except OSError as exc:
+        logger.warning('Could not write OCR cache entry: %s', exc)
+    return extraction
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide job thread pool, created on first use and again after a fork."""
+    global _executor, _executor_pid
+    if _executor is not None and _executor_pid == os.getpid():
+        return _executor
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, getattr(settings, 'OCR_JOB_WORKERS', 2)),
+                thread_name_prefix='heartfl-ocr-job',
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def submit_job(user, uploaded_file):
+    """
+    Store the upload as a pending OCRJob and queue it once the row is committed.
+
+    Raises:
+        PDFRejectedError: if the stored file is not a PDF or has too many pages
+    """
+    job = OCRJob(user=user, file_name=os.path.basename(uploaded_file.name)[:255])
+    job.pdf_file.save(f'{job.id}.pdf', uploaded_file, save=False)
+    try:
+        check_pdf(_local_path(job.pdf_file))
+    except Exception:
+        job.pdf_file.delete(save=False)
+        raise
+    job.save()
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+    return job
+
+
+def _local_path(field_file):
+    """Filesystem path of a stored file, or its bytes for storages without local paths."""
+    try:
+        return field_file.path
+    except NotImplementedError:
+        with field_file.open('rb') as handle:
+            return handle.read()
+
+
+def _finish(job_id, **fields):
+    OCRJob.objects.filter(pk=job_id).update(finished_at=timezone.now(), updated_at=timezone.now(), **fields)
+
+
+def run_job(job_id):
+    """Claim and process one pending job. Safe to call from any worker thread."""
+    close_old_connections()
+    try:
+        claimed = OCRJob.objects.filter(pk=job_id, status=OCRJob.STATUS_PENDING).update(
+            status=OCRJob.STATUS_RUNNING, updated_at=timezone.now()
+        )
+        if not claimed:
+            return
+        job = OCRJob.objects.get(pk=job_id)
+
+        def progress(pages_done, pages_total):
+            OCRJob.objects.filter(pk=job_id).update(
+                pages_done=pages_done, pages_total=pages_total, updated_at=timezone.now()
+            )
+
+        try:
+            # Opened in place, so a large scan is never read into memory.
+            extraction = extract_clinical_data_cached(
+                _local_path(job.pdf_file), timeout=getattr(settings, 'OCR_JOB_TIMEOUT', 300), progress=progress
+            )
+            if extraction.data is None:
+                _finish(job_id, status=OCRJob.STATUS_FAILED, error='Unable to extract text from PDF.')
+            else:
+                _finish(
+                    job_id,
+                    status=OCRJob.STATUS_DONE,
+                    result=extraction.data,
+                    pages_done=extraction.pages_processed,
+                    pages_total=extraction.pages_total,
+                )
+        except OCRTimeoutError as exc:
+            logger.warning('OCR job %s timed out: %s', job_id, exc)
+            _finish(job_id, status=OCRJob.STATUS_FAILED, error='OCR took too long. Please upload a shorter or clearer PDF.')
+        except Exception as exc:
+            logger.exception('OCR job %s failed: %s', job_id, exc)
+            _finish(job_id, status=OCRJob.STATUS_FAILED, error='OCR processing failed. Please try another PDF.')
+        finally:
+            # Medical reports are not kept once they have been read.
+            job.pdf_file.delete(save=False)
+            OCRJob.objects.filter(pk=job_id).update(pdf_file='')
+    finally:
+        close_old_connections()
+
+
+def expire_if_stale(job):
+    """
+    Fail a job whose worker stopped reporting, e.g. because its process was
+    restarted, so the client does not poll forever.
+    """
+    if job.is_finished:
+        return job
+    limit = getattr(settings, 'OCR_JOB_TIMEOUT', 300) * 2
+    if job.updated_at < timezone.now() - timedelta(seconds=limit):
+        _finish(job.pk, status=OCRJob.STATUS_FAILED, error='OCR job was interrupted. Please upload the PDF again.')
+        job.refresh_from_db()
+    return job
+
+
+def job_payload(job, status_url=None):
+    """JSON body describing a job for the polling endpoint."""
+    payload = {
+        'job_id': str(job.pk),
+        'status': job.status,
+        'pages_done': job.pages_done,
+        'pages_total': job.pages_total,
+    }
+    if status_url:
+        payload['status_url'] = status_url
+    if job.status == OCRJob.STATUS_DONE:
+        payload['data'] = job.result
+        # Extraction stops once every field is found, so this can be < pages_total.
+        payload['pages_processed'] = job.pages_done
+    elif job.status == OCRJob.STATUS_FAILED:
+        payload['error'] = job.error
+    return payload
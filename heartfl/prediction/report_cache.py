@@ -0,0 +1,138 @@
+"""
+Rendered Report Cache
+Storage-backed cache of report PDFs keyed by prediction and report content
+
+A PredictionResult rarely changes after it is made, yet every "download
+report" click rendered the whole PDF again. Rendered bytes are stored in the
+default file storage under REPORT_CACHE_PREFIX/<prediction id>/<fingerprint>.pdf.
+The fingerprint is a SHA-256 over everything the report shows: patient
+fields, prediction, probability, prediction time, notes, model version,
+hospital and doctor. The report is dated with the prediction's predicted_at
+rather than the time it is rendered, so a cached PDF is identical to a fresh
+one.
+Editing any of them, e.g. the notes in the admin, gives a new fingerprint,
+so the old PDF is never served again; it is deleted when the prediction is
+saved or when the new PDF is stored.
+
+The fingerprint doubles as the response ETag, so a browser revalidating
+with If-None-Match gets a 304 without the PDF being read or rendered.
+"""
+import hashlib
+import json
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PredictionResult
+
+# Bump when the classic report layout changes, so stored PDFs are re-rendered.
+REPORT_CACHE_VERSION = 2
+
+REPORT_SUFFIX = '.pdf'
+
+PATIENT_FIELDS = (
+    'patient_name', 'age', 'gender', 'created_at', 'chest_pain_type', 'resting_bp', 'cholesterol',
+    'fasting_bs', 'resting_ecg', 'max_heart_rate', 'exercise_angina', 'oldpeak', 'st_slope',
+)
+
+
+def report_fingerprint(prediction_result):
+    """Hex digest of every PredictionResult field the classic report renders."""
+    doctor = prediction_result.doctor
+    patient = prediction_result.patient_data
+    content = {
+        'version': REPORT_CACHE_VERSION,
+        'patient': [getattr(patient, field) for field in PATIENT_FIELDS],
+        'prediction': prediction_result.prediction,
+        'probability': prediction_result.probability,
+        'predicted_at': prediction_result.predicted_at,
+        'notes': prediction_result.notes,
+        'model_version': prediction_result.model_version,
+        'hospital': doctor.hospital.name,
+        'doctor': [doctor.full_name, doctor.specialization, doctor.license_number],
+    }
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def report_etag(fingerprint):
+    return f'"{fingerprint}"'
+
+
+class ReportCache:
+    """Rendered PDFs in a Django storage, one directory per prediction."""
+
+    def __init__(self, storage=None, prefix='report_cache'):
+        self.storage = storage or default_storage
+        self.prefix = prefix
+
+    def _directory(self, prediction_id):
+        return posixpath.join(self.prefix, str(prediction_id))
+
+    def _name(self, prediction_id, fingerprint):
+        return posixpath.join(self._directory(prediction_id), fingerprint + REPORT_SUFFIX)
+
+    def get(self, prediction_id, fingerprint):
+        """Stored PDF bytes, or None if missing or cut short by a concurrent write."""
+        name = self._name(prediction_id, fingerprint)
+        try:
+            with self.storage.open(name, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data if data.rstrip().endswith(b'%%EOF') else None
+
+    def put(self, prediction_id, fingerprint, data):
+        """Store a rendered PDF and drop the prediction's stale ones."""
+        name = self._name(prediction_id, fingerprint)
+        self.invalidate(prediction_id)
+        saved_name = self.storage.save(name, ContentFile(data))
+        if saved_name != name:
+            # Another worker stored the same report first; keep its copy.
+            self.storage.delete(saved_name)
+
+    def invalidate(self, prediction_id):
+        """Delete every stored PDF of a prediction."""
+        directory = self._directory(prediction_id)
+        try:
+            _, files = self.storage.listdir(directory)
+        except OSError:
+            return
+        for filename in files:
+            if filename.endswith(REPORT_SUFFIX):
+                self.storage.delete(posixpath.join(directory, filename))
+
+    def get_or_render(self, prediction_id, fingerprint, render):
+        """Return (pdf bytes, hit) for a fingerprint, calling render() on a miss."""
+        data = self.get(prediction_id, fingerprint)
+        if data is not None:
+            return data, True
+        data = render()
+        self.put(prediction_id, fingerprint, data)
+        return data, False
+
+
+def get_report_cache():
+    """ReportCache configured from settings, or None when REPORT_CACHE_ENABLED is off."""
+    if not getattr(settings, 'REPORT_CACHE_ENABLED', True):
+        return None
+    return ReportCache(prefix=getattr(settings, 'REPORT_CACHE_PREFIX', 'report_cache'))
+
+
+@receiver(post_save, sender=PredictionResult)
+def _prediction_saved(sender, instance, created, **kwargs):
+    if not created:
+        cache = get_report_cache()
+        if cache is not None:
+            cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=PredictionResult)
+def _prediction_deleted(sender, instance, **kwargs):
+    cache = get_report_cache()
+    if cache is not None:
+        cache.invalidate(instance.pk)
@@ -0,0 +1,221 @@
+"""
+Bulk Report Export
+Streams a ZIP of prediction report PDFs rendered on a process pool
+
+Hospitals ask for every report of a date range at once. Reports are
+selected by doctor, hospital and prediction date, and each one that is not
+already in the rendered-report cache (report_cache.py) is rendered by a
+pool of worker processes, so a large export uses several cores instead of
+one request thread. The ZIP is written to a non-seekable stream and handed
+out entry by entry as reports finish, so neither the archive nor more than
+a few PDFs per worker are ever held in memory.
+
+Entries are stored uncompressed: ReportLab already compresses page content.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import reports
+from .models import PredictionResult
+from .report_cache import report_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Renders queued per worker; bounds the PDFs waiting to be written.
+TASKS_PER_WORKER = 2
+
+
+def select_predictions(doctor=None, hospital=None, start=None, end=None):
+    """
+    PredictionResults to export, oldest first.
+
+    Args:
+        doctor: Doctor whose predictions are exported
+        hospital: Hospital whose doctors' predictions are exported
+        start, end: inclusive date bounds on predicted_at
+    """
+    predictions = PredictionResult.objects.select_related('patient_data', 'doctor__hospital')
+    if doctor is not None:
+        predictions = predictions.filter(doctor=doctor)
+    if hospital is not None:
+        predictions = predictions.filter(doctor__hospital=hospital)
+    if start is not None:
+        predictions = predictions.filter(predicted_at__date__gte=start)
+    if end is not None:
+        predictions = predictions.filter(predicted_at__date__lte=end)
+    return predictions.order_by('predicted_at', 'pk')
+
+
+def report_filename(prediction_result):
+    """Same name as a single download_prediction_report file."""
+    return f'heart_disease_report_{prediction_result.pk}.pdf'
+
+
+class ExportStats:
+    """Report count, sizes and timing for one export."""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.reports = 0
+        self.cached = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def reports_per_second(self):
+        return self.reports / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'reports': self.reports,
+            'cached': self.cached,
+            'bytes': self.bytes,
+            'seconds': round(self.seconds, 4),
+            'reports_per_second': round(self.reports_per_second, 1),
+        }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide export pool of REPORT_EXPORT_WORKERS processes, created on first use."""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = new_pool(getattr(settings, 'REPORT_EXPORT_WORKERS', 2))
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def new_pool(workers):
+    # spawn: forking a multi-threaded gunicorn worker is not safe.
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context('spawn'))
+
+
+def shutdown_pool():
+    """Stop the pool; the next get_pool() call starts a fresh one."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
+
+
+class _ZipStream:
+    """Write-only file object collecting what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_report_zip(predictions, cache=None, workers=None, stats=None, progress=None):
+    """
+    Render reports and yield a ZIP archive of them as bytes chunks.
+
+    Args:
+        predictions: iterable of PredictionResults with patient_data and
+            doctor__hospital loaded (see select_predictions)
+        cache: optional ReportCache read before rendering and filled after
+        workers: size of a pool started for this export only (default: the
+            shared pool of REPORT_EXPORT_WORKERS processes)
+        stats: optional ExportStats updated as reports are written
+        progress: optional callable(stats) called after each report
+
+    Yields:
+        ZIP bytes, one chunk per report plus the central directory
+    """
+    stats = stats if stats is not None else ExportStats()
+    executor = new_pool(workers) if workers else get_pool()
+    window = max(1, workers or getattr(settings, 'REPORT_EXPORT_WORKERS', 2)) * TASKS_PER_WORKER
+    started = time.perf_counter()
+    stream = _ZipStream()
+    pending = {}
+
+    def submit(report):
+        nonlocal executor
+        try:
+            return executor.submit(reports.render_classic_report, report)
+        except BrokenProcessPool:
+            if workers:
+                raise
+            # A worker of the shared pool died (e.g. killed by the OOM killer); start over once.
+            shutdown_pool()
+            executor = get_pool()
+            return executor.submit(reports.render_classic_report, report)
+
+    def add(prediction_result, data, cached):
+        predicted_at = timezone.localtime(prediction_result.predicted_at)
+        entry = zipfile.ZipInfo(report_filename(prediction_result), predicted_at.timetuple()[:6])
+        entry.compress_type = zipfile.ZIP_STORED
+        archive.writestr(entry, data)
+        stats.reports += 1
+        stats.cached += cached
+        stats.bytes += len(data)
+        stats.seconds = time.perf_counter() - started
+        if progress is not None:
+            progress(stats)
+        return stream.drain()
+
+    def finished():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: pending[f][0].pk):
+            prediction_result, fingerprint = pending.pop(future)
+            data = future.result()
+            if cache is not None:
+                cache.put(prediction_result.pk, fingerprint, data)
+            yield add(prediction_result, data, False)
+
+    try:
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+            for prediction_result in predictions:
+                fingerprint = report_fingerprint(prediction_result)
+                data = cache.get(prediction_result.pk, fingerprint) if cache is not None else None
+                if data is not None:
+                    yield add(prediction_result, data, True)
+                    continue
+                future = submit(reports.classic_report_data(prediction_result))
+                pending[future] = (prediction_result, fingerprint)
+                if len(pending) >= window:
+                    yield from finished()
+            while pending:
+                yield from finished()
+        yield stream.drain()
+    finally:
+        # The client went away or a render failed: drop the queued renders.
+        for future in pending:
+            future.cancel()
+        if workers:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    logger.info(
+        'Exported %d reports (%d cached, %d bytes) at %.1f reports/s',
+        stats.reports, stats.cached, stats.bytes, stats.reports_per_second,
+    )
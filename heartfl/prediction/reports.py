@@ -0,0 +1,377 @@
+"""
+Prediction PDF Reports
+ReportLab rendering of prediction reports from plain report data
+
+The download views used to rebuild getSampleStyleSheet(), every
+ParagraphStyle and every TableStyle command list for each report. None of
+them depend on the report, so each layout's styles are built once per
+process (classic_styles, modern_styles) and a download only supplies a
+ReportData. Flowables are still created per report: ReportLab stores layout
+state on them during build(), so they cannot be shared between requests.
+
+Layouts:
+- classic: download_prediction_report in views.py (SQL models)
+- modern:  download_prediction_report in views_mongodb.py (MongoDB documents)
+"""
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Rows are [label, value] lists; result_rows of the classic layout start with
+# a header row. generated_at is a datetime.
+ReportData = namedtuple('ReportData', [
+    'report_id', 'generated_at', 'hospital_rows', 'doctor_rows', 'patient_rows',
+    'clinical_rows', 'result_rows', 'high_risk', 'notes',
+])
+
+CHEST_PAIN_TYPES = ('Typical Angina', 'Atypical Angina', 'Non-anginal Pain', 'Asymptomatic')
+
+REPORT_DATE_FORMAT = '%B %d, %Y %I:%M %p'
+
+HIGH_RISK_RECOMMENDATION = """
+<b>High Risk Detection:</b><br/>
+The patient shows indicators of high heart disease risk. Immediate medical consultation
+and further diagnostic tests are recommended. Consider lifestyle modifications and
+potential medical intervention. This screening tool is not a substitute for professional
+medical diagnosis.
+"""
+
+LOW_RISK_RECOMMENDATION = """
+<b>Low Risk Detection:</b><br/>
+The patient shows low indicators of heart disease risk. Continue with regular health
+checkups and maintain a healthy lifestyle. Monitor cardiovascular health periodically.
+This screening tool is not a substitute for professional medical diagnosis.
+"""
+
+MODERN_DISCLAIMER = """
+<b>Disclaimer:</b> This report is generated using a machine learning model trained with
+Federated Learning across multiple hospitals. The prediction is for screening purposes only
+and should not be considered as a final diagnosis. Always consult with qualified healthcare
+professionals for proper diagnosis and treatment.
+"""
+
+CLASSIC_FOOTER = """
+<para align=center>
+<font size=8 color='#7f8c8d'>
+This report is generated by HeartFL - Federated Learning for Heart Disease Prediction<br/>
+Report ID: {report_id}<br/>
+Generated on: {generated_on}<br/>
+<b>DISCLAIMER:</b> This prediction is for reference only. Please consult with a qualified healthcare provider for diagnosis and treatment.
+</font>
+</para>
+"""
+
+
+def build_classic_styles():
+    """Paragraph and table styles of the classic layout."""
+    styles = getSampleStyleSheet()
+    info_table = [
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+    ]
+    result_table = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('FONTNAME', (0, 1), (0, 1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (0, 1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('TOPPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1.5, colors.HexColor('#34495e')),
+    ]
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle', parent=styles['Heading1'], fontSize=24,
+            textColor=colors.HexColor('#2c3e50'), spaceAfter=30, alignment=TA_CENTER,
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading', parent=styles['Heading2'], fontSize=14,
+            textColor=colors.HexColor('#34495e'), spaceAfter=12, spaceBefore=12,
+        ),
+        'notes': ParagraphStyle(
+            'Notes', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#2c3e50'), spaceAfter=12,
+        ),
+        'normal': styles['Normal'],
+        'hospital_table': TableStyle(info_table + [('FONTNAME', (1, 0), (1, -1), 'Helvetica')]),
+        'patient_table': TableStyle(info_table),
+        'clinical_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+        ]),
+        'high_risk_table': TableStyle(result_table + [
+            ('BACKGROUND', (0, 1), (0, 1), colors.HexColor('#fadbd8')),
+            ('TEXTCOLOR', (0, 1), (0, 1), colors.HexColor('#e74c3c')),
+        ]),
+        'low_risk_table': TableStyle(result_table + [
+            ('BACKGROUND', (0, 1), (0, 1), colors.HexColor('#d5f4e6')),
+            ('TEXTCOLOR', (0, 1), (0, 1), colors.HexColor('#27ae60')),
+        ]),
+    }
+
+
+def build_modern_styles():
+    """Paragraph and table styles of the modern layout."""
+    styles = getSampleStyleSheet()
+    info_table = [
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#202124')),
+        ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#5f6368')),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]
+    result_table = [
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 1), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTSIZE', (1, 0), (1, 0), 14),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#202124')),
+        ('TEXTCOLOR', (1, 1), (1, -1), colors.HexColor('#5f6368')),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (1, 0), (1, 0), 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e8eaed')),
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
+    ]
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#1a73e8'),
+            spaceAfter=30, alignment=TA_CENTER, fontName='Helvetica-Bold',
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading', parent=styles['Heading2'], fontSize=14, textColor=colors.HexColor('#202124'),
+            spaceAfter=12, spaceBefore=12, fontName='Helvetica-Bold',
+        ),
+        'recommendation': ParagraphStyle(
+            'Recommendation', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#202124'),
+            alignment=TA_LEFT, leftIndent=10, rightIndent=10, spaceAfter=10, leading=14,
+        ),
+        'footer': ParagraphStyle(
+            'Footer', parent=styles['Normal'], fontSize=8, textColor=colors.HexColor('#80868b'),
+            alignment=TA_CENTER, leading=10,
+        ),
+        'info_table': TableStyle(info_table + [('BOTTOMPADDING', (0, 0), (-1, -1), 8)]),
+        'patient_table': TableStyle(info_table + [
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e8eaed')),
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
+        ]),
+        'high_risk_table': TableStyle(result_table + [('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#d32f2f'))]),
+        'low_risk_table': TableStyle(result_table + [('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#388e3c'))]),
+    }
+
+
+@lru_cache(maxsize=None)
+def classic_styles():
+    return build_classic_styles()
+
+
+@lru_cache(maxsize=None)
+def modern_styles():
+    return build_modern_styles()
+
+
+def _table(rows, col_widths, style):
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(style)
+    return table
+
+
+def render_classic_report(report, styles=None):
+    """PDF bytes of the classic layout. Pass styles only to bypass the per-process cache."""
+    styles = styles or classic_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+
+    elements = [
+        Paragraph("Heart Disease Prediction Report", styles['title']),
+        Spacer(1, 0.2 * inch),
+        _table(report.hospital_rows + report.doctor_rows, [2 * inch, 4 * inch], styles['hospital_table']),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Patient Information", styles['heading']),
+        _table(report.patient_rows, [2 * inch, 4 * inch], styles['patient_table']),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Clinical Data", styles['heading']),
+        _table(report.clinical_rows, [3 * inch, 3 * inch], styles['clinical_table']),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Prediction Results", styles['heading']),
+        _table(
+            report.result_rows, [1.5 * inch] * 4,
+            styles['high_risk_table' if report.high_risk else 'low_risk_table'],
+        ),
+        Spacer(1, 0.3 * inch),
+    ]
+    if report.notes:
+        elements.append(Paragraph("Doctor's Notes", styles['heading']))
+        elements.append(Paragraph(report.notes, styles['notes']))
+
+    elements.append(Spacer(1, 0.4 * inch))
+    footer = CLASSIC_FOOTER.format(
+        report_id=report.report_id, generated_on=report.generated_at.strftime(REPORT_DATE_FORMAT),
+    )
+    elements.append(Paragraph(footer, styles['normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_modern_report(report, styles=None):
+    """PDF bytes of the modern layout. Pass styles only to bypass the per-process cache."""
+    styles = styles or modern_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4,
+        rightMargin=0.75 * inch, leftMargin=0.75 * inch, topMargin=1 * inch, bottomMargin=0.75 * inch,
+    )
+
+    elements = [
+        Paragraph("Heart Disease Prediction Report", styles['title']),
+        Spacer(1, 0.2 * inch),
+        Paragraph("Hospital Information", styles['heading']),
+        _table(report.hospital_rows, [2 * inch, 4.5 * inch], styles['info_table']),
+        Spacer(1, 0.2 * inch),
+        Paragraph("Doctor Information", styles['heading']),
+        _table(report.doctor_rows, [2 * inch, 4.5 * inch], styles['info_table']),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Patient Clinical Data", styles['heading']),
+        _table(report.patient_rows + report.clinical_rows, [2.5 * inch, 4 * inch], styles['patient_table']),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Prediction Result", styles['heading']),
+        _table(
+            report.result_rows, [2.5 * inch, 4 * inch],
+            styles['high_risk_table' if report.high_risk else 'low_risk_table'],
+        ),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Medical Recommendation", styles['heading']),
+        Paragraph(HIGH_RISK_RECOMMENDATION if report.high_risk else LOW_RISK_RECOMMENDATION, styles['recommendation']),
+        Spacer(1, 0.3 * inch),
+        Spacer(1, 0.2 * inch),
+        Paragraph(MODERN_DISCLAIMER, styles['footer']),
+    ]
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def classic_report_data(prediction_result, generated_at=None):
+    """
+    ReportData for a PredictionResult (SQL models).
+    Dated with the prediction's predicted_at unless generated_at is given.
+    """
+    generated_at = generated_at or timezone.localtime(prediction_result.predicted_at)
+    doctor = prediction_result.doctor
+    patient = prediction_result.patient_data
+    chest_pain = dict(enumerate(CHEST_PAIN_TYPES)).get(patient.chest_pain_type, 'Unknown')
+    high_risk = prediction_result.prediction == 'high'
+    return ReportData(
+        report_id=prediction_result.pk,
+        generated_at=generated_at,
+        hospital_rows=[['Hospital:', doctor.hospital.name]],
+        doctor_rows=[
+            ['Doctor:', f'Dr. {doctor.full_name}'],
+            ['Specialization:', doctor.specialization or 'General Medicine'],
+            ['License Number:', doctor.license_number],
+            ['Report Date:', generated_at.strftime(REPORT_DATE_FORMAT)],
+        ],
+        patient_rows=[
+            ['Patient Name:', patient.patient_name],
+            ['Age:', f'{patient.age} years'],
+            ['Gender:', 'Male' if patient.gender == 'M' else 'Female'],
+            ['Record Date:', patient.created_at.strftime('%B %d, %Y')],
+        ],
+        clinical_rows=[
+            ['Parameter', 'Value'],
+            ['Chest Pain Type', chest_pain],
+            ['Resting Blood Pressure', f'{patient.resting_bp} mm Hg'],
+            ['Cholesterol', f'{patient.cholesterol} mg/dl'],
+            ['Fasting Blood Sugar', 'Yes (>120 mg/dl)' if patient.fasting_bs else 'No (<120 mg/dl)'],
+            ['Resting ECG', str(patient.resting_ecg)],
+            ['Max Heart Rate', f'{patient.max_heart_rate} bpm'],
+            ['Exercise Induced Angina', 'Yes' if patient.exercise_angina else 'No'],
+            ['ST Depression (Oldpeak)', f'{patient.oldpeak}'],
+            ['ST Slope', str(patient.st_slope)],
+        ],
+        result_rows=[
+            ['Prediction', 'Probability'],
+            ['HIGH RISK' if high_risk else 'LOW RISK', f'{prediction_result.probability:.2f}%'],
+        ],
+        high_risk=high_risk,
+        notes=prediction_result.notes,
+    )
+
+
+def modern_report_data(prediction, generated_at=None):
+    """ReportData for a MongoDB PredictionResult document."""
+    hospital = prediction.hospital
+    patient = prediction.patient
+    chest_pain = (
+        CHEST_PAIN_TYPES[patient.chest_pain_type] if patient.chest_pain_type < len(CHEST_PAIN_TYPES) else 'Unknown'
+    )
+    return ReportData(
+        report_id=str(prediction.id),
+        generated_at=generated_at or datetime.now(),
+        hospital_rows=[
+            ['Hospital Name:', hospital.name],
+            ['Registration Number:', hospital.registration_number],
+            ['Address:', f"{hospital.address}, {hospital.city}, {hospital.state}"],
+            ['Contact:', hospital.contact_number],
+        ],
+        doctor_rows=[
+            ['Doctor Name:', f"Dr. {prediction.doctor.name}"],
+            ['Specialization:', prediction.doctor.specialization or 'General Physician'],
+            ['License Number:', prediction.doctor.license_number],
+        ],
+        patient_rows=[
+            ['Age:', f"{patient.age} years"],
+            ['Gender:', 'Male' if patient.sex == 1 else 'Female'],
+        ],
+        clinical_rows=[
+            ['Chest Pain Type:', chest_pain],
+            ['Resting Blood Pressure:', f"{patient.resting_bp} mm Hg"],
+            ['Cholesterol:', f"{patient.cholesterol} mg/dl"],
+            ['Fasting Blood Sugar:', 'Yes (>120 mg/dl)' if patient.fasting_bs == 1 else 'No (<120 mg/dl)'],
+            ['Resting ECG:', f"Type {patient.resting_ecg}"],
+            ['Max Heart Rate:', f"{patient.max_heart_rate} bpm"],
+            ['Exercise Induced Angina:', 'Yes' if patient.exercise_angina == 1 else 'No'],
+            ['ST Depression (Oldpeak):', f"{patient.oldpeak}"],
+            ['ST Slope:', f"Type {patient.st_slope}"],
+        ],
+        result_rows=[
+            ['Risk Level:', prediction.prediction_label],
+            ['Probability:', f"{prediction.probability * 100:.2f}%"],
+            ['Confidence Score:', f"{prediction.confidence_score:.2f}%"],
+            ['Model Version:', prediction.model_version],
+            ['Prediction Date:', prediction.created_at.strftime('%B %d, %Y')],
+            ['Prediction Time:', prediction.created_at.strftime('%I:%M %p')],
+        ],
+        high_risk=prediction.prediction == 1,
+        notes=None,
+    )
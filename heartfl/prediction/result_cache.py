@@ -0,0 +1,172 @@
+"""
+Prediction Result Cache
+Content-addressed cache of predictions keyed on the normalized feature vector
+
+Repeated submissions and OCR re-runs of the same report produce identical
+11-feature vectors. The cache key combines the canonicalized features with
+the serving model's hash, so replacing the model artifact makes every old
+entry unreachable without an explicit flush.
+
+Backends:
+- 'local':  bounded in-process LRU with TTL (default)
+- 'django': any configured Django cache (shared between workers)
+- 'none':   caching disabled
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import micro_batcher
+from .model_registry import get_predictor
+
+
+def canonical_features(features_list):
+    """Normalize a feature row so equal vectors produce equal keys (1 == 1.0 == True)."""
+    return tuple(round(float(value), 6) + 0.0 for value in features_list)
+
+
+def cache_key(model_hash, features_list):
+    """Stable string key for a model hash and feature row."""
+    payload = f"{model_hash}|{','.join(repr(value) for value in canonical_features(features_list))}"
+    return 'heartfl:prediction:' + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LocalLRUBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Adapter over a configured Django cache alias."""
+
+    def __init__(self, alias='default', ttl=3600):
+        self.alias = alias
+        self.ttl = ttl
+
+    def get(self, key):
+        return caches[self.alias].get(key)
+
+    def set(self, key, value):
+        caches[self.alias].set(key, value, self.ttl)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+    def __len__(self):
+        # Django caches do not expose their size.
+        return -1
+
+
+class PredictionCache:
+    """Read-through cache in front of predict_from_features with hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_predict(self, features_list, model_hash, compute):
+        """Return the cached (label, probability) or compute and store it."""
+        key = cache_key(model_hash, features_list)
+        result = self.backend.get(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return tuple(result)
+
+        with self._lock:
+            self.misses += 1
+        result = compute(features_list)
+        self.backend.set(key, tuple(result))
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.backend),
+            }
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide PredictionCache configured from settings, or None when disabled."""
+    global _cache
+    backend_name = getattr(settings, 'PREDICTION_CACHE_BACKEND', 'local')
+    if backend_name == 'none':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = getattr(settings, 'PREDICTION_CACHE_TTL', 3600)
+                if backend_name == 'django':
+                    backend = DjangoCacheBackend(getattr(settings, 'PREDICTION_CACHE_ALIAS', 'default'), ttl)
+                else:
+                    backend = LocalLRUBackend(getattr(settings, 'PREDICTION_CACHE_MAX_ENTRIES', 10000), ttl)
+                _cache = PredictionCache(backend)
+    return _cache
+
+
+def predict_from_features(features_list, predictor=None):
+    """
+    Score one feature row, serving repeats from the cache.
+    Pass predictor to pin the model version that serves the request.
+    """
+    predictor = predictor or get_predictor()
+
+    def compute(features):
+        return micro_batcher.predict_from_features(features, predictor=predictor)
+
+    cache = get_cache()
+    if cache is None:
+        return compute(features_list)
+    return cache.get_or_predict(features_list, predictor.model_hash, compute)
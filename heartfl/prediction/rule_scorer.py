@@ -0,0 +1,96 @@
+"""
+Rule-Based Risk Scorer
+Vectorized fallback used when the trained model is unavailable
+
+Each clinical factor is described by a row in RISK_RULES: an ordered list of
+(comparison, threshold, points) tuples evaluated like an if/elif ladder, plus
+the points awarded when no condition matches. np.select applies a whole
+ladder to every patient at once, so a 20,000-row CSV is scored in a few
+NumPy passes instead of 20,000 Python branches.
+"""
+import operator
+
+import numpy as np
+
+# Feature column indices: [age, sex, cp, bp, chol, fbs, ecg, hr, ea, oldpeak, slope]
+AGE, SEX, CHEST_PAIN, RESTING_BP, CHOLESTEROL, FASTING_BS = 0, 1, 2, 3, 4, 5
+RESTING_ECG, MAX_HEART_RATE, EXERCISE_ANGINA, OLDPEAK, ST_SLOPE = 6, 7, 8, 9, 10
+
+NUM_FEATURES = 11
+
+BASE_SCORE = 20
+MIN_SCORE = 10
+MAX_SCORE = 95
+HIGH_RISK_THRESHOLD = 50
+
+_COMPARISONS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+    '==': operator.eq,
+}
+
+# (feature, [(comparison, threshold, points), ...], default points)
+# Conditions are checked in order and the first match wins.
+RISK_RULES = (
+    # Age is an important predictor; even young people carry some risk
+    (AGE, [('>=', 70, 25), ('>=', 60, 20), ('>=', 50, 15), ('>=', 40, 8)], 2),
+    # Sex: 1=Male
+    (SEX, [('==', 1, 10)], 0),
+    # Cholesterol (strong predictor); low cholesterol is protective
+    (CHOLESTEROL, [('>=', 300, 30), ('>=', 240, 25), ('>=', 200, 15), ('>=', 160, 5), ('<', 160, -2)], 0),
+    # Blood pressure (strong predictor); normal BP is protective
+    (RESTING_BP, [('>=', 180, 25), ('>=', 160, 20), ('>=', 140, 15), ('>=', 130, 10),
+                  ('>=', 120, 5), ('<', 120, -3)], 0),
+    # Heart rate: both too low and too high are concerning
+    (MAX_HEART_RATE, [('<', 60, 15), ('<', 70, 8), ('<=', 100, -2), ('<=', 120, 3), ('<=', 150, 8)], 12),
+    # Chest pain: 0=Typical Angina, 1=Atypical, 2=Non-anginal, 3=Asymptomatic
+    (CHEST_PAIN, [('==', 0, 20), ('==', 1, 12), ('==', 2, 5)], 2),
+    # Exercise-induced angina (strong predictor)
+    (EXERCISE_ANGINA, [('==', 1, 25)], 0),
+    # ST depression (strong predictor)
+    (OLDPEAK, [('>=', 3.0, 30), ('>=', 2.0, 25), ('>=', 1.5, 20), ('>=', 1.0, 15),
+               ('>=', 0.5, 10), ('>', 0, 5)], 0),
+    # ST slope: 0=Upsloping, 1=Flat, 2=Downsloping
+    (ST_SLOPE, [('==', 2, 15), ('==', 1, 8)], 0),
+    # Resting ECG: 0=Normal, 1=ST-T wave abnormality, 2=LVH
+    (RESTING_ECG, [('==', 2, 15), ('==', 1, 10)], 0),
+    # Fasting blood sugar > 120 mg/dl
+    (FASTING_BS, [('==', 1, 15)], 0),
+)
+
+
+def rule_based_scores(features):
+    """
+    Risk score (10-95) for every row of an (N, 11) feature matrix.
+
+    Args:
+        features: array-like of shape (N, 11) or a single 11-value row
+
+    Returns:
+        float64 array of shape (N,)
+    """
+    features = np.asarray(features, dtype=np.float64).reshape(-1, NUM_FEATURES)
+    scores = np.full(features.shape[0], BASE_SCORE, dtype=np.float64)
+
+    for column, ladder, default in RISK_RULES:
+        values = features[:, column]
+        conditions = [_COMPARISONS[op](values, threshold) for op, threshold, _ in ladder]
+        points = [float(p) for _, _, p in ladder]
+        scores += np.select(conditions, points, default=float(default))
+
+    # Clamp between 10-95 (never 0 or 100 for realism)
+    return np.clip(scores, MIN_SCORE, MAX_SCORE, out=scores)
+
+
+def rule_based_predict(features):
+    """
+    Rule-based prediction for an (N, 11) feature matrix.
+
+    Returns:
+        (labels, scores): int8 labels (1 when score >= 50) and float64 scores
+    """
+    scores = rule_based_scores(features)
+    labels = (scores >= HIGH_RISK_THRESHOLD).astype(np.int8)
+    return labels, scores
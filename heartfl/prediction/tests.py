@@ -1,8 +1,793 @@
 # Prediction App Tests
-from django.test import TestCase
+import importlib.util
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Future
+from datetime import datetime, timezone as dt_timezone
+from io import BytesIO
+from unittest import mock, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from .ml_model import HeartDiseasePredictor, default_model_path, default_scaler_path, synthetic_batch
+from .benchmarks import ocr_benchmark, report_benchmark, run_benchmarks, sample_reports, synthetic_ocr_dump, synthetic_scanned_pdf
+from .batch_scoring import bundled_hospital_csvs, encode_chunk
+from .clinical_parser import PARSER_VERSION, parse_clinical_data, reference_parse_clinical_data
+from .compiled_scorer import compile_estimator, verify_scorer
+from . import ocr_jobs, report_cache, report_export, reports
+from .models import OCRJob, PatientData, PredictionResult
+from .ocr_cache import OCRCache, OCRCacheEntry, pdf_digest
+from .ocr import OCRTimeoutError, extract_pdf_text, field_confidence, ocr_page, render_page, shutdown_pool
+from .model_artifacts import artifact_path_for, export_artifact
+from .model_registry import ModelRegistry
+from .model_watcher import ModelWatcher
+from .micro_batcher import MicroBatcher
+from .result_cache import LocalLRUBackend, PredictionCache
+from .rule_scorer import rule_based_predict
+from hospitals.models import Doctor, Hospital
 
 
 class PredictionTest(TestCase):
     def test_prediction_placeholder(self):
         """Placeholder test"""
         self.assertTrue(True)
+
+
+class ModelRegistryTest(TestCase):
+    def test_predictor_is_loaded_once(self):
+        """Test registry returns the same predictor and records load stats"""
+        registry = ModelRegistry()
+        first = registry.get()
+        second = registry.get()
+        self.assertIs(first, second)
+
+        stats = registry.stats()
+        self.assertEqual(len(stats), 1)
+        self.assertGreaterEqual(stats[0]['load_seconds'], 0)
+        self.assertGreaterEqual(stats[0]['memory_bytes'], 0)
+
+
+class PredictManyTest(TestCase):
+    def setUp(self):
+        self.predictor = HeartDiseasePredictor()
+        self.rows = [
+            [60, 1, 0, 184, 231, 0, 1, 145, 1, 4.7, 1],
+            [23, 0, 2, 90, 168, 0, 2, 183, 1, 5.6, 1],
+            [35, 0, 3, 110, 150, 0, 1, 170, 0, 0.0, 2],
+        ]
+
+    def test_batch_matches_single_row_predictions(self):
+        """Test predict_many agrees with predict_from_features row by row"""
+        batch = self.predictor.predict_many(np.array(self.rows))
+        self.assertEqual(batch.labels.shape, (3,))
+        for index, row in enumerate(self.rows):
+            label, probability = self.predictor.predict_from_features(row)
+            self.assertEqual(label == 'High Risk', batch.labels[index] == 1)
+            self.assertAlmostEqual(probability, batch.probabilities[index])
+
+    def test_empty_batch(self):
+        """Test predict_many handles an empty matrix"""
+        batch = self.predictor.predict_many(np.zeros((0, 11)))
+        self.assertEqual(len(batch.labels), 0)
+
+
+class RuleScorerTest(TestCase):
+    def test_rule_scores_match_risk_ladder(self):
+        """Test vectorized fallback scores for known patients"""
+        rows = np.array([
+            # 20 + 15 + 10 + 15 + 15 - 2 + 20 + 25 + 25 + 8 + 10 + 15 -> clamped to 95
+            [55, 1, 0, 145, 210, 1, 1, 90, 1, 2.5, 1],
+            # 20 + 2 - 3 - 2 - 2 + 2 = 17
+            [30, 0, 3, 110, 150, 0, 0, 80, 0, 0.0, 0],
+            # 20 + 8 + 5 + 5 + 3 + 5 + 5 = 51 -> boundary of high risk
+            [40, 0, 2, 120, 160, 0, 0, 110, 0, 0.2, 0],
+        ])
+        labels, scores = rule_based_predict(rows)
+        self.assertEqual(scores.tolist(), [95.0, 17.0, 51.0])
+        self.assertEqual(labels.tolist(), [1, 0, 1])
+
+    def test_predictor_without_model_uses_rules(self):
+        """Test predictor falls back to rule scoring when no model is loaded"""
+        predictor = HeartDiseasePredictor(model_path='/nonexistent/model.pkl')
+        label, probability = predictor.predict_from_features([30, 0, 3, 110, 150, 0, 0, 80, 0, 0.0, 0])
+        self.assertEqual((label, probability), ('Low Risk', 17.0))
+
+
+class BatchPredictEndpointTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='hospital_csv', password='testpass123')
+        self.client.login(username='hospital_csv', password='testpass123')
+        session = self.client.session
+        session['user_role'] = 'hospital'
+        session.save()
+
+    def test_scored_csv_is_streamed(self):
+        """Test uploaded CSV rows come back with predictions"""
+        csv_content = (
+            b'Age,Sex,ChestPainType,RestingBP,Cholesterol,FastingBS,RestingECG,MaxHR,ExerciseAngina,Oldpeak,ST_Slope\n'
+            b'60,M,ASY,184,231,0,Normal,145,Y,4.7,Flat\n'
+            b'35,F,ATA,110,150,0,Normal,170,N,0.0,Up\n'
+        )
+        response = self.client.post(
+            reverse('prediction:batch_predict'),
+            {'csv_file': SimpleUploadedFile('cohort.csv', csv_content, content_type='text/csv')},
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].endswith('Prediction,Probability'))
+
+    def test_missing_columns_rejected(self):
+        """Test CSV without the model columns is rejected before scoring"""
+        response = self.client.post(
+            reverse('prediction:batch_predict'),
+            {'csv_file': SimpleUploadedFile('bad.csv', b'Age,Sex\n60,M\n', content_type='text/csv')},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class MicroBatcherTest(TestCase):
+    def test_concurrent_requests_are_coalesced(self):
+        """Test queued rows are scored together and every future resolves"""
+        predictor = HeartDiseasePredictor()
+        batcher = MicroBatcher(max_batch_size=16, max_wait_ms=50, predictor_getter=lambda: predictor)
+        row = [60, 1, 0, 184, 231, 0, 1, 145, 1, 4.7, 1]
+        futures = [batcher.submit(row) for _ in range(16)]
+
+        expected = predictor.predict_from_features(row)
+        for future in futures:
+            self.assertEqual(future.result(timeout=5), expected)
+
+        stats = batcher.stats()
+        self.assertEqual(stats['rows'], 16)
+        self.assertLess(stats['batches'], 16)
+
+    def test_worker_survives_a_failing_predictor_getter(self):
+        """Test a getter error fails its batch and the next request is still answered"""
+        predictor = HeartDiseasePredictor()
+        getter = mock.Mock(side_effect=[RuntimeError('model unavailable'), predictor])
+        batcher = MicroBatcher(max_wait_ms=0, predictor_getter=getter)
+        row = [60, 1, 0, 184, 231, 0, 1, 145, 1, 4.7, 1]
+
+        with self.assertRaises(RuntimeError):
+            batcher.predict_from_features(row, timeout=5)
+        self.assertEqual(batcher.predict_from_features(row, timeout=5), predictor.predict_from_features(row))
+
+
+class PredictionCacheTest(TestCase):
+    def test_equal_vectors_hit_and_model_hash_partitions(self):
+        """Test canonicalized vectors share entries and a new model hash misses"""
+        cache = PredictionCache(LocalLRUBackend(max_entries=2, ttl=60))
+        calls = []
+
+        def compute(features):
+            calls.append(features)
+            return ('Low Risk', 17.0)
+
+        cache.get_or_predict([30, 0, 3, 110, 150, 0, 0, 80, 0, 0, 0], 'hash-a', compute)
+        cache.get_or_predict([30.0, False, 3, 110, 150, 0, 0, 80, 0, 0.0, 0], 'hash-a', compute)
+        cache.get_or_predict([30, 0, 3, 110, 150, 0, 0, 80, 0, 0, 0], 'hash-b', compute)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_lru_eviction_and_ttl(self):
+        """Test oldest entries are evicted and expired entries are dropped"""
+        backend = LocalLRUBackend(max_entries=2, ttl=60)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+
+        expired = LocalLRUBackend(max_entries=2, ttl=-1)
+        expired.set('a', 1)
+        self.assertIsNone(expired.get('a'))
+
+
+class ModelWatcherTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.model_path = os.path.join(self.tmpdir, 'model.pkl')
+        self.scaler_path = os.path.join(self.tmpdir, 'scaler.pkl')
+        shutil.copy(default_model_path(), self.model_path)
+        self.registry = ModelRegistry()
+        self.watcher = ModelWatcher(
+            registry=self.registry, model_path=self.model_path, scaler_path=self.scaler_path
+        )
+        self.watcher.prime()
+
+    def _write_model(self, model):
+        with open(self.model_path, 'wb') as f:
+            pickle.dump(model, f)
+        os.utime(self.model_path, ns=(time.time_ns() + 10**9,) * 2)
+
+    def test_new_model_is_swapped_in(self):
+        """Test a changed artifact is validated and swapped atomically"""
+        old = self.registry.get(self.model_path, self.scaler_path)
+        model = pickle.loads(pickle.dumps(old.model))
+        model.tree_.value[0, 0, 0] += 1.0
+        self._write_model(model)
+
+        self.assertTrue(self.watcher.check())
+        new = self.registry.get(self.model_path, self.scaler_path)
+        self.assertIsNot(new, old)
+        self.assertNotEqual(new.model_version, old.model_version)
+
+    def test_invalid_model_is_rejected(self):
+        """Test an artifact that cannot score is not swapped in"""
+        old = self.registry.get(self.model_path, self.scaler_path)
+        self._write_model({'not': 'a model'})
+
+        self.assertFalse(self.watcher.check())
+        self.assertIs(self.registry.get(self.model_path, self.scaler_path), old)
+        self.assertEqual(self.watcher.rejected, 1)
+
+
+class ModelArtifactTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.model_path = os.path.join(self.tmpdir, 'model.pkl')
+        self.scaler_path = os.path.join(self.tmpdir, 'scaler.pkl')
+        shutil.copy(default_model_path(), self.model_path)
+        if os.path.exists(default_scaler_path()):
+            shutil.copy(default_scaler_path(), self.scaler_path)
+        self.source = HeartDiseasePredictor(model_path=self.model_path, scaler_path=self.scaler_path)
+
+    def test_artifact_matches_pickled_model(self):
+        """Test the memory-mapped artifact scores exactly like the pickled model"""
+        export_artifact(self.source)
+        predictor = HeartDiseasePredictor(model_path=self.model_path, scaler_path=self.scaler_path)
+
+        self.assertEqual(predictor.model_source, 'artifact')
+        self.assertEqual(predictor.model_hash, self.source.model_hash)
+        self.assertFalse(predictor.model.artifact['threshold'].flags.writeable)
+
+        batch = synthetic_batch(rows=500)
+        expected = self.source.predict_many(batch)
+        actual = predictor.predict_many(batch)
+        np.testing.assert_array_equal(actual.labels, expected.labels)
+        np.testing.assert_array_equal(actual.probabilities, expected.probabilities)
+
+    def test_stale_artifact_is_ignored(self):
+        """Test an artifact exported from a different model falls back to the pickle"""
+        export_artifact(self.source)
+        model = pickle.loads(pickle.dumps(self.source.model))
+        model.tree_.value[0, 0, 0] += 1.0
+        with open(self.model_path, 'wb') as f:
+            pickle.dump(model, f)
+
+        predictor = HeartDiseasePredictor(model_path=self.model_path, scaler_path=self.scaler_path)
+        self.assertTrue(os.path.exists(artifact_path_for(self.model_path)))
+        self.assertEqual(predictor.model_source, 'pickle')
+
+
+class CompiledScorerTest(TestCase):
+    def setUp(self):
+        self.batch = synthetic_batch(rows=400)
+        self.labels = (self.batch[:, 9] + self.batch[:, 2] > 3).astype(int)
+
+    def _assert_identical(self, model, scaler=None):
+        scorer = compile_estimator(model, scaler)
+        self.assertIsNotNone(scorer)
+        self.assertTrue(verify_scorer(scorer, model, scaler, self.batch))
+
+    def test_shipped_model_is_compiled(self):
+        """Test the predictor serves the shipped model through a verified compiled scorer"""
+        predictor = HeartDiseasePredictor()
+        self.assertIsNotNone(predictor.scorer)
+        self._assert_identical(predictor.model, predictor.scaler)
+
+    def test_forest_and_linear_models(self):
+        """Test compiled forests and logistic regression reproduce sklearn bit for bit"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler().fit(self.batch)
+        scaled = scaler.transform(self.batch)
+        forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(scaled, self.labels)
+        self._assert_identical(forest, scaler)
+        self._assert_identical(LogisticRegression().fit(scaled, self.labels), scaler)
+
+    def test_unsupported_model_is_not_compiled(self):
+        """Test estimators the compiler does not know fall back to sklearn"""
+        from sklearn.neighbors import KNeighborsClassifier
+
+        self.assertIsNone(compile_estimator(KNeighborsClassifier().fit(self.batch, self.labels)))
+
+    @skipUnless(bundled_hospital_csvs(), 'hospital datasets not present')
+    def test_hospital_csvs_score_identically(self):
+        """Test the compiled scorer matches sklearn on every bundled hospital CSV"""
+        predictor = HeartDiseasePredictor()
+        for csv_path in bundled_hospital_csvs():
+            X = encode_chunk(pd.read_csv(csv_path))
+            self.assertTrue(verify_scorer(predictor.scorer, predictor.model, predictor.scaler, X), csv_path)
+
+
+class PredictionBenchmarkTest(TestCase):
+    def test_benchmark_results_are_json(self):
+        """Test the benchmark suite reports latency and throughput for every backend"""
+        results = run_benchmarks(iterations=20, sizes=(1, 64), include_cold_start=False, max_rows=500,
+                                 report_iterations=2)
+        self.assertIn('rules', results['backends'])
+        for backend in results['backends'].values():
+            self.assertIn('p99_us', backend['latency']['predict'])
+            self.assertGreater(backend['throughput']['64']['rows_per_second'], 0)
+        self.assertIn('1', results['clinical_parser'])
+        self.assertIn('classic', results['report_rendering'])
+        json.dumps(results)
+
+
+class ClinicalParserTest(TestCase):
+    # Field phrases, near misses and separators the random reports are built from.
+    FRAGMENTS = (
+        'age', 'Age:', 'AGE -', 'page', 'stage', 'sex', 'Sex:', 'gender', 'male', 'female', 'Male', 'FEMALE',
+        'typical angina', 'atypical angina', 'Atypical  Angina', 'non-anginal', 'nonanginal', 'asymptomatic',
+        'chest pain type', 'cp', 'resting bp', 'Resting Blood Pressure', 'BP', 'cholesterol', 'chol',
+        'max heart rate', 'maximum heart rate', 'heart rate', 'HR:', 'oldpeak', 'ST depression',
+        'ST-T wave abnormality', 'left ventricular hypertrophy', 'normal ECG', 'resting ecg: normal', 'rest ecg',
+        'ECG:', 'fasting blood sugar', 'fasting bs', 'yes', 'no', 'positive', 'negative', 'true', 'false',
+        '> 120', '<= 120', 'exercise induced angina', 'upsloping', 'flat', 'flatten', 'downsloping', 'ST slope',
+        'slope', '.', ',', ':', '-', '\n', '0', '1', '2', '3', '54', '140', '239', '1.2', '4000', 'mg/dl',
+        'İ', 'ſ', 'é', '°',
+    )
+
+    def test_matches_original_parser_on_random_reports(self):
+        """Test the single-pass parser agrees with the original on a seeded random corpus"""
+        rng = random.Random(14)
+        for _ in range(3000):
+            text = ''.join(
+                rng.choice(self.FRAGMENTS) + rng.choice(('', ' ', '  ', ': '))
+                for _ in range(rng.randint(1, 40))
+            )
+            self.assertEqual(parse_clinical_data(text), reference_parse_clinical_data(text), repr(text))
+
+    def test_matches_original_parser_on_ocr_dumps(self):
+        """Test both parsers agree on long multi-page reports"""
+        for pages, seed in ((1, 0), (5, 1), (20, 2)):
+            text = synthetic_ocr_dump(pages, seed)
+            self.assertEqual(parse_clinical_data(text), reference_parse_clinical_data(text))
+
+    def test_typical_angina_takes_priority(self):
+        """Test 'typical angina' still wins over 'atypical angina', which contains it"""
+        self.assertEqual(parse_clinical_data('Chest pain: atypical angina')['chest_pain_type'], 0)
+        self.assertEqual(parse_clinical_data('Chest pain: atypicalangina')['chest_pain_type'], 0)
+        self.assertEqual(parse_clinical_data('CP: 2, non-anginal')['chest_pain_type'], 2)
+
+
+def _text_pdf(*pages):
+    """Build an in-memory PDF with one page of embedded text per argument."""
+    import fitz
+
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+class OCRPoolTest(TestCase):
+    def setUp(self):
+        self.addCleanup(shutdown_pool)
+
+    @skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+    def test_embedded_text_pages_skip_ocr(self):
+        """Test text PDFs are read page by page without rendering"""
+        text = extract_pdf_text(_text_pdf('Age: 54', 'Cholesterol: 239'))
+        self.assertEqual(text, 'Age: 54 Cholesterol: 239')
+
+    @skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+    def test_scanned_pages_are_ocred_in_order(self):
+        """Test blank (scanned) pages go to OCR and are joined in page order"""
+        submitted = []
+
+        def fake_submit(func, pdf_path, page_index, **options):
+            submitted.append((page_index, options))
+            future = Future()
+            future.set_result(f'Scanned page {page_index}')
+            return future
+
+        pdf = _text_pdf('', 'Age: 54', '')
+        progress = []
+        with mock.patch('prediction.ocr._submit', fake_submit):
+            text = extract_pdf_text(pdf, progress=lambda *pages: progress.append(pages))
+        self.assertEqual(text, 'Scanned page 0 Age: 54 Scanned page 2')
+        self.assertEqual([page for page, _ in submitted], [0, 2])
+        self.assertEqual(set(submitted[0][1]), {'dpi', 'fast_dpi', 'min_confidence'})
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    @skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+    @override_settings(OCR_MAX_WORKERS=2)
+    def test_document_timeout(self):
+        """Test a document that overruns its OCR budget raises OCRTimeoutError"""
+        pending = []
+
+        def fake_submit(func, pdf_path, page_index, **options):
+            pending.append(Future())
+            return pending[-1]
+
+        with mock.patch('prediction.ocr._submit', fake_submit):
+            with self.assertRaises(OCRTimeoutError):
+                extract_pdf_text(_text_pdf('', ''), timeout=0.05)
+        # The page waited on timed out; the one rendered ahead is cancelled.
+        self.assertEqual(len(pending), 2)
+        self.assertTrue(pending[1].cancelled())
+
+
+@skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+class OCRJobEndpointTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, OCR_CACHE_DIR=os.path.join(media_root, 'ocr'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='doctor_ocr', password='testpass123')
+        self.client.login(username='doctor_ocr', password='testpass123')
+        session = self.client.session
+        session['user_role'] = 'doctor'
+        session.save()
+
+    def _upload(self):
+        pdf = SimpleUploadedFile('report.pdf', _text_pdf('Age: 54 Cholesterol: 239'), content_type='application/pdf')
+        with self.captureOnCommitCallbacks(execute=False):
+            return self.client.post(reverse('prediction:upload_pdf_extract'), {'pdf_file': pdf})
+
+    def test_upload_returns_job_and_status_reports_result(self):
+        """Test the upload is queued and the polling endpoint returns the parsed fields"""
+        response = self._upload()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(OCRJob.objects.get(pk=job_id).status, OCRJob.STATUS_PENDING)
+
+        ocr_jobs.run_job(job_id)
+
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], OCRJob.STATUS_DONE)
+        self.assertEqual((status['pages_done'], status['pages_total']), (1, 1))
+        self.assertEqual(status['data']['age'], 54)
+        self.assertEqual(status['data']['cholesterol'], 239)
+        self.assertFalse(OCRJob.objects.get(pk=job_id).pdf_file)
+
+    def test_oversized_upload_is_rejected_while_streaming(self):
+        """Test an upload over OCR_MAX_UPLOAD_BYTES is refused without creating a job"""
+        pdf = SimpleUploadedFile('scan.pdf', _text_pdf('Age: 54') + b'%' * 4096, content_type='application/pdf')
+        with override_settings(OCR_MAX_UPLOAD_BYTES=2048):
+            response = self.client.post(reverse('prediction:upload_pdf_extract'), {'pdf_file': pdf})
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(OCRJob.objects.exists())
+
+    def test_page_limit_is_checked_before_queueing(self):
+        """Test a PDF with too many pages is rejected and its stored copy removed"""
+        pdf = SimpleUploadedFile('scan.pdf', _text_pdf('1', '2', '3'), content_type='application/pdf')
+        with override_settings(OCR_MAX_PAGES=2):
+            response = self.client.post(reverse('prediction:upload_pdf_extract'), {'pdf_file': pdf})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('3 pages', response.json()['error'])
+        self.assertFalse(OCRJob.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'ocr_jobs')), [])
+
+    def test_jobs_are_private(self):
+        """Test a job cannot be polled by another user"""
+        status_url = self._upload().json()['status_url']
+        User.objects.create_user(username='other_doctor', password='testpass123')
+        self.client.login(username='other_doctor', password='testpass123')
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+
+@skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+class EarlyExitExtractionTest(TestCase):
+    VITALS = 'Age: 54\nSex: Male\nChest pain: asymptomatic\nResting BP: 140\nCholesterol: 239\n'
+    TESTS = (
+        'Fasting blood sugar: No\nResting ECG: normal\nMax heart rate: 160\n'
+        'Exercise induced angina: No\nOldpeak: 1.2\nST slope: upsloping'
+    )
+
+    def test_stops_after_page_with_all_fields(self):
+        """Test extraction stops once every clinical field has been found"""
+        extraction = ocr_jobs.extract_clinical_data(_text_pdf(self.VITALS + self.TESTS, 'Notes', 'Appendix'))
+        self.assertEqual((extraction.pages_processed, extraction.pages_total), (1, 3))
+        self.assertEqual(extraction.data['cholesterol'], 239)
+        self.assertEqual(extraction.data['st_slope'], 0)
+
+    def test_fields_are_merged_across_pages(self):
+        """Test fields found on different pages are merged, earlier pages first"""
+        extraction = ocr_jobs.extract_clinical_data(_text_pdf(self.VITALS, self.TESTS + '\nAge: 99', 'Appendix'))
+        self.assertEqual((extraction.pages_processed, extraction.pages_total), (2, 3))
+        self.assertEqual(extraction.data['age'], 54)
+        self.assertEqual(extraction.data['oldpeak'], 1.2)
+
+
+@skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+class OCRCacheTest(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(OCR_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.cache = ocr_jobs.get_cache()
+
+    def test_reupload_is_served_from_cache(self):
+        """Test a second extraction of the same bytes does not read the PDF again"""
+        pdf = _text_pdf('Age: 54 Cholesterol: 239', 'Appendix')
+        first = ocr_jobs.extract_clinical_data_cached(pdf)
+        self.assertEqual(self.cache.get(pdf_digest(pdf)).page_texts, ['Age: 54 Cholesterol: 239', 'Appendix'])
+
+        progress = []
+        second = ocr_jobs.extract_clinical_data_cached(pdf, progress=lambda *pages: progress.append(pages))
+        self.assertEqual(second, first)
+        self.assertEqual(progress, [(2, 2)])
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_parser_version_change_reparses_cached_text(self):
+        """Test an entry from an older parser is re-parsed from its text, without OCR"""
+        pdf = b'not a pdf: reading it would raise'
+        self.cache.put(pdf_digest(pdf), OCRCacheEntry(
+            page_texts=['Age: 54 Sex: Female Resting BP: 140'], pages_total=1,
+            parser_version=PARSER_VERSION - 1, data={'age': 99},
+        ))
+        extraction = ocr_jobs.extract_clinical_data_cached(pdf)
+        self.assertEqual((extraction.data['age'], extraction.data['sex']), (54, 'Female'))
+        entry = self.cache.get(pdf_digest(pdf))
+        self.assertEqual((entry.parser_version, entry.data['resting_bp']), (PARSER_VERSION, 140))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test the cache stays under its byte limit and keeps recently read entries"""
+        cache = OCRCache(self.cache.directory, max_bytes=1000, ttl=0)
+        entry = OCRCacheEntry(page_texts=['x' * 300], pages_total=1, parser_version=PARSER_VERSION, data=None)
+        cache.put('a', entry)
+        cache.put('b', entry)
+        os.utime(os.path.join(cache.directory, 'a.json'), (1, 1))
+        os.utime(os.path.join(cache.directory, 'b.json'), (2, 2))
+        cache.get('a')
+        cache.put('c', entry)
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+@skipUnless(importlib.util.find_spec('fitz'), 'PyMuPDF not installed')
+class AdaptiveOCRTest(TestCase):
+    def test_field_confidence_prefers_numeric_words(self):
+        """Test confidence is taken from the words carrying values, ignoring layout entries"""
+        self.assertEqual(field_confidence(['Age:', '54', 'Chol', '239', ''], [20, 90, 30, 70, -1]), 80)
+        self.assertEqual(field_confidence(['Notes', 'only'], [60, 80]), 70)
+        self.assertIsNone(field_confidence(['', ' '], [-1, -1]))
+
+    def test_render_page_writes_grayscale_pgm(self):
+        """Test pages are handed to Tesseract as a grayscale PGM at the requested resolution"""
+        import fitz
+
+        with fitz.open(stream=synthetic_scanned_pdf(1, dpi=72), filetype='pdf') as document, \
+                tempfile.NamedTemporaryFile(suffix='.pgm') as handle:
+            width, height = render_page(document[0], 150, handle.name)
+            with open(handle.name, 'rb') as f:
+                self.assertEqual(f.read(2), b'P5')
+        self.assertEqual((width, height), (1240, 1755))
+
+    @skipUnless(shutil.which('tesseract'), 'tesseract not installed')
+    def test_adaptive_ocr_reads_scanned_page(self):
+        """Test a clean scan is read at the fast resolution with the same fields"""
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as handle:
+            handle.write(_text_pdf('Age: 54 Cholesterol: 239'))
+            handle.flush()
+            text = ocr_page(handle.name, 0, fast_dpi=150)
+        self.assertEqual(parse_clinical_data(text)['cholesterol'], 239)
+
+    def test_benchmark_compares_modes(self):
+        """Test the OCR benchmark reports time and peak memory for each mode"""
+        results = ocr_benchmark(pages=1, modes=('png', 'adaptive'))
+        for mode in ('png', 'adaptive'):
+            self.assertGreater(results['modes'][mode]['seconds_per_page'], 0, results['modes'][mode])
+            self.assertIn('peak_rss_bytes', results['modes'][mode])
+        json.dumps(results)
+
+
+def _doctor(username):
+    user = User.objects.create_user(username, password='pass12345')
+    hospital = Hospital.objects.create(
+        user=User.objects.create_user(f'{username}-hospital'), name=f'{username} Hospital', address='1 Main St',
+        city='City', state='State', pincode='000000', contact_number='0000000000',
+        email=f'{username}@hospital.local', registration_number=f'REG-{username}',
+    )
+    return Doctor.objects.create(
+        user=user, hospital=hospital, full_name=username.title(), license_number=f'LIC-{username}',
+        phone='0000000000', email=f'{username}@doctor.local',
+    )
+
+
+def _prediction_result(doctor, notes='Follow up in two weeks.'):
+    patient = PatientData.objects.create(
+        doctor=doctor, patient_name='Test Patient', age=54, gender='M', chest_pain_type=1, resting_bp=140,
+        cholesterol=239, fasting_bs=True, resting_ecg=1, max_heart_rate=160, exercise_angina=False,
+        oldpeak=1.2, st_slope=1,
+    )
+    return PredictionResult.objects.create(
+        patient_data=patient, doctor=doctor, prediction='high', probability=78.5, confidence_score=78.5, notes=notes,
+    )
+
+
+class ReportRenderingTest(TestCase):
+    def test_layouts_render_pdf(self):
+        """Test both report layouts render to a PDF with cached and freshly built styles"""
+        for layout, (report, render, build_styles) in sample_reports().items():
+            for styles in (None, build_styles()):
+                self.assertTrue(render(report, styles).startswith(b'%PDF'), layout)
+
+    def test_styles_are_built_once(self):
+        """Test paragraph and table styles are shared across reports"""
+        self.assertIs(reports.classic_styles(), reports.classic_styles())
+        self.assertIs(reports.modern_styles(), reports.modern_styles())
+
+    def test_benchmark_reports_both_layouts(self):
+        """Test the report benchmark times rebuilt and cached styles for each layout"""
+        results = report_benchmark(iterations=2)
+        for layout in ('classic', 'modern'):
+            self.assertGreater(results[layout]['cached_styles_ms'], 0)
+            self.assertGreater(results[layout]['rebuilt_styles_ms'], 0)
+
+
+class ReportCacheTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.result = _prediction_result(_doctor('drreport'))
+        self.url = reverse('prediction:download_report', args=[self.result.pk])
+        self.client.login(username='drreport', password='pass12345')
+        self.report_dir = os.path.join(media_root, settings.REPORT_CACHE_PREFIX, str(self.result.pk))
+
+    def test_download_is_cached_and_revalidated(self):
+        """Test a report is rendered once, then served from storage or answered with 304"""
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'application/pdf')
+        self.assertTrue(first.content.startswith(b'%PDF'))
+        self.assertIn('private', first['Cache-Control'])
+        self.assertEqual(len(os.listdir(self.report_dir)), 1)
+
+        second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_notes_edit_invalidates_report(self):
+        """Test editing the notes drops the stored PDF and changes the ETag"""
+        first = self.client.get(self.url)
+        self.result.notes = 'Start statin therapy.'
+        self.result.save()
+        self.assertEqual(os.listdir(self.report_dir), [])
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_fingerprint_covers_report_content(self):
+        """Test patient, model and hospital changes give a new fingerprint"""
+        result = PredictionResult.objects.select_related('patient_data', 'doctor__hospital').get(pk=self.result.pk)
+        fingerprint = report_cache.report_fingerprint(result)
+        self.assertEqual(report_cache.report_fingerprint(result), fingerprint)
+        for obj, field, value in (
+            (result.patient_data, 'cholesterol', 240),
+            (result, 'model_version', 'v2.0'),
+            (result, 'probability', 12.5),
+            (result.doctor.hospital, 'name', 'Renamed Hospital'),
+        ):
+            original = getattr(obj, field)
+            setattr(obj, field, value)
+            self.assertNotEqual(report_cache.report_fingerprint(result), fingerprint, field)
+            setattr(obj, field, original)
+
+    def test_report_is_dated_by_its_prediction(self):
+        """Test the report date is the prediction time, not the render time"""
+        predicted_at = datetime(2025, 3, 4, 9, 30, tzinfo=dt_timezone.utc)
+        PredictionResult.objects.filter(pk=self.result.pk).update(predicted_at=predicted_at)
+        result = PredictionResult.objects.select_related('patient_data', 'doctor__hospital').get(pk=self.result.pk)
+
+        report = reports.classic_report_data(result)
+        self.assertIn(['Report Date:', 'March 04, 2025 03:00 PM'], report.doctor_rows)
+
+        fingerprint = report_cache.report_fingerprint(result)
+        result.predicted_at = datetime(2025, 3, 5, tzinfo=dt_timezone.utc)
+        self.assertNotEqual(report_cache.report_fingerprint(result), fingerprint)
+
+    def test_truncated_entry_is_a_miss(self):
+        """Test a partially written PDF is rendered again instead of served"""
+        cache = report_cache.ReportCache()
+        cache.put(1, 'abc', b'%PDF-1.4 truncated')
+        data, hit = cache.get_or_render(1, 'abc', lambda: b'%PDF-1.4\n%%EOF\n')
+        self.assertFalse(hit)
+        self.assertEqual(cache.get_or_render(1, 'abc', lambda: b'')[0], data)
+
+
+class ReportExportTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, REPORT_EXPORT_WORKERS=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(report_export.shutdown_pool)
+
+        self.doctor = _doctor('drexport')
+        self.results = [_prediction_result(self.doctor, notes=f'Visit {day}') for day in (1, 2, 3)]
+        for day, result in enumerate(self.results, start=1):
+            PredictionResult.objects.filter(pk=result.pk).update(
+                predicted_at=datetime(2025, 1, day, 6, tzinfo=dt_timezone.utc)
+            )
+        self.client.login(username='drexport', password='pass12345')
+
+    def _archive(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_export_streams_zip_of_reports(self):
+        """Test every selected report is rendered into the ZIP"""
+        response = self.client.get(reverse('prediction:export_reports'))
+        self.assertEqual(response['X-Report-Count'], '3')
+        archive = self._archive(response)
+        # Entries are written in the order the workers finish.
+        self.assertCountEqual(archive.namelist(), [report_export.report_filename(result) for result in self.results])
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b'%PDF'))
+
+    def test_export_filters_by_date_and_reuses_cache(self):
+        """Test the date range narrows the export and cached reports are not rendered again"""
+        url = reverse('prediction:export_reports')
+        archive = self._archive(self.client.get(url, {'start': '2025-01-02', 'end': '2025-01-02'}))
+        self.assertEqual(archive.namelist(), [report_export.report_filename(self.results[1])])
+
+        stats = report_export.ExportStats()
+        predictions = report_export.select_predictions(doctor=self.doctor)
+        b''.join(report_export.iter_report_zip(predictions, cache=report_cache.get_report_cache(), stats=stats))
+        self.assertEqual((stats.reports, stats.cached), (3, 1))
+
+    def test_export_rejects_bad_requests(self):
+        """Test malformed dates, empty ranges and non-doctor accounts are refused"""
+        url = reverse('prediction:export_reports')
+        self.assertEqual(self.client.get(url, {'start': '01/02/2025'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2026-01-01'}).status_code, 404)
+
+        User.objects.create_user('patient', password='pass12345')
+        self.client.login(username='patient', password='pass12345')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_hospital_exports_its_doctors_reports(self):
+        """Test a hospital account exports its doctors' reports, or one doctor's"""
+        hospital_user = self.doctor.hospital.user
+        hospital_user.set_password('pass12345')
+        hospital_user.save()
+        other = _doctor('drother')
+        _prediction_result(other)
+        self.client.login(username=hospital_user.username, password='pass12345')
+
+        archive = self._archive(self.client.get(reverse('prediction:export_reports')))
+        self.assertEqual(len(archive.namelist()), 3)
+        response = self.client.get(reverse('prediction:export_reports'), {'doctor': other.pk})
+        self.assertEqual(response.status_code, 404)
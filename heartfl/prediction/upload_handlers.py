@@ -0,0 +1,35 @@
+"""
+PDF Upload Handler
+Streams report uploads to a temporary file and stops at the size limit
+
+Django keeps uploads under FILE_UPLOAD_MAX_MEMORY_SIZE in memory and only
+spools larger ones to disk. A PDF upload is always written to disk chunk by
+chunk, and the rest of a file larger than OCR_MAX_UPLOAD_BYTES is discarded
+as it arrives instead of being stored. The temporary file is then moved, not
+copied, into media storage by OCRJob.pdf_file.save().
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+
+
+class PDFUploadHandler(TemporaryFileUploadHandler):
+    """TemporaryFileUploadHandler that skips files over OCR_MAX_UPLOAD_BYTES."""
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes or getattr(settings, 'OCR_MAX_UPLOAD_BYTES', 25 * 1024 * 1024)
+        self.too_large = False
+        self.received = 0
+
+    def new_file(self, *args, **kwargs):
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.too_large = True
+            self.file.close()
+            # The parser drops this file and reads past the rest of it.
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
@@ -9,7 +9,10 @@ app_name = 'prediction'
 urlpatterns = [
     path('', views.predict, name='predict'),
     path('upload-pdf/', views.upload_pdf_and_extract, name='upload_pdf_extract'),
+    path('upload-pdf/<uuid:job_id>/', views.ocr_job_status, name='ocr_job_status'),
     path('predict-ajax/', views.predict_heart_disease, name='predict_ajax'),
+    path('batch-predict/', views.batch_predict_csv, name='batch_predict'),
     path('history/', views.prediction_history, name='history'),
     path('download-report/<int:prediction_id>/', views.download_prediction_report, name='download_report'),
+    path('export-reports/', views.export_prediction_reports, name='export_reports'),
 ]
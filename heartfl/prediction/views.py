@@ -5,174 +5,32 @@ Heart disease prediction and patient data management
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_http_methods, require_POST
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
 from .forms import PatientDataForm
-from .models import PatientData, PredictionResult
+from .models import OCRJob, PatientData, PredictionResult
 from hospitals.models import Doctor
-from .ml_model import HeartDiseasePredictor
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from datetime import datetime
+from .model_registry import get_predictor
+from .batch_scoring import CSV_FEATURE_COLUMNS, score_csv
+from . import result_cache
+from . import ocr_jobs
+from . import report_cache, report_export, reports
+from .ocr import PDFRejectedError
+from .upload_handlers import PDFUploadHandler
 import traceback
 import logging
 import json
-import re
-from io import BytesIO
+import os
 
 from hospitals.models import Hospital
 
 logger = logging.getLogger(__name__)
 
 
-def _extract_first_int(patterns, text, default=None):
-    """Extract the first integer matching one of the provided regex patterns."""
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                return int(match.group(1))
-            except (TypeError, ValueError):
-                continue
-    return default
-
-
-def _extract_first_float(patterns, text, default=None):
-    """Extract the first float matching one of the provided regex patterns."""
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                return float(match.group(1))
-            except (TypeError, ValueError):
-                continue
-    return default
-
-
-def _extract_pdf_text(pdf_bytes):
-    """Extract text from PDF using embedded text first, then OCR fallback per page."""
-    try:
-        import fitz
-        import pytesseract
-        from PIL import Image
-    except ImportError as exc:
-        raise RuntimeError('OCR dependencies are missing. Install pytesseract and PyMuPDF.') from exc
-
-    document = fitz.open(stream=pdf_bytes, filetype='pdf')
-    page_text_chunks = []
-
-    for page in document:
-        text = page.get_text('text') or ''
-        text = text.strip()
-        if text:
-            page_text_chunks.append(text)
-            continue
-
-        # OCR fallback for scanned PDFs where embedded text is unavailable.
-        pix = page.get_pixmap(dpi=300)
-        image = Image.open(BytesIO(pix.tobytes('png')))
-        ocr_text = pytesseract.image_to_string(image) or ''
-        page_text_chunks.append(ocr_text)
-
-    document.close()
-    joined_text = '\n'.join(page_text_chunks)
-    return re.sub(r'\s+', ' ', joined_text).strip()
-
-
-def _parse_clinical_data_from_text(text):
-    """Parse OCR text into structured prediction features expected by the UI/model."""
-    normalized = text.lower()
-
-    age = _extract_first_int([r'age\s*[:\-]?\s*(\d{1,3})'], text)
-    resting_bp = _extract_first_int([
-        r'(?:resting\s*(?:blood\s*pressure|bp)|blood\s*pressure|bp)\s*[:\-]?\s*(\d{2,3})'
-    ], text)
-    cholesterol = _extract_first_int([
-        r'(?:cholesterol|chol)\s*[:\-]?\s*(\d{2,4})'
-    ], text)
-    max_heart_rate = _extract_first_int([
-        r'(?:max(?:imum)?\s*heart\s*rate|heart\s*rate|hr)\s*[:\-]?\s*(\d{2,3})'
-    ], text)
-    oldpeak = _extract_first_float([
-        r'(?:oldpeak|st\s*depression)\s*[:\-]?\s*([0-9]+(?:\.[0-9]+)?)'
-    ], text)
-
-    sex = None
-    if re.search(r'\bsex\s*[:\-]?\s*male\b|\bgender\s*[:\-]?\s*male\b|\bmale\b', normalized):
-        sex = 'Male'
-    elif re.search(r'\bsex\s*[:\-]?\s*female\b|\bgender\s*[:\-]?\s*female\b|\bfemale\b', normalized):
-        sex = 'Female'
-
-    chest_pain_type = None
-    if re.search(r'typical\s*angina', normalized):
-        chest_pain_type = 0
-    elif re.search(r'atypical\s*angina', normalized):
-        chest_pain_type = 1
-    elif re.search(r'non[-\s]?anginal', normalized):
-        chest_pain_type = 2
-    elif re.search(r'asymptomatic', normalized):
-        chest_pain_type = 3
-    else:
-        chest_pain_type = _extract_first_int([
-            r'(?:chest\s*pain\s*type|cp)\s*[:\-]?\s*([0-3])'
-        ], text)
-
-    fasting_bs = None
-    if re.search(r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:yes|positive|true|>\s*120)', normalized):
-        fasting_bs = 'Yes'
-    elif re.search(r'fasting\s*(?:blood\s*sugar|bs)[^\.]{0,30}(?:no|negative|false|<=\s*120)', normalized):
-        fasting_bs = 'No'
-
-    resting_ecg = None
-    if re.search(r'left\s*ventricular\s*hypertrophy', normalized):
-        resting_ecg = 2
-    elif re.search(r'st[-\s]*t\s*wave\s*abnormal', normalized):
-        resting_ecg = 1
-    elif re.search(r'\bnormal\s*ecg\b|resting\s*ecg\s*[:\-]?\s*normal', normalized):
-        resting_ecg = 0
-    else:
-        resting_ecg = _extract_first_int([
-            r'(?:rest(?:ing)?\s*ecg|ecg)\s*[:\-]?\s*([0-2])'
-        ], text)
-
-    exercise_angina = None
-    if re.search(r'exercise\s*induced\s*angina[^\.]{0,20}(?:yes|positive|true)', normalized):
-        exercise_angina = 'Yes'
-    elif re.search(r'exercise\s*induced\s*angina[^\.]{0,20}(?:no|negative|false)', normalized):
-        exercise_angina = 'No'
-
-    st_slope = None
-    if re.search(r'\bupsloping\b', normalized):
-        st_slope = 0
-    elif re.search(r'\bflat\b', normalized):
-        st_slope = 1
-    elif re.search(r'\bdownsloping\b', normalized):
-        st_slope = 2
-    else:
-        st_slope = _extract_first_int([
-            r'(?:st\s*slope|slope)\s*[:\-]?\s*([0-2])'
-        ], text)
-
-    return {
-        'age': age,
-        'sex': sex,
-        'chest_pain_type': chest_pain_type,
-        'resting_bp': resting_bp,
-        'cholesterol': cholesterol,
-        'fasting_bs': fasting_bs,
-        'resting_ecg': resting_ecg,
-        'max_heart_rate': max_heart_rate,
-        'exercise_angina': exercise_angina,
-        'oldpeak': oldpeak,
-        'st_slope': st_slope,
-    }
-
-
 def _ensure_doctor_record(user):
     """Get or create a Doctor record for the user."""
     try:
@@ -253,7 +111,7 @@ def predict(request):
                 patient_data.save()
                 
                 # Perform prediction
-                predictor = HeartDiseasePredictor()
+                predictor = get_predictor()
                 prediction, probability = predictor.predict(patient_data)
                 
                 # Save prediction result
@@ -262,7 +120,8 @@ def predict(request):
                     doctor=doctor,
                     prediction=prediction,
                     probability=probability,
-                    confidence_score=probability
+                    confidence_score=probability,
+                    model_version=predictor.model_version
                 )
                 
                 messages.success(request, 'Prediction completed successfully!')
@@ -282,14 +141,30 @@ def predict(request):
     return render(request, 'prediction/predict.html', context)
 
 
+@csrf_exempt
 @login_required
 @require_POST
 def upload_pdf_and_extract(request):
-    """Accept a PDF medical report, extract text and return parsed clinical JSON."""
+    """
+    Accept a PDF medical report and queue it for extraction.
+    Returns 202 with a job id; poll ocr_job_status for the parsed clinical JSON.
+    """
+    # Must be set before request.POST or request.FILES is read, which is why
+    # CSRF is checked by _queue_pdf_upload rather than the middleware.
+    handler = PDFUploadHandler(request)
+    request.upload_handlers = [handler]
+    return _queue_pdf_upload(request, handler)
+
+
+@csrf_protect
+def _queue_pdf_upload(request, handler):
     if not _is_doctor(request):
         return JsonResponse({'error': 'Access denied. Doctor account required.'}, status=403)
 
     uploaded_file = request.FILES.get('pdf_file')
+    if handler.too_large:
+        limit_mb = handler.max_bytes / (1024 * 1024)
+        return JsonResponse({'error': f'PDF is too large. The limit is {limit_mb:.0f} MB.'}, status=413)
     if not uploaded_file:
         return JsonResponse({'error': 'No PDF file provided.'}, status=400)
 
@@ -297,17 +172,25 @@ def upload_pdf_and_extract(request):
         return JsonResponse({'error': 'Invalid file type. Please upload a PDF.'}, status=400)
 
     try:
-        pdf_bytes = uploaded_file.read()
-        extracted_text = _extract_pdf_text(pdf_bytes)
-        if not extracted_text:
-            return JsonResponse({'error': 'Unable to extract text from PDF.'}, status=422)
-
-        parsed_data = _parse_clinical_data_from_text(extracted_text)
-        return JsonResponse({'data': parsed_data})
+        job = ocr_jobs.submit_job(request.user, uploaded_file)
+    except PDFRejectedError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
     except Exception as exc:
-        logger.exception('PDF extraction failed: %s', exc)
+        logger.exception('Could not queue PDF extraction: %s', exc)
         return JsonResponse({'error': 'OCR processing failed. Please try another PDF.'}, status=500)
 
+    status_url = reverse('prediction:ocr_job_status', args=[job.pk])
+    return JsonResponse(ocr_jobs.job_payload(job, status_url), status=202)
+
+
+@login_required
+@require_http_methods(['GET'])
+def ocr_job_status(request, job_id):
+    """Progress of an OCR job, plus the parsed clinical data once it is done."""
+    job = get_object_or_404(OCRJob, pk=job_id, user=request.user)
+    ocr_jobs.expire_if_stale(job)
+    return JsonResponse(ocr_jobs.job_payload(job))
+
 
 def _parse_prediction_payload(request):
     """Support both JSON and form-encoded payloads for AJAX prediction."""
@@ -365,8 +248,9 @@ def predict_heart_disease(request):
     fasting_bs = 1 if fasting_bs_raw in ('yes', 'true', '1', 'on') else 0
     exercise_angina = 1 if exercise_angina_raw in ('yes', 'true', '1', 'on') else 0
 
-    predictor = HeartDiseasePredictor()
-    prediction_label, probability_percent = predictor.predict_from_features([
+    # Pin one predictor so the recorded version is the one that scored this request.
+    predictor = get_predictor()
+    prediction_label, probability_percent = result_cache.predict_from_features([
         age,
         sex,
         chest_pain_type,
@@ -378,7 +262,7 @@ def predict_heart_disease(request):
         exercise_angina,
         oldpeak,
         st_slope,
-    ])
+    ], predictor=predictor)
 
     normalized_prediction = 'High Risk' if prediction_label.lower().startswith('high') else 'Low Risk'
     risk_color = 'danger' if normalized_prediction == 'High Risk' else 'success'
@@ -410,6 +294,7 @@ def predict_heart_disease(request):
         prediction='high' if normalized_prediction == 'High Risk' else 'low',
         probability=float(probability_percent),
         confidence_score=float(probability_percent),
+        model_version=predictor.model_version,
     )
 
     report_url = reverse('prediction:download_report', args=[prediction_record.id])
@@ -424,6 +309,44 @@ def predict_heart_disease(request):
     })
 
 
+def _can_batch_score(request):
+    """Doctors and hospital accounts may score whole datasets."""
+    if _is_doctor(request):
+        return True
+    return hasattr(request.user, 'hospital') or request.session.get('user_role') == 'hospital'
+
+
+@login_required
+@require_POST
+def batch_predict_csv(request):
+    """Score an uploaded hospital CSV and stream back the scored CSV."""
+    if not _can_batch_score(request):
+        return JsonResponse({'error': 'Access denied. Doctor or hospital account required.'}, status=403)
+
+    uploaded_file = request.FILES.get('csv_file')
+    if not uploaded_file:
+        return JsonResponse({'error': 'No CSV file provided.'}, status=400)
+
+    if not uploaded_file.name.lower().endswith('.csv'):
+        return JsonResponse({'error': 'Invalid file type. Please upload a CSV.'}, status=400)
+
+    # Validate the header up front; errors cannot be reported once streaming starts.
+    header = uploaded_file.readline().decode('utf-8-sig', errors='replace')
+    uploaded_file.seek(0)
+    columns = [column.strip() for column in header.strip().split(',')]
+    missing = [column for column in CSV_FEATURE_COLUMNS if column not in columns]
+    if missing:
+        return JsonResponse({'error': f"CSV is missing required columns: {', '.join(missing)}"}, status=400)
+
+    response = StreamingHttpResponse(
+        score_csv(uploaded_file.file, get_predictor()),
+        content_type='text/csv',
+    )
+    scored_name = f'{os.path.splitext(os.path.basename(uploaded_file.name))[0]}_scored.csv'
+    response['Content-Disposition'] = f'attachment; filename="{scored_name}"'
+    return response
+
+
 @login_required
 def prediction_history(request):
     """View prediction history for logged-in doctor"""
@@ -459,204 +382,87 @@ def download_prediction_report(request, prediction_id):
     doctor = _ensure_doctor_record(request.user)
     
     # Get prediction result
-    prediction_result = get_object_or_404(PredictionResult, id=prediction_id)
+    prediction_result = get_object_or_404(
+        PredictionResult.objects.select_related('patient_data', 'doctor__hospital'), id=prediction_id
+    )
     
     # Verify it matches the logged-in doctor
     if prediction_result.doctor != doctor:
         messages.error(request, 'Access denied.')
         return redirect('prediction:history')
     
-    # Create HTTP response with PDF mime type
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="heart_disease_report_{prediction_id}.pdf"'
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(response, pagesize=letter,
-                          rightMargin=72, leftMargin=72,
-                          topMargin=72, bottomMargin=18)
-    
-    # Container for PDF elements
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#34495e'),
-        spaceAfter=12,
-        spaceBefore=12
-    )
-    
-    # Header
-    elements.append(Paragraph("Heart Disease Prediction Report", title_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Hospital & Doctor Information
-    doctor = prediction_result.doctor
-    hospital_data = [
-        ['Hospital:', doctor.hospital.name],
-        ['Doctor:', f'Dr. {doctor.full_name}'],
-        ['Specialization:', doctor.specialization or 'General Medicine'],
-        ['License Number:', doctor.license_number],
-        ['Report Date:', datetime.now().strftime('%B %d, %Y %I:%M %p')]
-    ]
-    
-    hospital_table = Table(hospital_data, colWidths=[2*inch, 4*inch])
-    hospital_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7'))
-    ]))
-    
-    elements.append(hospital_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Patient Information Section
-    elements.append(Paragraph("Patient Information", heading_style))
-    
-    patient = prediction_result.patient_data
-    gender_display = 'Male' if patient.gender == 'M' else 'Female'
-    
-    patient_data = [
-        ['Patient Name:', patient.patient_name],
-        ['Age:', f'{patient.age} years'],
-        ['Gender:', gender_display],
-        ['Record Date:', patient.created_at.strftime('%B %d, %Y')]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7'))
-    ]))
-    
-    elements.append(patient_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Clinical Data Section
-    elements.append(Paragraph("Clinical Data", heading_style))
-    
-    chest_pain_types = {0: 'Typical Angina', 1: 'Atypical Angina', 2: 'Non-anginal Pain', 3: 'Asymptomatic'}
-    
-    clinical_data = [
-        ['Parameter', 'Value'],
-        ['Chest Pain Type', chest_pain_types.get(patient.chest_pain_type, 'Unknown')],
-        ['Resting Blood Pressure', f'{patient.resting_bp} mm Hg'],
-        ['Cholesterol', f'{patient.cholesterol} mg/dl'],
-        ['Fasting Blood Sugar', 'Yes (>120 mg/dl)' if patient.fasting_bs else 'No (<120 mg/dl)'],
-        ['Resting ECG', str(patient.resting_ecg)],
-        ['Max Heart Rate', f'{patient.max_heart_rate} bpm'],
-        ['Exercise Induced Angina', 'Yes' if patient.exercise_angina else 'No'],
-        ['ST Depression (Oldpeak)', f'{patient.oldpeak}'],
-        ['ST Slope', str(patient.st_slope)]
-    ]
-    
-    clinical_table = Table(clinical_data, colWidths=[3*inch, 3*inch])
-    clinical_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7'))
-    ]))
-    
-    elements.append(clinical_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Prediction Results Section
-    elements.append(Paragraph("Prediction Results", heading_style))
-    
-    # Determine risk color
-    if prediction_result.prediction == 'high':
-        risk_color = colors.HexColor('#e74c3c')
-        risk_bg = colors.HexColor('#fadbd8')
-        risk_text = 'HIGH RISK'
-    else:
-        risk_color = colors.HexColor('#27ae60')
-        risk_bg = colors.HexColor('#d5f4e6')
-        risk_text = 'LOW RISK'
-    
-    result_data = [
-        ['Prediction', 'Probability'],
-        [risk_text, f'{prediction_result.probability:.2f}%']
-    ]
-    
-    result_table = Table(result_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BACKGROUND', (0, 1), (0, 1), risk_bg),
-        ('TEXTCOLOR', (0, 1), (0, 1), risk_color),
-        ('FONTNAME', (0, 1), (0, 1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 1), (0, 1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1.5, colors.HexColor('#34495e'))
-    ]))
-    
-    elements.append(result_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Notes Section
-    if prediction_result.notes:
-        elements.append(Paragraph("Doctor's Notes", heading_style))
-        notes_style = ParagraphStyle(
-            'Notes',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=12
+    # Unchanged report: answer the browser's If-None-Match without touching the PDF
+    fingerprint = report_cache.report_fingerprint(prediction_result)
+    etag = report_cache.report_etag(fingerprint)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        def render_pdf():
+            return reports.render_classic_report(reports.classic_report_data(prediction_result))
+
+        cache = report_cache.get_report_cache()
+        if cache is None:
+            pdf_data = render_pdf()
+        else:
+            pdf_data, _ = cache.get_or_render(prediction_result.pk, fingerprint, render_pdf)
+        response = HttpResponse(pdf_data, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="heart_disease_report_{prediction_id}.pdf"'
+    response['ETag'] = etag
+    # Patient data: never store in shared caches, always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _query_date(request, name):
+    """Optional YYYY-MM-DD query parameter; ValueError if it is malformed."""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format.')
+    return parsed
+
+
+@login_required
+@require_http_methods(['GET'])
+def export_prediction_reports(request):
+    """
+    Stream a ZIP of the PDF reports of every prediction in a date range.
+    Doctors export their own predictions; hospital accounts export those of
+    their doctors, optionally narrowed to one doctor with ?doctor=<id>.
+    """
+    try:
+        start = _query_date(request, 'start')
+        end = _query_date(request, 'end')
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    if _is_doctor(request):
+        predictions = report_export.select_predictions(
+            doctor=_ensure_doctor_record(request.user), start=start, end=end
         )
-        elements.append(Paragraph(prediction_result.notes, notes_style))
-    
-    # Footer
-    elements.append(Spacer(1, 0.4*inch))
-    footer_text = """
-    <para align=center>
-    <font size=8 color='#7f8c8d'>
-    This report is generated by HeartFL - Federated Learning for Heart Disease Prediction<br/>
-    Report ID: {}<br/>
-    Generated on: {}<br/>
-    <b>DISCLAIMER:</b> This prediction is for reference only. Please consult with a qualified healthcare provider for diagnosis and treatment.
-    </font>
-    </para>
-    """.format(prediction_id, datetime.now().strftime('%B %d, %Y %I:%M %p'))
-    
-    elements.append(Paragraph(footer_text, styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
-    
+    elif hasattr(request.user, 'hospital'):
+        hospital = request.user.hospital
+        doctor = None
+        if request.GET.get('doctor'):
+            doctor = get_object_or_404(Doctor, pk=request.GET['doctor'], hospital=hospital)
+        predictions = report_export.select_predictions(doctor=doctor, hospital=hospital, start=start, end=end)
+    else:
+        return JsonResponse({'error': 'Access denied. Doctor or hospital account required.'}, status=403)
+
+    total = predictions.count()
+    if not total:
+        return JsonResponse({'error': 'No predictions match the selected dates.'}, status=404)
+
+    response = StreamingHttpResponse(
+        report_export.iter_report_zip(
+            predictions.iterator(chunk_size=200),
+            cache=report_cache.get_report_cache(),
+            stats=report_export.ExportStats(total),
+        ),
+        content_type='application/zip',
+    )
+    archive_name = f"heart_disease_reports_{start or 'all'}_{end or 'all'}.zip"
+    response['Content-Disposition'] = f'attachment; filename="{archive_name}"'
+    response['X-Report-Count'] = str(total)
     return response